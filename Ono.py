@@ -1,13 +1,227 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog
 import sqlite3
-import os
-import uuid
-from datetime import datetime
-import openpyxl
+import time
+import queue
+import threading
 from PIL import Image, ImageDraw, ImageFont
-import re
-from fpdf import FPDF
+from nucleo import SistemaCertificados
+from exportacion import exportar_zip, exportar_reporte
+from instrumentacion import MedidorEtapas
+from plantillas import FORMATOS_PLANTILLA, listar_plantillas
+
+class TablaPaginada:
+    # Treeview que solo mantiene en memoria una ventana de filas. Las páginas
+    # se piden por rowid (paginación por clave), así el costo de cada consulta
+    # no depende de la posición dentro de la tabla
+    def __init__(self, padre, conn, tabla_sql, columnas_sql, encabezados,
+                 filas_por_pagina=100, paginas_en_memoria=3):
+        self.conn = conn
+        self.tabla_sql = tabla_sql
+        self.columnas_sql = ", ".join(columnas_sql)
+        self.filas_por_pagina = filas_por_pagina
+        self.max_filas = filas_por_pagina * paginas_en_memoria
+
+        self.frame = ttk.Frame(padre, style='TFrame')
+        self.frame.pack(expand=True, fill=tk.BOTH, padx=20, pady=10)
+
+        self.estado = ttk.Label(self.frame, text="", style='TLabel')
+        self.estado.pack(side=tk.BOTTOM, anchor=tk.W)
+
+        self.barra = ttk.Scrollbar(self.frame, orient=tk.VERTICAL)
+        self.barra.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree = ttk.Treeview(self.frame, columns=encabezados, show="headings",
+                                 yscrollcommand=self._al_desplazar)
+        for col in encabezados:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=150, anchor=tk.CENTER)
+        self.tree.pack(expand=True, fill=tk.BOTH)
+        self.barra.config(command=self.tree.yview)
+
+        self._cargando = False
+        self.filtro = None
+        self._limpiar()
+
+        # Tiempos de carga de la tabla; el resumen se registra al cerrarla
+        self.medidor = MedidorEtapas("tabla", tabla=tabla_sql)
+        self.frame.bind("<Destroy>", self._al_destruir)
+
+    def _limpiar(self):
+        self.tree.delete(*self.tree.get_children())
+        self.primero = None
+        self.ultimo = None
+        self.hay_anteriores = False
+        self.hay_siguientes = True
+
+    def _where(self, condiciones, parametros):
+        if self.filtro:
+            condiciones = condiciones + [self.filtro[0]]
+            parametros = parametros + list(self.filtro[1])
+        if not condiciones:
+            return "", parametros
+        return " WHERE " + " AND ".join(condiciones), parametros
+
+    def _consultar(self, condicion, orden, clave):
+        condiciones, parametros = [], []
+        if clave is not None:
+            condiciones.append(f"rowid {condicion} ?")
+            parametros.append(clave)
+        where, parametros = self._where(condiciones, parametros)
+        consulta = (f"SELECT rowid, {self.columnas_sql} FROM {self.tabla_sql}{where}"
+                    f" ORDER BY rowid {orden} LIMIT ?")
+        parametros.append(self.filas_por_pagina)
+        with self.medidor.etapa("pagina"):
+            return self.conn.execute(consulta, parametros).fetchall()
+
+    def filtrar(self, filtro):
+        # filtro: (condición SQL, parámetros) o None para mostrar todo
+        self.filtro = filtro
+        self.recargar()
+
+    def recargar(self):
+        self._limpiar()
+        where, parametros = self._where([], [])
+        with self.medidor.etapa("conteo"):
+            total = self.conn.execute(f"SELECT COUNT(*) FROM {self.tabla_sql}{where}", parametros).fetchone()[0]
+        self.estado.config(text=f"Total de registros: {total}")
+        self._cargar_siguientes()
+
+    def _primera_visible(self):
+        return self.tree.yview()[0] * len(self.tree.get_children())
+
+    def _cargar_siguientes(self):
+        filas = self._consultar(">", "ASC", self.ultimo)
+        if len(filas) < self.filas_por_pagina:
+            self.hay_siguientes = False
+        if not filas:
+            return
+
+        visible = self._primera_visible()
+        with self.medidor.etapa("dibujo"):
+            for fila in filas:
+                self.tree.insert("", "end", iid=str(fila[0]), values=fila[1:])
+        self.ultimo = filas[-1][0]
+        if self.primero is None:
+            self.primero = filas[0][0]
+
+        # Descartar las filas más antiguas para mantener la ventana acotada
+        items = self.tree.get_children()
+        sobrantes = len(items) - self.max_filas
+        if sobrantes > 0:
+            self.tree.delete(*items[:sobrantes])
+            self.primero = int(items[sobrantes])
+            self.hay_anteriores = True
+            self.tree.yview_moveto(max(visible - sobrantes, 0) / self.max_filas)
+
+    def _cargar_anteriores(self):
+        filas = self._consultar("<", "DESC", self.primero)
+        if len(filas) < self.filas_por_pagina:
+            self.hay_anteriores = False
+        if not filas:
+            return
+
+        visible = self._primera_visible()
+        with self.medidor.etapa("dibujo"):
+            for fila in filas:
+                self.tree.insert("", 0, iid=str(fila[0]), values=fila[1:])
+        self.primero = filas[-1][0]
+
+        items = self.tree.get_children()
+        sobrantes = len(items) - self.max_filas
+        if sobrantes > 0:
+            self.tree.delete(*items[-sobrantes:])
+            self.ultimo = int(items[-sobrantes - 1])
+            self.hay_siguientes = True
+        self.tree.yview_moveto((visible + len(filas)) / len(self.tree.get_children()))
+
+    def _al_desplazar(self, primero, ultimo):
+        self.barra.set(primero, ultimo)
+        if self._cargando:
+            return
+
+        # Precargar la página siguiente o anterior al acercarse a un borde
+        if float(ultimo) >= 0.8 and self.hay_siguientes and self.ultimo is not None:
+            self._cargando = True
+            self.tree.after_idle(self._cargar_borde, self._cargar_siguientes)
+        elif float(primero) <= 0.2 and self.hay_anteriores:
+            self._cargando = True
+            self.tree.after_idle(self._cargar_borde, self._cargar_anteriores)
+
+    def _cargar_borde(self, cargar):
+        try:
+            cargar()
+        finally:
+            self._cargando = False
+
+    def _al_destruir(self, evento):
+        if evento.widget is self.frame and self.medidor.etapas:
+            self.medidor.finalizar(filtro=bool(self.filtro))
+
+class SelectorCurso:
+    # Campo de búsqueda de cursos con sugerencias mientras se escribe. Cada
+    # búsqueda es una consulta por prefijo de código o nombre con un límite
+    # de resultados, así el selector responde igual con diez cursos que con
+    # miles. Al elegir una sugerencia queda el ID del curso en curso_id
+    def __init__(self, padre, sistema, limite=20, filas_visibles=6):
+        self.sistema = sistema
+        self.limite = limite
+        self.curso_id = None
+        self._sugerencias = []
+        self._pendiente = None
+
+        self.frame = ttk.Frame(padre, style='TFrame')
+        self.entrada = ttk.Entry(self.frame, width=40, style='TEntry')
+        self.entrada.pack(fill=tk.X)
+        self.lista = tk.Listbox(self.frame, height=filas_visibles, exportselection=False)
+        self.lista.pack(fill=tk.X)
+
+        self.entrada.bind('<KeyRelease>', self._al_escribir)
+        self.entrada.bind('<Return>', self._elegir_primero)
+        self.lista.bind('<<ListboxSelect>>', self._al_elegir)
+
+    def texto(self):
+        return self.entrada.get().strip()
+
+    def _al_escribir(self, evento):
+        if evento.keysym in ("Return", "Tab", "Up", "Down", "Left", "Right"):
+            return
+        # Lo escrito deja de corresponder al curso elegido hasta volver a elegir
+        self.curso_id = None
+        if self._pendiente:
+            self.frame.after_cancel(self._pendiente)
+        self._pendiente = self.frame.after(150, self._buscar)
+
+    def _buscar(self):
+        self._pendiente = None
+        try:
+            self._sugerencias = self.sistema.buscar_cursos(self.texto(), self.limite)
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"No se pudieron buscar los cursos: {e}")
+            return
+
+        self.lista.delete(0, tk.END)
+        for curso_id, nombre, codigo in self._sugerencias:
+            self.lista.insert(tk.END, f"{codigo} - {nombre}")
+
+    def _al_elegir(self, evento=None):
+        seleccion = self.lista.curselection()
+        if not seleccion:
+            return
+        curso_id, nombre, codigo = self._sugerencias[seleccion[0]]
+        self.curso_id = curso_id
+        self.entrada.delete(0, tk.END)
+        self.entrada.insert(0, f"{nombre} ({codigo})")
+
+    def _elegir_primero(self, evento):
+        # Enter elige la primera sugerencia de lo escrito hasta ahora
+        if self._pendiente:
+            self.frame.after_cancel(self._pendiente)
+            self._buscar()
+        if self._sugerencias and self.curso_id is None:
+            self.lista.selection_clear(0, tk.END)
+            self.lista.selection_set(0)
+            self._al_elegir()
 
 class UnexcaCertificateSystem:
     def __init__(self, root):
@@ -17,9 +231,6 @@ class UnexcaCertificateSystem:
         self.root.configure(bg='#ECEFF1')
         self.root.resizable(False, False)
 
-        # Crear directorios necesarios
-        self.crear_directorios()
-
         # Configuración de estilos
         self.configurar_estilos()
 
@@ -29,18 +240,6 @@ class UnexcaCertificateSystem:
         # Crear interfaz principal
         self.crear_interfaz_principal()
 
-    def crear_directorios(self):
-        directorios = [
-            "bases_datos", 
-            "certificados", 
-            "templates", 
-            "fonts", 
-            "logs",
-            "exports"
-        ]
-        for directorio in directorios:
-            os.makedirs(directorio, exist_ok=True)
-
     def configurar_estilos(self):
         self.colores = {
             'fondo_principal': '#ECEFF1',
@@ -78,45 +277,11 @@ class UnexcaCertificateSystem:
         estilo.configure('TEntry', bordercolor=self.colores['bordes'], relief="flat")
 
     def inicializar_base_datos(self):
-        db_path = os.path.join('bases_datos', 'unexca_certificados.db')
-        
         try:
-            self.conn = sqlite3.connect(db_path)
-            self.cursor = self.conn.cursor()
-
-            self.cursor.executescript('''
-                CREATE TABLE IF NOT EXISTS estudiantes (
-                    id TEXT PRIMARY KEY,
-                    nombre TEXT NOT NULL,
-                    apellido TEXT NOT NULL,
-                    cedula TEXT UNIQUE,
-                    email TEXT,
-                    fecha_registro DATETIME DEFAULT CURRENT_TIMESTAMP
-                );
-
-                CREATE TABLE IF NOT EXISTS cursos (
-                    id TEXT PRIMARY KEY,
-                    nombre TEXT NOT NULL,
-                    codigo TEXT UNIQUE,
-                    area TEXT,
-                    duracion TEXT,
-                    descripcion TEXT,
-                    instructor TEXT,
-                    fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP
-                );
-
-                CREATE TABLE IF NOT EXISTS certificados (
-                    id TEXT PRIMARY KEY,
-                    estudiante_id TEXT,
-                    curso_id TEXT,
-                    fecha_emision DATETIME,
-                    archivo_certificado TEXT,
-                    FOREIGN KEY(estudiante_id) REFERENCES estudiantes(id),
-                    FOREIGN KEY(curso_id) REFERENCES cursos(id)
-                );
-            ''')
-            
-            self.conn.commit()
+            # Crea los directorios necesarios y aplica las migraciones
+            self.sistema = SistemaCertificados()
+            self.conn = self.sistema.conn
+            self.cursor = self.sistema.cursor
             
         except sqlite3.Error as e:
             messagebox.showerror("Error de Base de Datos", f"No se pudo inicializar la base de datos: {e}")
@@ -188,51 +353,51 @@ class UnexcaCertificateSystem:
         for texto, comando in botones:
             ttk.Button(frame_botones, text=texto, command=comando, style='primary.TButton').pack(side=tk.LEFT, padx=5)
 
+        # Búsqueda mientras se escribe
+        frame_busqueda = ttk.Frame(ventana_estudiantes, style='TFrame')
+        frame_busqueda.pack(padx=20, fill=tk.X)
+
+        ttk.Label(frame_busqueda, text="Buscar", style='TLabel').pack(side=tk.LEFT, padx=5)
+        entrada_busqueda = ttk.Entry(frame_busqueda, width=50, style='TEntry')
+        entrada_busqueda.pack(side=tk.LEFT, padx=5)
+
+        # Se espera a que el usuario deje de escribir antes de consultar
+        pendiente = [None]
+
+        def al_escribir(evento):
+            if pendiente[0]:
+                ventana_estudiantes.after_cancel(pendiente[0])
+            pendiente[0] = ventana_estudiantes.after(
+                250, lambda: self.buscar_estudiantes(tabla, entrada_busqueda.get())
+            )
+
+        entrada_busqueda.bind('<KeyRelease>', al_escribir)
+
         # Tabla de estudiantes
-        columns = ("ID", "Nombre", "Apellido", "Cédula", "Email")
-        tabla = ttk.Treeview(ventana_estudiantes, columns=columns, show="headings")
-        
-        for col in columns:
-            tabla.heading(col, text=col)
-            tabla.column(col, width=150, anchor=tk.CENTER)
-        
-        tabla.pack(expand=True, fill=tk.BOTH, padx=20, pady=10)
+        tabla = TablaPaginada(
+            ventana_estudiantes,
+            self.conn,
+            "estudiantes",
+            ("id", "nombre", "apellido", "cedula", "email"),
+            ("ID", "Nombre", "Apellido", "Cédula", "Email")
+        )
 
         # Cargar estudiantes iniciales
         self.cargar_estudiantes(tabla)
 
     def registrar_estudiante(self, entradas):
-        # Validaciones básicas
-        datos = {}
-        for campo, entrada in entradas.items():
-            valor = entrada.get().strip()
-            if not valor:
-                messagebox.showerror("Error", f"El campo {campo} no puede estar vacío")
-                return
-            datos[campo] = valor
-
-        # Validar email
-        if not re.match(r"[^@]+@[^@]+\.[^@]+", datos['email']):
-            messagebox.showerror("Error", "Email inválido")
-            return
-
-        # Generar ID único
-        estudiante_id = str(uuid.uuid4())
+        datos = {campo: entrada.get().strip() for campo, entrada in entradas.items()}
         
         try:
-            self.cursor.execute('''
-                INSERT INTO estudiantes (id, nombre, apellido, cedula, email) 
-                VALUES (?, ?, ?, ?, ?)
-            ''', (estudiante_id, datos['nombre'], datos['apellido'], 
-                  datos['cedula'], datos['email']))
-            
-            self.conn.commit()
+            self.sistema.registrar_estudiante(datos)
             messagebox.showinfo("Éxito", "Estudiante registrado correctamente")
             
             # Limpiar entradas
             for entrada in entradas.values():
                 entrada.delete(0, tk.END)
         
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
         except sqlite3.IntegrityError:
             messagebox.showerror("Error", "Ya existe un estudiante con esta cédula")
         except Exception as e:
@@ -240,23 +405,22 @@ class UnexcaCertificateSystem:
 
     def cargar_estudiantes(self, tabla=None):
         try:
-            self.cursor.execute("SELECT * FROM estudiantes")
-            estudiantes = self.cursor.fetchall()
-
             if tabla:
-                # Limpiar tabla
-                for i in tabla.get_children():
-                    tabla.delete(i)
-                
-                # Insertar estudiantes
-                for estudiante in estudiantes:
-                    tabla.insert("", "end", values=estudiante)
-            
-            return estudiantes
+                # La tabla solo consulta las páginas que muestra
+                tabla.recargar()
+                return
+
+            return list(self.sistema.listar_estudiantes())
         
         except Exception as e:
             messagebox.showerror("Error", f"No se pudieron cargar los estudiantes: {e}")
 
+    def buscar_estudiantes(self, tabla, texto):
+        try:
+            tabla.filtrar(self.sistema.filtro_busqueda(texto))
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudo realizar la búsqueda: {e}")
+
     def importar_estudiantes_excel(self):
         archivo = filedialog.askopenfilename(
             filetypes=[("Archivos Excel", "*.xlsx *.xls")]
@@ -266,30 +430,42 @@ class UnexcaCertificateSystem:
             return
 
         try:
-            wb = openpyxl.load_workbook(archivo)
-            hoja = wb.active
-
-            for fila in hoja.iter_rows(min_row=2, values_only=True):
-                if len(fila) >= 4:
-                    nombre, apellido, cedula, email = fila[:4]
-                    
-                    estudiante_id = str(uuid.uuid4())
-                    
-                    try:
-                        self.cursor.execute('''
-                            INSERT INTO estudiantes (id, nombre, apellido, cedula, email) 
-                            VALUES (?, ?, ?, ?, ?)
-                        ''', (estudiante_id, nombre, apellido, cedula, email))
-                    except sqlite3.IntegrityError:
-                        # Omitir registros duplicados
-                        continue
-
-            self.conn.commit()
-            messagebox.showinfo("Éxito", "Estudiantes importados correctamente")
+            resultado = self.sistema.importar_estudiantes_excel(archivo)
+            messagebox.showinfo(
+                "Éxito",
+                "Estudiantes importados correctamente\n\n"
+                f"Insertados: {resultado['insertadas']}\n"
+                f"Rechazados (inválidos, repetidos o ya registrados): {resultado['rechazadas']}\n"
+                + (f"Registrados por otra importación en curso: {resultado['omitidas']}\n" if resultado['omitidas'] else "")
+                + f"Velocidad: {resultado['filas_por_segundo']:.0f} filas/s"
+                + (f"\n\nDetalle de las filas no importadas:\n{resultado['reporte']}" if resultado['reporte'] else "")
+            )
         
         except Exception as e:
             messagebox.showerror("Error", f"No se pudieron importar los estudiantes: {e}")
 
+    def importar_inscripciones_excel(self):
+        archivo = filedialog.askopenfilename(
+            filetypes=[("Archivos Excel", "*.xlsx *.xls")]
+        )
+
+        if not archivo:
+            return
+
+        try:
+            resultado = self.sistema.importar_inscripciones_excel(archivo)
+            messagebox.showinfo(
+                "Éxito",
+                "Inscripciones importadas correctamente\n\n"
+                f"Inscritas o actualizadas: {resultado['inscritas']}\n"
+                f"Rechazadas: {resultado['rechazadas']}\n"
+                f"Velocidad: {resultado['filas_por_segundo']:.0f} filas/s"
+                + (f"\n\nDetalle de las filas no importadas:\n{resultado['reporte']}" if resultado['reporte'] else "")
+            )
+
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudieron importar las inscripciones: {e}")
+
     def abrir_gestion_cursos(self):
         ventana_cursos = tk.Toplevel(self.root)
         ventana_cursos.title("Gestión de Cursos")
@@ -323,72 +499,47 @@ class UnexcaCertificateSystem:
 
         botones = [
             ("Registrar Curso", lambda: self.registrar_curso(entradas)),
-            ("Cargar Cursos", lambda: self.cargar_cursos(tabla))
+            ("Cargar Cursos", lambda: self.cargar_cursos(tabla)),
+            ("Importar Inscripciones", self.importar_inscripciones_excel)
         ]
 
         for texto, comando in botones:
             ttk.Button(frame_botones, text=texto, command=comando, style='primary.TButton').pack(side=tk.LEFT, padx=5)
 
         # Tabla de cursos
-        columns = ("ID", "Nombre", "Código", "Área", "Duración", "Descripción", "Instructor")
-        tabla = ttk.Treeview(ventana_cursos, columns=columns, show="headings")
-        
-        for col in columns:
-            tabla.heading(col, text=col)
-            tabla.column(col, width=150, anchor=tk.CENTER)
-        
-        tabla.pack(expand=True, fill=tk.BOTH, padx=20, pady=10)
+        tabla = TablaPaginada(
+            ventana_cursos,
+            self.conn,
+            "cursos",
+            ("id", "nombre", "codigo", "area", "duracion", "descripcion", "instructor"),
+            ("ID", "Nombre", "Código", "Área", "Duración", "Descripción", "Instructor")
+        )
 
         # Cargar cursos iniciales
         self.cargar_cursos(tabla)
 
     def registrar_curso(self, entradas):
-        # Validaciones básicas
-        datos = {}
-        for campo, entrada in entradas.items():
-            valor = entrada.get().strip()
-            if not valor:
-                messagebox.showerror("Error", f"El campo {campo} no puede estar vacío")
-                return
-            datos[campo] = valor
-
-        # Generar ID único
-        curso_id = str(uuid.uuid4())
+        datos = {campo: entrada.get().strip() for campo, entrada in entradas.items()}
         
         try:
-            self.cursor.execute('''
-                INSERT INTO cursos (id, nombre, codigo, area, duracion, descripcion, instructor) 
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (curso_id, datos['nombre'], datos['codigo'], datos['area'], 
-                  datos['duracion'], datos['descripcion'], datos['instructor']))
-            
-            self.conn.commit()
+            self.sistema.registrar_curso(datos)
             messagebox.showinfo("Éxito", "Curso registrado correctamente")
             
             # Limpiar entradas
             for entrada in entradas.values():
                 entrada.delete(0, tk.END)
         
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
         except sqlite3.IntegrityError:
             messagebox.showerror("Error", "Ya existe un curso con este código")
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo registrar el curso: {e}")
 
-    def cargar_cursos(self, tabla=None):
+    def cargar_cursos(self, tabla):
         try:
-            self.cursor.execute("SELECT * FROM cursos")
-            cursos = self.cursor.fetchall()
-
-            if tabla:
-                # Limpiar tabla
-                for i in tabla.get_children():
-                    tabla.delete(i)
-                
-                # Insertar cursos
-                for curso in cursos:
-                    tabla.insert("", "end", values=curso)
-            
-            return cursos
+            # La tabla solo consulta las páginas que muestra
+            tabla.recargar()
         
         except Exception as e:
             messagebox.showerror("Error", f"No se pudieron cargar los cursos: {e}")
@@ -396,101 +547,324 @@ class UnexcaCertificateSystem:
     def abrir_generacion_certificados(self):
         ventana_certificados = tk.Toplevel(self.root)
         ventana_certificados.title("Generación de Certificados")
-        ventana_certificados.geometry("600x400")
+        ventana_certificados.geometry("600x520")
         ventana_certificados.configure(bg='#ECEFF1')
 
         # Frame para selección de curso
         frame_seleccion = ttk.Frame(ventana_certificados, style='TFrame')
         frame_seleccion.pack(pady=20, padx=20, fill=tk.X)
 
-        ttk.Label(frame_seleccion, text="Seleccionar Curso:", style='TLabel').grid(row=0, column=0, padx=5, pady=5)
-        cursos_combo = ttk.Combobox(frame_seleccion, state="readonly")
-        cursos_combo.grid(row=0, column=1, padx=5, pady=5)
+        # Se escribe parte del código o del nombre y se elige una sugerencia
+        ttk.Label(frame_seleccion, text="Buscar Curso:", style='TLabel').grid(
+            row=0, column=0, padx=5, pady=5, sticky=tk.N
+        )
+        selector_curso = SelectorCurso(frame_seleccion, self.sistema)
+        selector_curso.frame.grid(row=0, column=1, padx=5, pady=5, sticky=tk.W)
+
+        # Número de procesos de trabajo
+        ttk.Label(frame_seleccion, text="Procesos:", style='TLabel').grid(row=1, column=0, padx=5, pady=5)
+        procesos_spin = ttk.Spinbox(frame_seleccion, from_=1, to=max(64, self.sistema.procesos_generacion), width=5)
+        procesos_spin.set(self.sistema.procesos_generacion)
+        procesos_spin.grid(row=1, column=1, padx=5, pady=5, sticky=tk.W)
+
+        # Un PDF de varias páginas por curso en lugar de un archivo por estudiante
+        combinado = tk.BooleanVar(value=self.sistema.modo_salida == "combinado")
+        ttk.Checkbutton(frame_seleccion, text="Un solo PDF por curso", variable=combinado).grid(
+            row=2, column=1, padx=5, pady=5, sticky=tk.W
+        )
+
+        # Plantilla de templates/ y formato de salida del motor de imágenes
+        sin_plantilla = "Sin plantilla"
+        ttk.Label(frame_seleccion, text="Plantilla:", style='TLabel').grid(row=3, column=0, padx=5, pady=5)
+        plantilla_combo = ttk.Combobox(frame_seleccion, state="readonly")
+        plantilla_combo['values'] = [sin_plantilla] + listar_plantillas()
+        plantilla_combo.set(self.sistema.plantilla or sin_plantilla)
+        plantilla_combo.grid(row=3, column=1, padx=5, pady=5)
+
+        ttk.Label(frame_seleccion, text="Formato:", style='TLabel').grid(row=4, column=0, padx=5, pady=5)
+        formato_combo = ttk.Combobox(frame_seleccion, state="readonly", width=8)
+        formato_combo['values'] = list(FORMATOS_PLANTILLA)
+        formato_combo.set(self.sistema.formato_plantilla)
+        formato_combo.grid(row=4, column=1, padx=5, pady=5, sticky=tk.W)
+
+        # Progreso de la generación
+        frame_progreso = ttk.Frame(ventana_certificados, style='TFrame')
+        frame_progreso.pack(pady=10, padx=20, fill=tk.X)
+
+        barra_progreso = ttk.Progressbar(frame_progreso, mode='determinate', maximum=1)
+        barra_progreso.pack(fill=tk.X, pady=5)
+        estado = ttk.Label(frame_progreso, text="", style='TLabel')
+        estado.pack(pady=5)
+
+        progreso = {
+            'ventana': ventana_certificados,
+            'barra': barra_progreso,
+            'estado': estado,
+            'cola': None,
+            'cancelar': None
+        }
 
-        # Cargar cursos en el combobox
-        cursos = self.cargar_cursos()
-        cursos_combo['values'] = [f"{curso[1]} ({curso[2]})" for curso in cursos]
+        def generar():
+            try:
+                self.sistema.procesos_generacion = max(1, int(procesos_spin.get()))
+            except ValueError:
+                messagebox.showerror("Error", "Número de procesos inválido")
+                return
+            self.sistema.modo_salida = "combinado" if combinado.get() else "individual"
+            plantilla = plantilla_combo.get()
+            self.sistema.plantilla = None if plantilla == sin_plantilla else plantilla
+            self.sistema.formato_plantilla = formato_combo.get()
+            if self.generar_certificados(selector_curso, progreso):
+                boton_generar.state(['disabled'])
+                boton_cancelar.state(['!disabled'])
+
+        def cancelar():
+            if progreso['cancelar']:
+                progreso['cancelar'].set()
+                estado.config(text="Cancelando...")
+
+        def cerrar():
+            cancelar()
+            ventana_certificados.destroy()
+
+        # Botones para generar y cancelar certificados
+        frame_botones = ttk.Frame(ventana_certificados, style='TFrame')
+        frame_botones.pack(pady=20)
 
-        # Botón para generar certificados
         boton_generar = ttk.Button(
-            ventana_certificados, 
+            frame_botones, 
             text="Generar Certificados", 
-            command=lambda: self.generar_certificados(cursos_combo.get(), cursos),
+            command=generar,
             style='primary.TButton'
         )
-        boton_generar.pack(pady=20)
+        boton_generar.pack(side=tk.LEFT, padx=5)
 
-    def generar_certificados(self, curso_seleccionado, cursos):
-        if not curso_seleccionado:
+        boton_cancelar = ttk.Button(
+            frame_botones, 
+            text="Cancelar", 
+            command=cancelar,
+            style='secondary.TButton'
+        )
+        boton_cancelar.pack(side=tk.LEFT, padx=5)
+        boton_cancelar.state(['disabled'])
+
+        ttk.Button(
+            frame_botones, 
+            text="Exportar ZIP", 
+            command=lambda: self.exportar_certificados_zip(selector_curso, ventana_certificados),
+            style='secondary.TButton'
+        ).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(
+            frame_botones, 
+            text="Exportar Reporte", 
+            command=lambda: self.exportar_reporte_certificados(selector_curso, ventana_certificados),
+            style='secondary.TButton'
+        ).pack(side=tk.LEFT, padx=5)
+
+        progreso['botones'] = (boton_generar, boton_cancelar)
+        ventana_certificados.protocol("WM_DELETE_WINDOW", cerrar)
+
+    def generar_certificados(self, selector_curso, progreso):
+        if progreso['cola'] is not None:
+            messagebox.showerror("Error", "Ya hay una generación en curso")
+            return False
+
+        curso_id = self._id_curso_seleccionado(selector_curso)
+        if not curso_id:
+            return False
+
+        # La generación corre en un hilo aparte y reporta a la interfaz
+        # a través de una cola, que se revisa periódicamente con after()
+        progreso['cola'] = queue.Queue()
+        progreso['cancelar'] = threading.Event()
+        progreso['inicio'] = time.monotonic()
+        progreso['barra'].config(value=0, maximum=1)
+        progreso['estado'].config(text="Preparando generación...")
+
+        hilo = threading.Thread(
+            target=self._ejecutar_generacion,
+            args=(curso_id, self.sistema.procesos_generacion, self.sistema.certificados_por_transaccion,
+                  self.sistema.modo_salida, progreso['cola'], progreso['cancelar']),
+            daemon=True
+        )
+        hilo.start()
+        self._revisar_progreso(progreso)
+        return True
+
+    def _id_curso_seleccionado(self, selector_curso):
+        if not selector_curso.texto():
             messagebox.showerror("Error", "Debe seleccionar un curso")
-            return
-        
-        curso_id = None
-        for curso in cursos:
-            if f"{curso[1]} ({curso[2]})" == curso_seleccionado:
-                curso_id = curso[0]
-                break
-        
+            return None
+
+        if not selector_curso.curso_id:
+            messagebox.showerror("Error", "Elija el curso de la lista de sugerencias")
+        return selector_curso.curso_id
+
+    def exportar_certificados_zip(self, selector_curso, ventana):
+        curso_id = self._id_curso_seleccionado(selector_curso)
         if not curso_id:
-            messagebox.showerror("Error", "Curso no encontrado")
             return
 
-        try:
-            self.cursor.execute("SELECT * FROM estudiantes")
-            estudiantes = self.cursor.fetchall()
-            
-            if not estudiantes:
-                messagebox.showerror("Error", "No hay estudiantes registrados")
+        # La exportación copia miles de archivos: corre en un hilo con su
+        # propia conexión y la ventana solo espera el resultado
+        cola = queue.Queue()
+
+        def exportar():
+            conn = self.sistema.conectar_base_datos()
+            try:
+                cola.put(('fin', exportar_zip(conn, curso_id)))
+            except Exception as e:
+                cola.put(('error', f"No se pudieron exportar los certificados: {e}"))
+            finally:
+                conn.close()
+
+        def al_terminar(mensaje):
+            if mensaje[0] == 'error':
+                messagebox.showerror("Error", mensaje[1], parent=ventana)
+                return
+            resultado = mensaje[1]
+            texto = f"{resultado['archivos']} archivos exportados en {resultado['destino']}"
+            if resultado['faltantes']:
+                texto += f"\n{resultado['faltantes']} archivos no se encontraron en disco"
+            messagebox.showinfo("Éxito", texto, parent=ventana)
+
+        threading.Thread(target=exportar, daemon=True).start()
+        self._esperar_resultado(ventana, cola, al_terminar)
+
+    def exportar_reporte_certificados(self, selector_curso, ventana):
+        # Sin curso seleccionado el reporte incluye todos los certificados.
+        # CSV es el formato por defecto: el más rápido para reportes grandes
+        curso_id = None
+        if selector_curso.texto():
+            curso_id = self._id_curso_seleccionado(selector_curso)
+            if not curso_id:
                 return
 
-            # Generar certificados en PDF
-            for estudiante in estudiantes:
-                self._generar_pdf(estudiante, curso_id)
-            
-            messagebox.showinfo("Éxito", "Certificados generados correctamente")
-        
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudieron generar los certificados: {e}")
+        destino = filedialog.asksaveasfilename(
+            parent=ventana,
+            initialdir="exports",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("Excel", "*.xlsx")]
+        )
+        if not destino:
+            return
+        formato = "xlsx" if destino.lower().endswith(".xlsx") else "csv"
+
+        cola = queue.Queue()
+
+        def exportar():
+            conn = self.sistema.conectar_base_datos()
+            try:
+                cola.put(('fin', exportar_reporte(conn, formato, curso_id, destino=destino)))
+            except Exception as e:
+                cola.put(('error', f"No se pudo exportar el reporte: {e}"))
+            finally:
+                conn.close()
+
+        def al_terminar(mensaje):
+            if mensaje[0] == 'error':
+                messagebox.showerror("Error", mensaje[1], parent=ventana)
+                return
+            resultado = mensaje[1]
+            messagebox.showinfo(
+                "Éxito",
+                f"{resultado['filas']} certificados exportados en {resultado['destino']}",
+                parent=ventana
+            )
 
-    def _generar_pdf(self, estudiante, curso_id):
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
+        threading.Thread(target=exportar, daemon=True).start()
+        self._esperar_resultado(ventana, cola, al_terminar)
 
-        pdf.cell(200, 10, txt="CERTIFICADO DE PARTICIPACIÓN", ln=True, align='C')
-        pdf.ln(10)
-        
-        pdf.cell(200, 10, txt=f"Certificamos que {estudiante[1]} {estudiante[2]}", ln=True, align='C')
-        pdf.cell(200, 10, txt=f"con cédula {estudiante[3]}", ln=True, align='C')
-        pdf.cell(200, 10, txt=f"ha completado satisfactoriamente el curso:", ln=True, align='C')
-        pdf.ln(10)
-        
-        self.cursor.execute("SELECT nombre, codigo FROM cursos WHERE id = ?", (curso_id,))
-        curso = self.cursor.fetchone()
-        if curso:
-            pdf.cell(200, 10, txt=f"{curso[0]} ({curso[1]})", ln=True, align='C')
-        
-        pdf.ln(20)
-        pdf.cell(200, 10, txt=f"Fecha: {datetime.now().strftime('%Y-%m-%d')}", ln=True, align='C')
+    def _esperar_resultado(self, ventana, cola, al_terminar):
+        if not ventana.winfo_exists():
+            return
+        try:
+            mensaje = cola.get_nowait()
+        except queue.Empty:
+            ventana.after(100, self._esperar_resultado, ventana, cola, al_terminar)
+            return
+        al_terminar(mensaje)
 
-        # Guardar el PDF
-        archivo_certificado = f"certificados/{estudiante[1]}_{estudiante[2]}_{curso[1]}.pdf"
-        pdf.output(archivo_certificado)
-        
-        # Registrar el certificado en la base de datos
-        certificado_id = str(uuid.uuid4())
-        fecha_emision = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        self.cursor.execute('''
-            INSERT INTO certificados (id, estudiante_id, curso_id, fecha_emision, archivo_certificado) 
-            VALUES (?, ?, ?, ?, ?)
-        ''', (certificado_id, estudiante[0], curso_id, fecha_emision, archivo_certificado))
+    def _revisar_progreso(self, progreso):
+        if not progreso['ventana'].winfo_exists():
+            return
+
+        mensaje = None
+        try:
+            while True:
+                mensaje = progreso['cola'].get_nowait()
+                if mensaje[0] != 'progreso':
+                    break
+                self._mostrar_progreso(progreso, *mensaje[1:])
+        except queue.Empty:
+            pass
+
+        if mensaje is None or mensaje[0] == 'progreso':
+            progreso['ventana'].after(100, self._revisar_progreso, progreso)
+            return
+
+        # La generación terminó: liberar la ventana para una nueva corrida
+        progreso['cola'] = None
+        progreso['cancelar'] = None
+        boton_generar, boton_cancelar = progreso['botones']
+        boton_generar.state(['!disabled'])
+        boton_cancelar.state(['disabled'])
+
+        if mensaje[0] == 'error':
+            progreso['estado'].config(text="")
+            messagebox.showerror("Error", mensaje[1], parent=progreso['ventana'])
+        elif mensaje[0] == 'cancelado':
+            self._mostrar_progreso(progreso, mensaje[1], mensaje[3], mensaje[2] + mensaje[3])
+            messagebox.showinfo("Cancelado", f"Generación cancelada: {mensaje[1]} de {mensaje[2]} certificados generados", parent=progreso['ventana'])
+        elif mensaje[2] == 0:
+            progreso['estado'].config(text="")
+            messagebox.showinfo("Sin cambios", f"Los {mensaje[3]} certificados de este curso ya fueron emitidos", parent=progreso['ventana'])
+        else:
+            self._mostrar_progreso(progreso, mensaje[1], mensaje[3], mensaje[2] + mensaje[3])
+            texto = "Certificados generados correctamente"
+            if mensaje[3]:
+                texto += f" ({mensaje[3]} ya emitidos fueron omitidos)"
+            messagebox.showinfo("Éxito", texto, parent=progreso['ventana'])
+
+    def _mostrar_progreso(self, progreso, generados, omitidos, total):
+        # Los ya emitidos avanzan la barra pero no la velocidad: al reanudar
+        # una corrida se omiten miles en un instante
+        hechos = generados + omitidos
+        transcurrido = max(time.monotonic() - progreso['inicio'], 1e-6)
+        velocidad = generados / transcurrido
+        if velocidad > 0:
+            restante = int((total - hechos) / velocidad)
+            eta = f"{restante // 3600:d}:{restante % 3600 // 60:02d}:{restante % 60:02d}"
+        else:
+            eta = "--:--:--"
+
+        texto = f"{hechos} de {total} certificados"
+        if omitidos:
+            texto += f" ({omitidos} ya emitidos)"
+        progreso['barra'].config(value=hechos, maximum=max(total, 1))
+        progreso['estado'].config(text=f"{texto}  |  {velocidad:.1f} cert/s  |  ETA {eta}")
+
+    def _ejecutar_generacion(self, curso_id, procesos, por_transaccion, modo, cola, cancelar):
+        try:
+            resultado = self.sistema.generar_certificados(
+                curso_id,
+                procesos=procesos,
+                por_transaccion=por_transaccion,
+                modo=modo,
+                progreso=lambda generados, omitidos, total: cola.put(('progreso', generados, omitidos, total)),
+                cancelar=cancelar
+            )
+            cola.put((resultado['estado'], resultado['generados'], resultado['total'], resultado['omitidos']))
         
-        self.conn.commit()
+        except ValueError as e:
+            cola.put(('error', str(e)))
+        except Exception as e:
+            cola.put(('error', f"No se pudieron generar los certificados: {e}"))
 
     def __del__(self):
-        if hasattr(self, 'conn'):
-            self.conn.close()
+        if hasattr(self, 'sistema'):
+            self.sistema.cerrar()
 
 def main():
     root = tk.Tk()
@@ -0,0 +1,238 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+try:
+    import resource
+except ImportError:
+    # Windows no tiene el módulo resource: el pico de memoria no se informa
+    resource = None
+
+import openpyxl
+import nucleo
+from nucleo import SistemaCertificados
+from verificacion import enlace_verificacion
+
+# Tamaños por defecto de los conjuntos sintéticos
+TAMANOS = [1_000, 10_000, 100_000, 1_000_000]
+
+NOMBRES = ["José", "María", "Luis", "Ana", "Carlos", "Lucía", "Andrés", "Sofía", "Ñeri", "Inés"]
+APELLIDOS = ["Pérez", "Gómez", "Rodríguez", "Núñez", "Hernández", "Díaz", "Muñoz", "Rojas"]
+
+def rss_pico_kb():
+    if resource is None:
+        return None
+    # ru_maxrss viene en KB en Linux y en bytes en macOS
+    propio = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    hijos = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    pico = max(propio, hijos)
+    return pico // 1024 if sys.platform == "darwin" else pico
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+def crear_excel(ruta, filas, semilla):
+    # Modo de solo escritura: el libro se genera sin mantenerlo en memoria
+    azar = random.Random(semilla)
+    wb = openpyxl.Workbook(write_only=True)
+    hoja = wb.create_sheet()
+    hoja.append(["Nombre", "Apellido", "Cédula", "Email"])
+    for i in range(filas):
+        nombre = azar.choice(NOMBRES)
+        apellido = azar.choice(APELLIDOS)
+        hoja.append([nombre, apellido, f"V-{10_000_000 + i}", f"estudiante{i}@unexca.edu.ve"])
+    wb.save(ruta)
+
+def medir_importacion(sistema, archivo):
+    inicio = time.perf_counter()
+    resultado = sistema.importar_estudiantes_excel(archivo)
+    duracion = time.perf_counter() - inicio
+    return {
+        "segundos": round(duracion, 3),
+        "filas_por_segundo": round(resultado["leidas"] / duracion, 1),
+        "insertadas": resultado["insertadas"],
+        "etapas": resultado["etapas"],
+        "rss_pico_kb": rss_pico_kb()
+    }
+
+def medir_listado(sistema, filas_por_pagina=100):
+    # Listado completo, como cargar_estudiantes sin tabla
+    inicio = time.perf_counter()
+    total = sum(1 for _ in sistema.listar_estudiantes())
+    completo = time.perf_counter() - inicio
+
+    # Páginas por clave, como TablaPaginada al abrir la ventana y al desplazarse
+    latencias = []
+    ultimo = 0
+    for _ in range(50):
+        inicio = time.perf_counter()
+        filas = sistema.conn.execute(
+            "SELECT rowid, id, nombre, apellido, cedula, email FROM estudiantes "
+            "WHERE rowid > ? ORDER BY rowid LIMIT ?",
+            (ultimo, filas_por_pagina)
+        ).fetchall()
+        latencias.append(time.perf_counter() - inicio)
+        if len(filas) < filas_por_pagina:
+            break
+        ultimo = filas[-1][0]
+
+    return {
+        "filas": total,
+        "listado_completo_segundos": round(completo, 3),
+        "pagina_p50_ms": round(percentil(latencias, 50) * 1000, 3),
+        "pagina_p99_ms": round(percentil(latencias, 99) * 1000, 3),
+        "rss_pico_kb": rss_pico_kb()
+    }
+
+def medir_generacion(sistema, procesos, muestra):
+    curso_id = str(uuid.uuid4())
+    sistema.cursor.execute(
+        "INSERT INTO cursos (id, nombre, codigo) VALUES (?, ?, ?)",
+        (curso_id, "Curso de prueba", f"BENCH-{curso_id[:8]}")
+    )
+    # Todos los estudiantes aprobados: la corrida genera uno por estudiante
+    sistema.cursor.execute(
+        "INSERT INTO inscripciones (curso_id, estudiante_id, estado) SELECT ?, id, ? FROM estudiantes",
+        (curso_id, nucleo.ESTADO_APROBADO)
+    )
+    sistema.conn.commit()
+    curso = ("Curso de prueba", f"BENCH-{curso_id[:8]}")
+
+    # Latencia por certificado: render en serie de una muestra
+    fecha = datetime.now().strftime('%Y-%m-%d')
+    latencias = []
+    for estudiante in sistema.conn.execute("SELECT * FROM estudiantes LIMIT ?", (muestra,)):
+        inicio = time.perf_counter()
+        certificado_id = str(uuid.uuid4())
+        archivo = nucleo._renderizar_certificado(
+            (estudiante, curso, fecha, certificado_id, enlace_verificacion(certificado_id), None)
+        )
+        latencias.append(time.perf_counter() - inicio)
+        os.remove(archivo)
+
+    # Rendimiento de la corrida completa con el pool de procesos
+    inicio = time.perf_counter()
+    resultado = sistema.generar_certificados(curso_id, procesos=procesos)
+    duracion = time.perf_counter() - inicio
+
+    return {
+        "procesos": procesos,
+        "certificados": resultado["generados"],
+        "segundos": round(duracion, 3),
+        "certificados_por_segundo": round(resultado["generados"] / duracion, 1),
+        "latencia_p50_ms": round(percentil(latencias, 50) * 1000, 3),
+        "latencia_p99_ms": round(percentil(latencias, 99) * 1000, 3),
+        "latencia_media_ms": round(statistics.mean(latencias) * 1000, 3) if latencias else None,
+        "etapas": resultado["etapas"],
+        "rss_pico_kb": rss_pico_kb()
+    }
+
+def ejecutar_tamano(tamano, args):
+    # Cada tamaño corre en un directorio temporal propio, con su base de datos
+    directorio = tempfile.mkdtemp(prefix=f"bench_{tamano}_")
+    anterior = os.getcwd()
+    try:
+        os.chdir(directorio)
+        archivo = os.path.join(directorio, "estudiantes.xlsx")
+
+        inicio = time.perf_counter()
+        crear_excel(archivo, tamano, args.semilla)
+        creacion = time.perf_counter() - inicio
+
+        sistema = SistemaCertificados()
+        resultado = {
+            "tamano": tamano,
+            "creacion_excel_segundos": round(creacion, 3),
+            "importacion": medir_importacion(sistema, archivo),
+            "listado": medir_listado(sistema)
+        }
+        if tamano <= args.generar_hasta:
+            resultado["generacion"] = medir_generacion(sistema, args.procesos, min(tamano, args.muestra))
+        else:
+            resultado["generacion"] = None
+        sistema.cerrar()
+        return resultado
+    finally:
+        os.chdir(anterior)
+        if not args.conservar:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+def version_repositorio():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de importación, listado y generación")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS)
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--generar-hasta", type=int, default=10_000,
+                        help="tamaño máximo para el que se mide la generación de certificados")
+    parser.add_argument("--muestra", type=int, default=200,
+                        help="certificados renderizados en serie para medir la latencia")
+    parser.add_argument("--semilla", type=int, default=1234)
+    parser.add_argument("--salida", help="archivo JSON de resultados")
+    parser.add_argument("--conservar", action="store_true", help="no borrar los directorios temporales")
+    parser.add_argument("--un-tamano", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.un_tamano:
+        print(json.dumps(ejecutar_tamano(args.un_tamano, args)))
+        return 0
+
+    # Cada tamaño corre en un proceso aparte para que el pico de memoria
+    # de uno no contamine la medición del siguiente
+    resultados = []
+    for tamano in args.tamanos:
+        comando = [sys.executable, os.path.abspath(__file__), "--un-tamano", str(tamano),
+                   "--procesos", str(args.procesos), "--generar-hasta", str(args.generar_hasta),
+                   "--muestra", str(args.muestra), "--semilla", str(args.semilla)]
+        if args.conservar:
+            comando.append("--conservar")
+        print(f"Midiendo {tamano} filas...", file=sys.stderr, flush=True)
+        salida = subprocess.run(comando, capture_output=True, text=True, check=True).stdout
+        resultados.append(json.loads(salida.strip().splitlines()[-1]))
+
+    informe = {
+        "fecha": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "version": version_repositorio(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "resultados": resultados
+    }
+
+    salida = args.salida or os.path.join(
+        RAIZ, "benchmarks", "resultados", f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(salida), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as archivo:
+        json.dump(informe, archivo, ensure_ascii=False, indent=2)
+
+    print(json.dumps(informe, ensure_ascii=False, indent=2))
+    print(f"Resultados guardados en {salida}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
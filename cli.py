@@ -0,0 +1,449 @@
+import argparse
+import asyncio
+import csv
+import json
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from nucleo import PERFILES_PDF, SistemaCertificados, atender_cola
+from exportacion import exportar_zip, exportar_reporte, FORMATOS_REPORTE
+from plantillas import FORMATOS_PLANTILLA
+from verificacion import ServicioVerificacion
+from emision import ServicioEmision
+from cola import ClienteCola, ServicioCola
+
+# Códigos de salida
+SALIDA_OK = 0
+SALIDA_ERROR = 1
+SALIDA_USO = 2
+SALIDA_CANCELADO = 3
+
+def emitir(evento, salida=None, **datos):
+    # Una línea JSON por evento para que otros programas puedan seguir la
+    # corrida; por defecto en stderr
+    print(json.dumps({"evento": evento, **datos}, ensure_ascii=False), file=salida or sys.stderr, flush=True)
+
+def buscar_curso(sistema, codigo):
+    # Sin código, None (todos los cursos); un código inexistente termina el
+    # comando con error
+    if not codigo:
+        return None
+    curso = sistema.buscar_curso_por_codigo(codigo)
+    if not curso:
+        raise ValueError(f"No existe un curso con código {codigo}")
+    return curso
+
+def cancelar_con_senales():
+    # Ctrl+C o SIGTERM activan el evento, que detiene la corrida en un
+    # límite de certificado o de lote
+    cancelar = threading.Event()
+    def al_recibir_senal(numero, marco):
+        cancelar.set()
+        emitir("cancelando")
+    signal.signal(signal.SIGINT, al_recibir_senal)
+    signal.signal(signal.SIGTERM, al_recibir_senal)
+    return cancelar
+
+def comando_importar(sistema, args):
+    resultado = sistema.importar_estudiantes_excel(args.archivo)
+    emitir("importacion", salida=sys.stdout, archivo=args.archivo, **resultado)
+    return SALIDA_OK
+
+def comando_importar_inscripciones(sistema, args):
+    resultado = sistema.importar_inscripciones_excel(args.archivo)
+    emitir("importacion_inscripciones", salida=sys.stdout, archivo=args.archivo, **resultado)
+    return SALIDA_OK
+
+def comando_listar(sistema, args):
+    if args.entidad == "estudiantes":
+        encabezados = ["id", "nombre", "apellido", "cedula", "email", "fecha_registro"]
+        filas = sistema.listar_estudiantes()
+    else:
+        encabezados = ["id", "nombre", "codigo", "area", "duracion", "descripcion", "instructor", "fecha_creacion"]
+        filas = sistema.listar_cursos()
+
+    salida = open(args.salida, "w", newline="", encoding="utf-8") if args.salida else sys.stdout
+    try:
+        escritor = csv.writer(salida)
+        escritor.writerow(encabezados)
+        escritor.writerows(filas)
+    finally:
+        if args.salida:
+            salida.close()
+    return SALIDA_OK
+
+def comando_generar(sistema, args):
+    curso = buscar_curso(sistema, args.curso)
+
+    if args.encolar:
+        resultado = sistema.encolar_generacion(
+            curso[0],
+            estudiantes_por_lote=args.estudiantes_por_lote,
+            modo="combinado" if args.combinado else "individual",
+            paginas_por_archivo=args.paginas_por_archivo,
+            plantilla=args.plantilla,
+            formato=args.formato,
+            perfil=args.perfil_pdf
+        )
+        emitir("encolado", salida=sys.stdout, curso=curso[1], codigo=curso[2], **resultado)
+        return SALIDA_OK
+
+    if args.url_verificacion:
+        sistema.url_verificacion = args.url_verificacion
+
+    cancelar = cancelar_con_senales()
+
+    inicio = time.monotonic()
+    ultimo_aviso = [0.0]
+    def progreso(generados, omitidos, total):
+        ahora = time.monotonic()
+        hechos = generados + omitidos
+        if hechos == total or ahora - ultimo_aviso[0] >= args.intervalo:
+            ultimo_aviso[0] = ahora
+            transcurrido = max(ahora - inicio, 1e-6)
+            # La velocidad cuenta solo los generados, no los ya emitidos
+            emitir("progreso", hechos=hechos, total=total, generados=generados, omitidos=omitidos,
+                   certificados_por_segundo=round(generados / transcurrido, 1))
+
+    resultado = sistema.generar_certificados(
+        curso[0],
+        procesos=args.procesos,
+        por_transaccion=args.por_transaccion,
+        progreso=progreso,
+        cancelar=cancelar,
+        modo="combinado" if args.combinado else "individual",
+        paginas_por_archivo=args.paginas_por_archivo,
+        plantilla=args.plantilla,
+        formato=args.formato,
+        perfil=args.perfil_pdf
+    )
+
+    duracion = time.monotonic() - inicio
+    reporte = {
+        "curso_id": curso[0],
+        "curso": curso[1],
+        "codigo": curso[2],
+        "fecha": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "segundos": round(duracion, 3),
+        **resultado
+    }
+    emitir("generacion", salida=sys.stdout, **reporte)
+
+    if args.reporte:
+        with open(args.reporte, "w", encoding="utf-8") as archivo:
+            json.dump(reporte, archivo, ensure_ascii=False, indent=2)
+
+    return SALIDA_CANCELADO if resultado["estado"] == "cancelado" else SALIDA_OK
+
+def comando_atender_cola(sistema, args):
+    if args.coordinador and args.url_verificacion:
+        raise ValueError("Con --coordinador, la dirección de verificación la fija servir-cola")
+    if args.url_verificacion:
+        sistema.url_verificacion = args.url_verificacion
+
+    # Deja de reclamar lotes y cierra los que están en curso
+    cancelar = cancelar_con_senales()
+
+    inicio = time.monotonic()
+    def progreso(hechos, total):
+        emitir("progreso", hechos=hechos, total=total)
+
+    opciones = dict(
+        procesos=args.procesos,
+        concesion=args.concesion,
+        esperar=args.esperar,
+        progreso=progreso,
+        cancelar=cancelar
+    )
+    if args.coordinador:
+        resultado = atender_cola(ClienteCola(args.coordinador), **opciones)
+    else:
+        resultado = sistema.atender_cola(**opciones)
+    emitir("cola", salida=sys.stdout, segundos=round(time.monotonic() - inicio, 3), **resultado)
+    return SALIDA_CANCELADO if resultado["estado"] == "cancelado" else SALIDA_OK
+
+def comando_estado_cola(sistema, args):
+    for resumen in sistema.estado_cola(args.corrida):
+        emitir("estado_cola", salida=sys.stdout, **resumen)
+    return SALIDA_OK
+
+def comando_servir_cola(sistema, args):
+    if args.url_verificacion:
+        sistema.url_verificacion = args.url_verificacion
+
+    servicio = ServicioCola(sistema, host=args.host, puerto=args.puerto)
+
+    async def servir():
+        listo = asyncio.Event()
+        tarea = asyncio.create_task(servicio.servir(listo))
+        await listo.wait()
+        emitir("servicio", host=servicio.host, puerto=servicio.puerto)
+        await tarea
+
+    try:
+        asyncio.run(servir())
+    except KeyboardInterrupt:
+        emitir("servicio_detenido", peticiones=servicio.peticiones)
+    return SALIDA_OK
+
+def comando_regenerar(sistema, args):
+    curso = buscar_curso(sistema, args.curso)
+    curso_id = curso[0] if curso else None
+
+    if args.url_verificacion:
+        sistema.url_verificacion = args.url_verificacion
+
+    cancelar = cancelar_con_senales()
+
+    inicio = time.monotonic()
+    ultimo_aviso = [0.0]
+    def progreso(hechos, total):
+        ahora = time.monotonic()
+        if hechos == total or ahora - ultimo_aviso[0] >= args.intervalo:
+            ultimo_aviso[0] = ahora
+            emitir("progreso", hechos=hechos, total=total)
+
+    resultado = sistema.regenerar_desactualizados(
+        curso_id, procesos=args.procesos, progreso=progreso, cancelar=cancelar
+    )
+    emitir("regeneracion", salida=sys.stdout, curso_id=curso_id,
+           segundos=round(time.monotonic() - inicio, 3), **resultado)
+    return SALIDA_CANCELADO if resultado["estado"] == "cancelado" else SALIDA_OK
+
+def comando_exportar_zip(sistema, args):
+    curso = buscar_curso(sistema, args.curso)
+    curso_id = curso[0] if curso else None
+
+    resultado = exportar_zip(sistema.conn, curso_id, args.desde, args.hasta, args.destino)
+    emitir("exportacion", salida=sys.stdout, **resultado)
+    return SALIDA_OK
+
+def comando_exportar_reporte(sistema, args):
+    curso = buscar_curso(sistema, args.curso)
+    curso_id = curso[0] if curso else None
+
+    inicio = time.monotonic()
+    resultado = exportar_reporte(sistema.conn, args.formato, curso_id, args.desde, args.hasta, args.destino)
+    duracion = max(time.monotonic() - inicio, 1e-6)
+    emitir("reporte", salida=sys.stdout, segundos=round(duracion, 3),
+           filas_por_segundo=round(resultado["filas"] / duracion, 1), **resultado)
+    return SALIDA_OK
+
+def comando_revocar(sistema, args):
+    revocado_en = sistema.revocar_certificado(args.certificado, args.motivo)
+    emitir("revocacion", salida=sys.stdout, certificado_id=args.certificado,
+           revocado_en=revocado_en, motivo=args.motivo)
+    return SALIDA_OK
+
+def comando_servir_verificacion(sistema, args):
+    servicio = ServicioVerificacion(
+        sistema.db_path,
+        host=args.host,
+        puerto=args.puerto,
+        hilos=args.hilos,
+        ttl=args.ttl,
+        intervalo_revocaciones=args.intervalo_revocaciones
+    )
+
+    async def servir():
+        listo = asyncio.Event()
+        tarea = asyncio.create_task(servicio.servir(listo))
+        await listo.wait()
+        emitir("servicio", host=servicio.host, puerto=servicio.puerto)
+        await tarea
+
+    try:
+        asyncio.run(servir())
+    except KeyboardInterrupt:
+        emitir("servicio_detenido", consultas=servicio.consultas, aciertos_cache=servicio.aciertos)
+    return SALIDA_OK
+
+def comando_servir_emision(sistema, args):
+    if args.url_verificacion:
+        sistema.url_verificacion = args.url_verificacion
+    if args.perfil_pdf:
+        sistema.perfil_pdf = args.perfil_pdf
+
+    servicio = ServicioEmision(
+        sistema,
+        host=args.host,
+        puerto=args.puerto,
+        procesos=args.procesos,
+        max_lote=args.max_lote,
+        espera=args.espera_ms / 1000
+    )
+
+    async def servir():
+        listo = asyncio.Event()
+        tarea = asyncio.create_task(servicio.servir(listo))
+        await listo.wait()
+        emitir("servicio", host=servicio.host, puerto=servicio.puerto, procesos=servicio.procesos)
+        await tarea
+
+    try:
+        asyncio.run(servir())
+    except KeyboardInterrupt:
+        emitir("servicio_detenido", peticiones=servicio.peticiones, compartidas=servicio.compartidas,
+               lotes=servicio.lotes, emitidos=servicio.emitidos)
+    return SALIDA_OK
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        description="Sistema de Certificados UNEXCA sin interfaz gráfica"
+    )
+    parser.add_argument("--base-datos", help="ruta de la base de datos SQLite")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    importar = subparsers.add_parser("importar", help="importar estudiantes desde un archivo .xlsx")
+    importar.add_argument("archivo")
+    importar.set_defaults(funcion=comando_importar)
+
+    inscripciones = subparsers.add_parser(
+        "importar-inscripciones",
+        help="importar inscripciones desde un .xlsx con cédula, código del curso y estado"
+    )
+    inscripciones.add_argument("archivo")
+    inscripciones.set_defaults(funcion=comando_importar_inscripciones)
+
+    listar = subparsers.add_parser("listar", help="listar estudiantes o cursos en CSV")
+    listar.add_argument("entidad", choices=["estudiantes", "cursos"])
+    listar.add_argument("--salida", help="archivo CSV de salida (por defecto, la salida estándar)")
+    listar.set_defaults(funcion=comando_listar)
+
+    generar = subparsers.add_parser("generar", help="generar los certificados de un curso")
+    generar.add_argument("--curso", required=True, help="código del curso")
+    generar.add_argument("--procesos", type=int, help="procesos de trabajo (por defecto, uno por núcleo)")
+    generar.add_argument("--por-transaccion", type=int, help="certificados registrados por transacción")
+    generar.add_argument("--combinado", action="store_true",
+                         help="un PDF de varias páginas por curso en lugar de uno por estudiante")
+    generar.add_argument("--paginas-por-archivo", type=int,
+                         help="páginas máximas de cada PDF combinado")
+    generar.add_argument("--plantilla", help="nombre de una plantilla de templates/ (fondo e imagen de texto)")
+    generar.add_argument("--formato", choices=list(FORMATOS_PLANTILLA),
+                         help="formato de los certificados generados con plantilla (por defecto, pdf)")
+    generar.add_argument("--perfil-pdf", choices=PERFILES_PDF,
+                         help="compacto: PDF más livianos con el mismo aspecto (por defecto, estandar)")
+    generar.add_argument("--url-verificacion",
+                         help="dirección del servicio de verificación impresa en el QR, seguida del ID")
+    generar.add_argument("--reporte", help="archivo JSON donde guardar el resumen de la corrida")
+    generar.add_argument("--intervalo", type=float, default=1.0,
+                         help="segundos entre eventos de progreso")
+    generar.add_argument("--encolar", action="store_true",
+                         help="dejar la corrida en la cola de generación para atender-cola en lugar de generar")
+    generar.add_argument("--estudiantes-por-lote", type=int,
+                         help="estudiantes por lote de la cola (en modo combinado, las páginas por archivo)")
+    generar.set_defaults(funcion=comando_generar)
+
+    cola = subparsers.add_parser(
+        "atender-cola",
+        help="generar los lotes de la cola; se pueden ejecutar varios a la vez"
+    )
+    cola.add_argument("--procesos", type=int, help="procesos de trabajo (por defecto, uno por núcleo)")
+    cola.add_argument("--concesion", type=float,
+                      help="segundos que un lote reclamado queda reservado antes de que otro lo retome")
+    cola.add_argument("--esperar", action="store_true",
+                      help="seguir atento a nuevas corridas cuando la cola se vacía")
+    cola.add_argument("--url-verificacion",
+                      help="dirección del servicio de verificación impresa en el QR, seguida del ID")
+    cola.add_argument("--coordinador",
+                      help="dirección de servir-cola, para atender la cola desde otro equipo sin abrir la base")
+    cola.set_defaults(funcion=comando_atender_cola)
+
+    coordinador = subparsers.add_parser(
+        "servir-cola", help="coordinador HTTP de la cola para trabajadores de otros equipos"
+    )
+    coordinador.add_argument("--host", default="127.0.0.1")
+    coordinador.add_argument("--puerto", type=int, default=8082)
+    coordinador.add_argument("--url-verificacion",
+                             help="dirección del servicio de verificación impresa en el QR, seguida del ID")
+    coordinador.set_defaults(funcion=comando_servir_cola)
+
+    estado = subparsers.add_parser("estado-cola", help="lotes de cada corrida de la cola por estado")
+    estado.add_argument("--corrida", help="ID de la corrida (por defecto, todas)")
+    estado.set_defaults(funcion=comando_estado_cola)
+
+    regenerar = subparsers.add_parser(
+        "regenerar",
+        help="regenerar los certificados cuyos datos de estudiante o curso cambiaron desde su emisión"
+    )
+    regenerar.add_argument("--curso", help="código del curso (por defecto, todos)")
+    regenerar.add_argument("--procesos", type=int, help="procesos de trabajo (por defecto, uno por núcleo)")
+    regenerar.add_argument("--url-verificacion",
+                           help="dirección del servicio de verificación impresa en el QR, seguida del ID")
+    regenerar.add_argument("--intervalo", type=float, default=1.0,
+                           help="segundos entre eventos de progreso")
+    regenerar.set_defaults(funcion=comando_regenerar)
+
+    exportar = subparsers.add_parser("exportar-zip", help="exportar certificados emitidos a un ZIP en exports/")
+    exportar.add_argument("--curso", help="código del curso (por defecto, todos)")
+    exportar.add_argument("--desde", help="fecha de emisión inicial, AAAA-MM-DD")
+    exportar.add_argument("--hasta", help="fecha de emisión final, AAAA-MM-DD")
+    exportar.add_argument("--destino", help="ruta del ZIP (por defecto, exports/certificados_<curso>_<fecha>.zip)")
+    exportar.set_defaults(funcion=comando_exportar_zip)
+
+    reporte = subparsers.add_parser("exportar-reporte",
+                                    help="exportar a exports/ un reporte de los certificados emitidos")
+    reporte.add_argument("--formato", choices=FORMATOS_REPORTE, default="csv")
+    reporte.add_argument("--curso", help="código del curso (por defecto, todos)")
+    reporte.add_argument("--desde", help="fecha de emisión inicial, AAAA-MM-DD")
+    reporte.add_argument("--hasta", help="fecha de emisión final, AAAA-MM-DD")
+    reporte.add_argument("--destino", help="ruta del reporte (por defecto, exports/reporte_<curso>_<fecha>.<formato>)")
+    reporte.set_defaults(funcion=comando_exportar_reporte)
+
+    revocar = subparsers.add_parser("revocar", help="revocar un certificado emitido")
+    revocar.add_argument("certificado", help="ID del certificado")
+    revocar.add_argument("--motivo", required=True)
+    revocar.set_defaults(funcion=comando_revocar)
+
+    servir = subparsers.add_parser("servir-verificacion",
+                                   help="servicio HTTP local para verificar certificados por ID")
+    servir.add_argument("--host", default="127.0.0.1")
+    servir.add_argument("--puerto", type=int, default=8080)
+    servir.add_argument("--hilos", type=int, default=4, help="conexiones de lectura a la base de datos")
+    servir.add_argument("--ttl", type=float, default=300, help="segundos que una respuesta queda en caché")
+    servir.add_argument("--intervalo-revocaciones", type=float, default=2,
+                        help="segundos máximos que una revocación tarda en reflejarse")
+    servir.set_defaults(funcion=comando_servir_verificacion)
+
+    emision = subparsers.add_parser("servir-emision",
+                                    help="servicio HTTP local para emitir certificados a pedido")
+    emision.add_argument("--host", default="127.0.0.1")
+    emision.add_argument("--puerto", type=int, default=8081)
+    emision.add_argument("--procesos", type=int, help="procesos de trabajo (por defecto, uno por núcleo)")
+    emision.add_argument("--max-lote", type=int, default=64, help="peticiones máximas por lote")
+    emision.add_argument("--espera-ms", type=float, default=20,
+                         help="milisegundos que se esperan para juntar las peticiones de un lote")
+    emision.add_argument("--perfil-pdf", choices=PERFILES_PDF,
+                         help="perfil de los PDF emitidos (por defecto, estandar)")
+    emision.add_argument("--url-verificacion",
+                         help="dirección del servicio de verificación impresa en el QR, seguida del ID")
+    emision.set_defaults(funcion=comando_servir_emision)
+
+    return parser
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+
+    # Un trabajador con coordinador no abre la base
+    sistema = None
+    if not getattr(args, "coordinador", None):
+        try:
+            sistema = SistemaCertificados(args.base_datos)
+        except sqlite3.Error as e:
+            emitir("error", mensaje=f"No se pudo inicializar la base de datos: {e}")
+            return SALIDA_ERROR
+
+    try:
+        return args.funcion(sistema, args)
+    except (ValueError, OSError, sqlite3.Error) as e:
+        emitir("error", mensaje=str(e))
+        return SALIDA_ERROR
+    finally:
+        if sistema:
+            sistema.cerrar()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import asyncio
+import base64
+import json
+import os
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+from nucleo import CoordinadorCola
+from servidor_http import ServidorHTTP
+
+# Tamaño máximo de una petición al coordinador: /terminar trae los archivos del lote
+MAX_CUERPO_COLA = 512 * 1024 * 1024
+
+class ServicioCola(ServidorHTTP):
+    # Coordinador de la cola para trabajadores de otros equipos, que no abren
+    # la base: POST /reclamar, /terminar, /liberar, /en-curso y /avance con JSON.
+    # Los encargos viven en memoria: si el servicio se reinicia, sus lotes se
+    # retoman al vencer la concesión
+    max_cuerpo = MAX_CUERPO_COLA
+
+    def __init__(self, sistema, host="127.0.0.1", puerto=8082):
+        super().__init__(host, puerto)
+        # Un solo hilo usa la conexión del coordinador
+        self.base = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cola")
+        self.coordinador = self.base.submit(CoordinadorCola, sistema).result()
+        self.marca = uuid.uuid4().hex[:8]
+        self.rutas = {
+            "/reclamar": self._reclamar,
+            "/terminar": self._terminar,
+            "/liberar": self._liberar,
+            "/en-curso": self._en_curso,
+            "/avance": self._avance
+        }
+        self.peticiones = 0
+
+    async def despachar(self, metodo, ruta, cabeceras, cuerpo):
+        operacion = self.rutas.get(ruta.rstrip("/"))
+        if operacion is None:
+            return 404, {"error": "Ruta no encontrada"}
+        if metodo != "POST":
+            return 405, {"error": "Método no permitido"}
+        try:
+            datos = json.loads(cuerpo or b"{}")
+        except ValueError:
+            return 400, {"error": "El cuerpo debe ser JSON"}
+
+        self.peticiones += 1
+        loop = asyncio.get_running_loop()
+        try:
+            return 200, await loop.run_in_executor(self.base, operacion, datos)
+        except (KeyError, TypeError, ValueError):
+            return 400, {"error": "Petición inválida"}
+        except (OSError, sqlite3.Error) as e:
+            return 500, {"error": str(e)}
+
+    def _reclamar(self, datos):
+        return {"encargo": self.coordinador.reclamar(datos["trabajador"], float(datos["concesion"]))}
+
+    def _terminar(self, datos):
+        # Los archivos llegan en base64, en el orden de los archivos del encargo
+        trabajador, lote_id = datos["trabajador"], datos["lote"]
+        finales = self.coordinador.archivos(trabajador, lote_id)
+        if finales is None:
+            return {"terminado": False}
+        if len(datos["archivos"]) != len(finales):
+            raise ValueError("Cantidad de archivos distinta a la del encargo")
+
+        temporales = []
+        try:
+            for contenido, final in zip(datos["archivos"], finales):
+                temporales.append(f"{final}.{self.marca}.tmp")
+                with open(temporales[-1], "wb") as archivo:
+                    archivo.write(base64.b64decode(contenido))
+        except BaseException:
+            self.coordinador.sistema._descartar_temporales([(temporal, None) for temporal in temporales])
+            raise
+        return {"terminado": self.coordinador.terminar(trabajador, lote_id, datos["paginas"], temporales)}
+
+    def _liberar(self, datos):
+        self.coordinador.liberar(datos["trabajador"], datos["lote"], datos["error"], bool(datos["cancelado"]))
+        return {}
+
+    def _en_curso(self, datos):
+        en_curso, vence_en = self.coordinador.en_curso()
+        return {"en_curso": en_curso, "vence_en": vence_en}
+
+    def _avance(self, datos):
+        terminados, lotes = self.coordinador.avance(datos["corrida"])
+        return {"terminados": terminados, "lotes": lotes}
+
+    def detener(self):
+        self.base.submit(self.coordinador.cerrar).result()
+        self.base.shutdown(wait=False)
+        self.coordinador.medidor.finalizar(peticiones=self.peticiones)
+
+class ClienteCola:
+    # Coordinador remoto para nucleo.atender_cola: los mismos métodos que
+    # CoordinadorCola sobre HTTP. Los errores del servicio se informan con OSError
+    def __init__(self, url, timeout=300):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _pedir(self, ruta, **datos):
+        peticion = Request(
+            self.url + ruta, data=json.dumps(datos, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST"
+        )
+        try:
+            with urlopen(peticion, timeout=self.timeout) as respuesta:
+                return json.loads(respuesta.read())
+        except HTTPError as e:
+            try:
+                mensaje = json.loads(e.read())["error"]
+            except (ValueError, KeyError, TypeError):
+                mensaje = e.reason
+            raise OSError(f"El coordinador respondió {e.code}: {mensaje}") from None
+
+    def reclamar(self, trabajador, concesion):
+        return self._pedir("/reclamar", trabajador=trabajador, concesion=concesion)["encargo"]
+
+    def terminar(self, trabajador, lote_id, paginas, temporales):
+        # Sube los archivos del lote; los temporales locales se borran siempre
+        try:
+            archivos = []
+            for temporal in temporales:
+                with open(temporal, "rb") as archivo:
+                    archivos.append(base64.b64encode(archivo.read()).decode("ascii"))
+            return self._pedir(
+                "/terminar", trabajador=trabajador, lote=lote_id, paginas=paginas, archivos=archivos
+            )["terminado"]
+        finally:
+            for temporal in temporales:
+                if os.path.exists(temporal):
+                    os.remove(temporal)
+
+    def liberar(self, trabajador, lote_id, error, cancelado=False):
+        self._pedir("/liberar", trabajador=trabajador, lote=lote_id, error=error, cancelado=cancelado)
+
+    def en_curso(self):
+        respuesta = self._pedir("/en-curso")
+        return respuesta["en_curso"], respuesta["vence_en"]
+
+    def avance(self, corrida):
+        respuesta = self._pedir("/avance", corrida=corrida)
+        return respuesta["terminados"], respuesta["lotes"]
+
+    def cerrar(self):
+        pass
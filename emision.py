@@ -0,0 +1,254 @@
+import asyncio
+import json
+import mimetypes
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+from instrumentacion import MedidorEtapas
+from nucleo import ESTADO_APROBADO, normalizar_cedula
+from servidor_http import ServidorHTTP
+
+# Código HTTP de cada estado de una emisión
+CODIGOS_ESTADO = {
+    "emitido": 200,
+    "existente": 200,
+    "no_encontrado": 404,
+    "revocado": 409,
+    "no_aprobado": 409,
+    "error": 500
+}
+
+class ServicioEmision(ServidorHTTP):
+    # POST /emitir con {"cedula": ..., "curso": <código>}: las peticiones se
+    # agrupan cada espera segundos (o max_lote) y se emiten juntas
+    def __init__(self, sistema, host="127.0.0.1", puerto=8081, procesos=None,
+                 max_lote=64, espera=0.02):
+        super().__init__(host, puerto)
+        self.sistema = sistema
+        self.procesos = procesos or sistema.procesos_generacion
+        self.max_lote = max_lote
+        self.espera = espera
+
+        # Un solo hilo escribe en la base
+        self.base = ThreadPoolExecutor(max_workers=1, thread_name_prefix="emision")
+        self._local = threading.local()
+
+        # Antes de aceptar conexiones, para que fork no herede sus sockets
+        self.render = sistema.crear_ejecutor_render(self.procesos)
+
+        self.medidor = MedidorEtapas("emision", procesos=self.procesos, max_lote=max_lote)
+        self._cola = []
+        self._hay_pendientes = asyncio.Event()
+        self._en_curso = {}
+        self.peticiones = 0
+        self.compartidas = 0
+        self.lotes = 0
+        self.emitidos = 0
+
+    def _conexion(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self.sistema.conectar_base_datos()
+        return conn
+
+    async def emitir(self, cedula, codigo):
+        # Devuelve un diccionario con el estado de la emisión: emitido,
+        # existente, revocado, no_aprobado, no_encontrado o error
+        self.peticiones += 1
+        # "v 12.345.678" y "V-12345678" son la misma petición
+        clave = (normalizar_cedula(cedula) or cedula.strip(), codigo.strip())
+        futuro = self._en_curso.get(clave)
+        if futuro is None:
+            futuro = self._en_curso[clave] = asyncio.get_running_loop().create_future()
+            self._cola.append(clave)
+            self._hay_pendientes.set()
+        else:
+            self.compartidas += 1
+        return await asyncio.shield(futuro)
+
+    async def _agrupar(self):
+        while True:
+            await self._hay_pendientes.wait()
+            # Ventana corta para que una ráfaga de peticiones salga en un lote
+            if len(self._cola) < self.max_lote:
+                await asyncio.sleep(self.espera)
+            claves = self._cola[:self.max_lote]
+            del self._cola[:self.max_lote]
+            if not self._cola:
+                self._hay_pendientes.clear()
+
+            try:
+                resultados = await self._procesar_lote(claves)
+            except Exception as e:
+                resultados = {clave: {"estado": "error", "error": str(e)} for clave in claves}
+            for clave in claves:
+                futuro = self._en_curso.pop(clave)
+                if not futuro.done():
+                    futuro.set_result(resultados[clave])
+
+    async def _procesar_lote(self, claves):
+        loop = asyncio.get_running_loop()
+        self.lotes += 1
+
+        # La fecha se fija por lote, igual que en una corrida de generación
+        fecha = datetime.now()
+        with self.medidor.etapa("consulta"):
+            resultados, pendientes = await loop.run_in_executor(self.base, self._resolver, claves)
+        if not pendientes:
+            return resultados
+
+        # Uno que otra corrida registró mientras se renderizaba es existente
+        emitidos = await loop.run_in_executor(self.base, self._emitir, pendientes, fecha)
+        for (clave, *_), (certificado_id, archivo_certificado, pagina, fecha_emision, emitido) in zip(pendientes, emitidos):
+            resultados[clave] = {
+                "estado": "emitido" if emitido else "existente",
+                "certificado_id": certificado_id,
+                "archivo": archivo_certificado,
+                "pagina": pagina,
+                "fecha_emision": fecha_emision
+            }
+            self.emitidos += emitido
+        return resultados
+
+    def _emitir(self, pendientes, fecha):
+        return self.sistema.emitir_certificados(
+            self._conexion(), [pendiente[1:] for pendiente in pendientes], self.render, self.procesos, fecha, self.medidor
+        )
+
+    def _resolver(self, claves):
+        # Una consulta por tabla. Devuelve los resultados ya conocidos y los que hay
+        # que renderizar: [(clave, estudiante, (curso_id, nombre, codigo), certificado_id)]
+        conn = self._conexion()
+
+        def marcas(valores):
+            return ", ".join("?" * len(valores))
+
+        cedulas = list({cedula for cedula, codigo in claves})
+        codigos = list({codigo for cedula, codigo in claves})
+        estudiantes = {
+            fila[3]: fila for fila in conn.execute(
+                f"SELECT * FROM estudiantes WHERE cedula IN ({marcas(cedulas)})", cedulas
+            )
+        }
+        cursos = {
+            fila[2]: fila for fila in conn.execute(
+                f"SELECT id, nombre, codigo FROM cursos WHERE codigo IN ({marcas(codigos)})", codigos
+            )
+        }
+
+        estudiante_ids = [fila[0] for fila in estudiantes.values()]
+        curso_ids = [fila[0] for fila in cursos.values()]
+        existentes, aprobados = {}, set()
+        if estudiante_ids and curso_ids:
+            aprobados = set(conn.execute(f'''
+                SELECT estudiante_id, curso_id FROM inscripciones
+                WHERE curso_id IN ({marcas(curso_ids)}) AND estudiante_id IN ({marcas(estudiante_ids)})
+                  AND estado = ?
+            ''', curso_ids + estudiante_ids + [ESTADO_APROBADO]))
+            for fila in conn.execute(f'''
+                SELECT estudiante_id, curso_id, id, archivo_certificado, pagina, fecha_emision, revocado_en
+                FROM certificados
+                WHERE estudiante_id IN ({marcas(estudiante_ids)}) AND curso_id IN ({marcas(curso_ids)})
+            ''', estudiante_ids + curso_ids):
+                existentes[fila[0], fila[1]] = fila[2:]
+
+        resultados, pendientes = {}, []
+        for clave in claves:
+            cedula, codigo = clave
+            estudiante = estudiantes.get(cedula)
+            curso = cursos.get(codigo)
+            if estudiante is None:
+                resultados[clave] = {"estado": "no_encontrado", "error": "Estudiante no encontrado"}
+                continue
+            if curso is None:
+                resultados[clave] = {"estado": "no_encontrado", "error": "Curso no encontrado"}
+                continue
+
+            existente = existentes.get((estudiante[0], curso[0]))
+            if existente:
+                certificado_id, archivo_certificado, pagina, fecha_emision, revocado_en = existente
+                if revocado_en:
+                    resultados[clave] = {
+                        "estado": "revocado",
+                        "certificado_id": certificado_id,
+                        "revocado_en": revocado_en,
+                        "error": "El certificado fue revocado"
+                    }
+                    continue
+                if archivo_certificado and os.path.exists(archivo_certificado):
+                    resultados[clave] = {
+                        "estado": "existente",
+                        "certificado_id": certificado_id,
+                        "archivo": archivo_certificado,
+                        "pagina": pagina,
+                        "fecha_emision": fecha_emision
+                    }
+                    continue
+
+            if (estudiante[0], curso[0]) not in aprobados:
+                resultados[clave] = {"estado": "no_aprobado", "error": "El estudiante no aprobó este curso"}
+                continue
+
+            # Si el archivo se perdió se regenera con el mismo ID
+            pendientes.append((clave, estudiante, curso, existente[0] if existente else str(uuid.uuid4())))
+        return resultados, pendientes
+
+    async def despachar(self, metodo, ruta, cabeceras, cuerpo):
+        partes = urlsplit(ruta)
+        ruta = partes.path.rstrip("/")
+        if ruta == "/salud":
+            return 200, {
+                "estado": "ok",
+                "peticiones": self.peticiones,
+                "compartidas": self.compartidas,
+                "lotes": self.lotes,
+                "emitidos": self.emitidos,
+                "en_cola": len(self._cola)
+            }
+
+        if ruta != "/emitir":
+            return 404, {"error": "Ruta no encontrada"}
+        if metodo != "POST":
+            return 405, {"error": "Método no permitido"}
+
+        try:
+            datos = json.loads(cuerpo or b"{}")
+        except ValueError:
+            return 400, {"error": "El cuerpo debe ser JSON"}
+        cedula = datos.get("cedula") if isinstance(datos, dict) else None
+        codigo = datos.get("curso") if isinstance(datos, dict) else None
+        if not isinstance(cedula, str) or not cedula.strip() or not isinstance(codigo, str) or not codigo.strip():
+            return 400, {"error": "Debe indicar la cédula del estudiante y el código del curso"}
+
+        resultado = await self.emitir(cedula, codigo)
+        estado = CODIGOS_ESTADO[resultado["estado"]]
+
+        formato = parse_qs(partes.query).get("formato", [""])[0]
+        pide_pdf = formato == "pdf" or "application/pdf" in cabeceras.get("accept", "")
+        if estado != 200 or not pide_pdf:
+            return estado, resultado
+
+        # De un PDF combinado se entrega el archivo completo
+        tipo = mimetypes.guess_type(resultado["archivo"])[0] or "application/octet-stream"
+        loop = asyncio.get_running_loop()
+        try:
+            contenido = await loop.run_in_executor(None, _leer_archivo, resultado["archivo"])
+        except OSError:
+            return 500, {"estado": "error", "error": "No se pudo leer el certificado"}
+        return 200, contenido, tipo
+
+    def tareas_fondo(self):
+        return [self._agrupar()]
+
+    def detener(self):
+        self.render.shutdown(wait=False, cancel_futures=True)
+        self.base.shutdown(wait=False)
+        self.medidor.finalizar(peticiones=self.peticiones, compartidas=self.compartidas,
+                               lotes=self.lotes, emitidos=self.emitidos)
+
+def _leer_archivo(ruta):
+    with open(ruta, "rb") as archivo:
+        return archivo.read()
@@ -0,0 +1,212 @@
+import csv
+import io
+import os
+import zipfile
+from datetime import datetime
+import openpyxl
+from nucleo import iterar_consulta
+
+# Columnas del manifiesto que acompaña a cada ZIP
+COLUMNAS_MANIFIESTO = [
+    "certificado_id",
+    "cedula",
+    "nombre",
+    "apellido",
+    "curso",
+    "codigo",
+    "fecha_emision",
+    "archivo",
+    "pagina",
+    "incluido"
+]
+
+# Columnas del reporte de conciliación de certificados emitidos
+COLUMNAS_REPORTE = [
+    "certificado_id",
+    "cedula",
+    "nombre",
+    "apellido",
+    "email",
+    "curso",
+    "codigo",
+    "area",
+    "instructor",
+    "fecha_emision",
+    "archivo",
+    "pagina"
+]
+
+FORMATOS_REPORTE = ("xlsx", "csv")
+
+# Filas por hoja de Excel (el máximo de una hoja es 1.048.576, con encabezado)
+FILAS_POR_HOJA = 1_000_000
+
+def _filtro_certificados(curso_id=None, desde=None, hasta=None):
+    # desde y hasta son fechas 'AAAA-MM-DD', ambas inclusivas
+    condiciones, parametros = [], []
+    if curso_id:
+        condiciones.append("c.curso_id = ?")
+        parametros.append(curso_id)
+    if desde:
+        condiciones.append("c.fecha_emision >= ?")
+        parametros.append(desde)
+    if hasta:
+        condiciones.append("c.fecha_emision < date(?, '+1 day')")
+        parametros.append(hasta)
+    where = " WHERE " + " AND ".join(condiciones) if condiciones else ""
+    return where, parametros
+
+def _destino_por_defecto(conn, prefijo, curso_id, extension):
+    # exports/<prefijo>_<código del curso o "todos">_<fecha>.<extension>
+    if curso_id:
+        fila = conn.execute("SELECT codigo FROM cursos WHERE id = ?", (curso_id,)).fetchone()
+        etiqueta = fila[0] if fila else "curso"
+    else:
+        etiqueta = "todos"
+    marca = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return os.path.join("exports", f"{prefijo}_{etiqueta}_{marca}.{extension}")
+
+def exportar_zip(conn, curso_id=None, desde=None, hasta=None, destino=None):
+    # Copia los certificados directamente desde disco al ZIP, archivo por
+    # archivo, y escribe un manifiesto CSV a partir de la tabla certificados.
+    # Ni los PDF ni el resultado de la consulta se cargan completos en memoria
+    where, parametros = _filtro_certificados(curso_id, desde, hasta)
+    destino = destino or _destino_por_defecto(conn, "certificados", curso_id, "zip")
+
+    # Se escribe con otro nombre y se renombra al final para que nunca
+    # quede un ZIP incompleto con el nombre definitivo
+    parcial = destino + ".parcial"
+    archivos = faltantes = certificados = 0
+
+    try:
+        with zipfile.ZipFile(parcial, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+            # Los PDF combinados aparecen en varias filas: al ordenar por
+            # archivo basta comparar con el anterior para escribirlos una vez
+            anterior = None
+            for (archivo_certificado,) in iterar_consulta(
+                conn,
+                f"SELECT c.archivo_certificado FROM certificados c{where} ORDER BY c.archivo_certificado",
+                parametros
+            ):
+                if archivo_certificado == anterior:
+                    continue
+                anterior = archivo_certificado
+                if archivo_certificado and os.path.exists(archivo_certificado):
+                    zf.write(archivo_certificado, arcname=os.path.basename(archivo_certificado))
+                    archivos += 1
+                else:
+                    faltantes += 1
+
+            manifiesto = zipfile.ZipInfo("manifiesto.csv", date_time=datetime.now().timetuple()[:6])
+            manifiesto.compress_type = zipfile.ZIP_DEFLATED
+            with zf.open(manifiesto, "w", force_zip64=True) as binario:
+                texto = io.TextIOWrapper(binario, encoding="utf-8", newline="")
+                escritor = csv.writer(texto)
+                escritor.writerow(COLUMNAS_MANIFIESTO)
+                for fila in iterar_consulta(
+                    conn,
+                    f'''
+                        SELECT c.id, e.cedula, e.nombre, e.apellido, cu.nombre, cu.codigo,
+                               c.fecha_emision, c.archivo_certificado, c.pagina
+                        FROM certificados c
+                        LEFT JOIN estudiantes e ON e.id = c.estudiante_id
+                        LEFT JOIN cursos cu ON cu.id = c.curso_id
+                        {where}
+                        ORDER BY c.fecha_emision, c.id
+                    ''',
+                    parametros
+                ):
+                    archivo_certificado = fila[7]
+                    incluido = bool(archivo_certificado) and os.path.exists(archivo_certificado)
+                    escritor.writerow(fila[:7] + (
+                        os.path.basename(archivo_certificado or ""),
+                        fila[8],
+                        "si" if incluido else "no"
+                    ))
+                    certificados += 1
+                texto.flush()
+                texto.detach()
+
+        os.replace(parcial, destino)
+    except BaseException:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+        raise
+
+    return {
+        "destino": destino,
+        "certificados": certificados,
+        "archivos": archivos,
+        "faltantes": faltantes,
+        "bytes": os.path.getsize(destino)
+    }
+
+def exportar_reporte(conn, formato="xlsx", curso_id=None, desde=None, hasta=None, destino=None):
+    # Reporte de conciliación: una fila por certificado emitido con los datos
+    # del estudiante y del curso. Las filas pasan del cursor al archivo por
+    # bloques; en Excel se usa el modo de solo escritura de openpyxl, que no
+    # mantiene el libro en memoria
+    if formato not in FORMATOS_REPORTE:
+        raise ValueError(f"Formato de reporte desconocido: {formato}")
+
+    where, parametros = _filtro_certificados(curso_id, desde, hasta)
+    destino = destino or _destino_por_defecto(conn, "reporte", curso_id, formato)
+    filas = iterar_consulta(
+        conn,
+        f'''
+            SELECT c.id, e.cedula, e.nombre, e.apellido, e.email,
+                   cu.nombre, cu.codigo, cu.area, cu.instructor,
+                   c.fecha_emision, c.archivo_certificado, c.pagina
+            FROM certificados c
+            LEFT JOIN estudiantes e ON e.id = c.estudiante_id
+            LEFT JOIN cursos cu ON cu.id = c.curso_id
+            {where}
+            ORDER BY c.fecha_emision, c.id
+        ''',
+        parametros,
+        tamano=5000
+    )
+
+    parcial = destino + ".parcial"
+    try:
+        if formato == "csv":
+            escritas = _escribir_csv(parcial, filas)
+        else:
+            escritas = _escribir_xlsx(parcial, filas)
+        os.replace(parcial, destino)
+    except BaseException:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+        raise
+
+    return {
+        "destino": destino,
+        "filas": escritas,
+        "bytes": os.path.getsize(destino)
+    }
+
+def _escribir_csv(ruta, filas):
+    escritas = 0
+    with open(ruta, "w", newline="", encoding="utf-8") as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(COLUMNAS_REPORTE)
+        for fila in filas:
+            escritor.writerow(fila)
+            escritas += 1
+    return escritas
+
+def _escribir_xlsx(ruta, filas):
+    wb = openpyxl.Workbook(write_only=True)
+    hoja = None
+    escritas = 0
+    for fila in filas:
+        # Al llenarse una hoja se continúa en la siguiente
+        if escritas % FILAS_POR_HOJA == 0:
+            hoja = wb.create_sheet(f"Certificados {escritas // FILAS_POR_HOJA + 1}")
+            hoja.append(COLUMNAS_REPORTE)
+        hoja.append(fila)
+        escritas += 1
+    if hoja is None:
+        wb.create_sheet("Certificados 1").append(COLUMNAS_REPORTE)
+    wb.save(ruta)
+    return escritas
@@ -0,0 +1,107 @@
+import copy
+import os
+from functools import lru_cache
+from io import BytesIO
+from fontTools import subset, ttLib
+from fpdf import FPDF
+from plantillas import DIRECTORIO_FUENTES, FUENTE_POR_DEFECTO
+
+try:
+    from fpdf.fonts import SubsetMap, TTFFont
+except ImportError:
+    # PyFPDF u otra versión sin estas clases internas de fpdf2: cada
+    # documento registra la fuente con add_font
+    SubsetMap = TTFFont = None
+
+# Fuente Unicode de los certificados en PDF, dentro de fonts/. Si no está se
+# usa la fuente Arial incorporada, que solo cubre Latin-1
+ARCHIVO_FUENTE = FUENTE_POR_DEFECTO
+FAMILIA_FUENTE = "certificado"
+FAMILIA_RESPALDO = "Arial"
+
+# Caracteres que se conservan de la fuente: latino básico y extendido
+# (acentos, Ñ, ü, ç...), puntuación tipográfica y el símbolo del euro
+RANGOS_UNICODE = [(0x20, 0x24F), (0x2010, 0x205E), (0x20AC, 0x20AC)]
+
+# Atributos de TTFFont que usar_fuente reemplaza en cada copia; si la
+# versión de fpdf2 no los tiene se usa add_font
+ATRIBUTOS_FUENTE = ("i", "ttfont", "subset", "missing_glyphs", "biggest_size_pt")
+
+# Tablas que la versión compacta descarta además del hinting: fpdf no aplica
+# el ajuste entre pares ni las sustituciones, y las métricas por tamaño de
+# píxel solo sirven a la pantalla
+TABLAS_DESCARTADAS_COMPACTA = ["kern", "GPOS", "GSUB", "GDEF", "hdmx", "LTSH", "VDMX"]
+
+@lru_cache(maxsize=8)
+def _fuente_base(ruta, modificado, compacta=False):
+    # Análisis completo de la fuente (tablas, anchos por carácter, cmap):
+    # una sola vez por proceso. Con fork, los procesos de trabajo la heredan
+    # ya analizada del proceso principal.
+    # Antes se recorta a RANGOS_UNICODE: fpdf vuelve a recortar la fuente en
+    # cada documento y ese trabajo crece con el tamaño de la fuente completa.
+    # compacta quita además las instrucciones de hinting, que son cerca de la
+    # mitad de la fuente incrustada y no cambian los contornos de los glifos
+    fuente = ttLib.TTFont(ruta, recalcTimestamp=False)
+    if compacta:
+        opciones = subset.Options(notdef_outline=True, recommended_glyphs=True, hinting=False)
+    else:
+        opciones = subset.Options(notdef_outline=True, recommended_glyphs=True, name_IDs=["*"])
+    # FFTM (marca de FontForge) no se puede recortar: se descarta sin aviso
+    opciones.drop_tables = opciones.drop_tables + ["FFTM"]
+    if compacta:
+        opciones.drop_tables += TABLAS_DESCARTADAS_COMPACTA
+    recorte = subset.Subsetter(opciones)
+    recorte.populate(unicodes=[
+        codigo for inicio, fin in RANGOS_UNICODE for codigo in range(inicio, fin + 1)
+    ])
+    recorte.subset(fuente)
+    salida = BytesIO()
+    fuente.save(salida)
+    datos = salida.getvalue()
+
+    try:
+        base = TTFFont(FPDF(), BytesIO(datos), FAMILIA_FUENTE, "") if TTFFont else None
+    except (TypeError, AttributeError):
+        base = None
+    if base is not None and not all(hasattr(base, atributo) for atributo in ATRIBUTOS_FUENTE):
+        base = None
+    return base, datos
+
+def ruta_fuente(archivo=ARCHIVO_FUENTE):
+    ruta = os.path.join(DIRECTORIO_FUENTES, archivo)
+    return ruta if os.path.exists(ruta) else None
+
+def precargar_fuente(archivo=ARCHIVO_FUENTE, compacta=False):
+    ruta = ruta_fuente(archivo)
+    if ruta:
+        _fuente_base(ruta, os.path.getmtime(ruta), compacta)
+
+def usar_fuente(pdf, archivo=ARCHIVO_FUENTE, compacta=False):
+    # Registra la fuente en el documento y devuelve la familia para
+    # set_font. En lugar de add_font, que vuelve a analizar el archivo, se
+    # copia la fuente ya analizada
+    if FAMILIA_FUENTE in pdf.fonts:
+        return FAMILIA_FUENTE
+    ruta = ruta_fuente(archivo)
+    if ruta is None:
+        return FAMILIA_RESPALDO
+
+    base, datos = _fuente_base(ruta, os.path.getmtime(ruta), compacta)
+    if base is None:
+        # Sin las clases internas esperadas: add_font analiza el archivo
+        # completo en cada documento, más lento pero igual de correcto
+        pdf.add_font(FAMILIA_FUENTE, fname=ruta)
+        return FAMILIA_FUENTE
+    fuente = copy.copy(base)
+    fuente.i = len(pdf.fonts) + 1
+
+    # Al escribir el PDF, fpdf recorta la fuente a los glifos usados
+    # modificando el objeto de fontTools: cada documento necesita el suyo y
+    # su propio mapa de glifos. Se lee de memoria y de forma perezosa
+    fuente.ttfont = ttLib.TTFont(BytesIO(datos), recalcTimestamp=False, lazy=True)
+    fuente.subset = SubsetMap(fuente)
+    fuente.missing_glyphs = []
+    fuente.biggest_size_pt = 0
+
+    pdf.fonts[FAMILIA_FUENTE] = fuente
+    return FAMILIA_FUENTE
@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+# Nombre del logger de la aplicación y archivo rotativo dentro de logs/
+REGISTRO = "unexca"
+ARCHIVO_REGISTRO = "unexca.log"
+
+class FormatoJSON(logging.Formatter):
+    # Una línea JSON por registro, con los datos pasados en extra={"datos": ...}
+    def format(self, record):
+        datos = {
+            "fecha": self.formatTime(record, "%Y-%m-%d %H:%M:%S"),
+            "nivel": record.levelname,
+            "evento": record.getMessage()
+        }
+        datos.update(getattr(record, "datos", {}))
+        return json.dumps(datos, ensure_ascii=False)
+
+def configurar_registro(directorio="logs", max_bytes=5 * 1024 * 1024, copias=5):
+    logger = logging.getLogger(REGISTRO)
+    if not any(isinstance(manejador, RotatingFileHandler) for manejador in logger.handlers):
+        os.makedirs(directorio, exist_ok=True)
+        manejador = RotatingFileHandler(
+            os.path.join(directorio, ARCHIVO_REGISTRO),
+            maxBytes=max_bytes,
+            backupCount=copias,
+            encoding="utf-8"
+        )
+        manejador.setFormatter(FormatoJSON())
+        logger.addHandler(manejador)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+def registrar_evento(evento, **datos):
+    logging.getLogger(REGISTRO).info(evento, extra={"datos": datos})
+
+class MedidorEtapas:
+    # Acumula la duración de cada etapa de una corrida. Conserva el conteo,
+    # el total y el máximo exactos, y una muestra aleatoria de tamaño fijo
+    # para los percentiles, así el costo en memoria no crece con la corrida
+    MUESTRAS = 10_000
+
+    def __init__(self, corrida, **contexto):
+        self.corrida = corrida
+        self.contexto = contexto
+        self.inicio = time.perf_counter()
+        self.etapas = {}
+        self._azar = random.Random(0)
+
+    @contextmanager
+    def etapa(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(nombre, time.perf_counter() - inicio)
+
+    def registrar(self, nombre, segundos):
+        datos = self.etapas.get(nombre)
+        if datos is None:
+            datos = self.etapas[nombre] = [0, 0.0, 0.0, []]
+        datos[0] += 1
+        datos[1] += segundos
+        if segundos > datos[2]:
+            datos[2] = segundos
+
+        # Muestreo de reservorio: cada medición tiene la misma probabilidad
+        # de quedar en la muestra
+        muestras = datos[3]
+        if len(muestras) < self.MUESTRAS:
+            muestras.append(segundos)
+        else:
+            posicion = self._azar.randrange(datos[0])
+            if posicion < self.MUESTRAS:
+                muestras[posicion] = segundos
+
+    def combinar(self, tiempos):
+        # tiempos: {etapa: [segundos, ...]}, por ejemplo los que devuelve
+        # un proceso de trabajo junto con su lote
+        for nombre, valores in tiempos.items():
+            for segundos in valores:
+                self.registrar(nombre, segundos)
+
+    def resumen(self):
+        resumen = {}
+        for nombre, (cantidad, total, maximo, muestras) in self.etapas.items():
+            ordenadas = sorted(muestras)
+            def percentil(p):
+                indice = min(len(ordenadas) - 1, round(p / 100 * (len(ordenadas) - 1)))
+                return round(ordenadas[indice] * 1000, 3)
+            resumen[nombre] = {
+                "cantidad": cantidad,
+                "total_s": round(total, 3),
+                "media_ms": round(total / cantidad * 1000, 3),
+                "p50_ms": percentil(50),
+                "p95_ms": percentil(95),
+                "p99_ms": percentil(99),
+                "max_ms": round(maximo * 1000, 3)
+            }
+        return resumen
+
+    def finalizar(self, **datos):
+        # Escribe el resumen de la corrida en el registro y lo devuelve
+        resumen = self.resumen()
+        registrar_evento(
+            "resumen_corrida",
+            corrida=self.corrida,
+            duracion_s=round(time.perf_counter() - self.inicio, 3),
+            etapas=resumen,
+            **self.contexto,
+            **datos
+        )
+        return resumen
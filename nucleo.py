@@ -0,0 +1,1800 @@
+import sqlite3
+import csv
+import hashlib
+import json
+import os
+import uuid
+import re
+import time
+import signal
+import unicodedata
+import socket
+import multiprocessing
+from datetime import datetime
+from collections import deque
+from functools import partial
+from itertools import chain, count, islice
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import zipfile
+import openpyxl
+from openpyxl.utils.exceptions import InvalidFileException
+from fpdf import FPDF
+from instrumentacion import MedidorEtapas, configurar_registro, registrar_evento
+from plantillas import (FORMATOS_PLANTILLA, campos_plantilla, cargar_plantilla, escritura_atomica, nombre_archivo_certificado,
+                        renderizar_lote_plantilla)
+from fuentes import precargar_fuente, usar_fuente
+from verificacion import URL_VERIFICACION, enlace_verificacion, matriz_qr, tramos_qr
+
+# Migraciones del esquema, en orden. PRAGMA user_version guarda cuántas se
+# aplicaron; cada una corre en su propia transacción junto con el cambio de
+# versión, de modo que una migración interrumpida se repite completa
+MIGRACIONES = [
+    # 1: esquema inicial
+    '''
+        CREATE TABLE IF NOT EXISTS estudiantes (
+            id TEXT PRIMARY KEY,
+            nombre TEXT NOT NULL,
+            apellido TEXT NOT NULL,
+            cedula TEXT UNIQUE,
+            email TEXT,
+            fecha_registro DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS cursos (
+            id TEXT PRIMARY KEY,
+            nombre TEXT NOT NULL,
+            codigo TEXT UNIQUE,
+            area TEXT,
+            duracion TEXT,
+            descripcion TEXT,
+            instructor TEXT,
+            fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS certificados (
+            id TEXT PRIMARY KEY,
+            estudiante_id TEXT,
+            curso_id TEXT,
+            fecha_emision DATETIME,
+            archivo_certificado TEXT,
+            FOREIGN KEY(estudiante_id) REFERENCES estudiantes(id),
+            FOREIGN KEY(curso_id) REFERENCES cursos(id)
+        );
+    ''',
+    # 2: un solo certificado por estudiante y curso. Las bases creadas antes
+    # de esta restricción pueden traer duplicados: se conserva el último
+    '''
+        DELETE FROM certificados WHERE rowid NOT IN (
+            SELECT MAX(rowid) FROM certificados GROUP BY estudiante_id, curso_id
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_certificados_estudiante_curso
+            ON certificados(estudiante_id, curso_id);
+    ''',
+    # 3: búsquedas de certificados por curso (las búsquedas por estudiante
+    # ya usan idx_certificados_estudiante_curso)
+    '''
+        CREATE INDEX IF NOT EXISTS idx_certificados_curso ON certificados(curso_id);
+    ''',
+    # 4: página del certificado dentro de un PDF combinado
+    '''
+        ALTER TABLE certificados ADD COLUMN pagina INTEGER;
+    ''',
+    # 5: exportaciones por rango de fechas de emisión
+    '''
+        CREATE INDEX IF NOT EXISTS idx_certificados_fecha ON certificados(fecha_emision);
+    ''',
+    # 6: revocación de certificados. El índice parcial solo contiene los
+    # revocados y sirve al servicio de verificación para invalidar su caché
+    '''
+        ALTER TABLE certificados ADD COLUMN revocado_en DATETIME;
+        ALTER TABLE certificados ADD COLUMN motivo_revocacion TEXT;
+        CREATE INDEX IF NOT EXISTS idx_certificados_revocado
+            ON certificados(revocado_en) WHERE revocado_en IS NOT NULL;
+    ''',
+    # 7: inscripciones de estudiantes en cursos. Los certificados ya emitidos
+    # cuentan como aprobados para que se puedan seguir regenerando
+    '''
+        CREATE TABLE IF NOT EXISTS inscripciones (
+            curso_id TEXT NOT NULL REFERENCES cursos(id),
+            estudiante_id TEXT NOT NULL REFERENCES estudiantes(id),
+            estado TEXT NOT NULL DEFAULT 'inscrito',
+            fecha_inscripcion DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (curso_id, estudiante_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_inscripciones_estado
+            ON inscripciones(curso_id, estado, estudiante_id);
+        INSERT OR IGNORE INTO inscripciones (curso_id, estudiante_id, estado)
+            SELECT curso_id, estudiante_id, 'aprobado' FROM certificados
+            WHERE curso_id IS NOT NULL AND estudiante_id IS NOT NULL;
+    ''',
+    # 8: búsqueda de cursos por prefijo de código o nombre sin distinguir
+    # mayúsculas, para el selector de cursos
+    '''
+        CREATE INDEX IF NOT EXISTS idx_cursos_codigo_nocase ON cursos(codigo COLLATE NOCASE);
+        CREATE INDEX IF NOT EXISTS idx_cursos_nombre_nocase ON cursos(nombre COLLATE NOCASE);
+    ''',
+    # 9: huella y plantilla de cada certificado. Los disparadores marcan los
+    # desactualizados cuando cambian los datos del estudiante o del curso
+    '''
+        ALTER TABLE certificados ADD COLUMN huella TEXT;
+        ALTER TABLE certificados ADD COLUMN plantilla TEXT;
+        ALTER TABLE certificados ADD COLUMN desactualizado INTEGER NOT NULL DEFAULT 0;
+        CREATE INDEX IF NOT EXISTS idx_certificados_desactualizados
+            ON certificados(id) WHERE desactualizado = 1;
+        CREATE INDEX IF NOT EXISTS idx_certificados_archivo
+            ON certificados(archivo_certificado, pagina) WHERE pagina IS NOT NULL;
+
+        CREATE TRIGGER IF NOT EXISTS certificados_estudiante_modificado
+        AFTER UPDATE OF nombre, apellido, cedula, email ON estudiantes
+        WHEN OLD.nombre IS NOT NEW.nombre OR OLD.apellido IS NOT NEW.apellido
+          OR OLD.cedula IS NOT NEW.cedula OR OLD.email IS NOT NEW.email
+        BEGIN
+            UPDATE certificados SET desactualizado = 1
+            WHERE estudiante_id = NEW.id AND desactualizado = 0;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS certificados_curso_modificado
+        AFTER UPDATE OF nombre, codigo ON cursos
+        WHEN OLD.nombre IS NOT NEW.nombre OR OLD.codigo IS NOT NEW.codigo
+        BEGIN
+            UPDATE certificados SET desactualizado = 1
+            WHERE curso_id = NEW.id AND desactualizado = 0;
+        END;
+    ''',
+    # 10: cola de generación; cada lote es un rango (desde, hasta] de aprobados de un curso
+    '''
+        CREATE TABLE IF NOT EXISTS cola_generacion (
+            id INTEGER PRIMARY KEY,
+            corrida TEXT NOT NULL,
+            curso_id TEXT NOT NULL REFERENCES cursos(id),
+            desde TEXT NOT NULL,
+            hasta TEXT NOT NULL,
+            fecha DATETIME NOT NULL,
+            modo TEXT NOT NULL,
+            plantilla TEXT,
+            formato TEXT,
+            estado TEXT NOT NULL DEFAULT 'pendiente',
+            trabajador TEXT,
+            vence_en REAL,
+            intentos INTEGER NOT NULL DEFAULT 0,
+            generados INTEGER,
+            error TEXT,
+            terminado_en DATETIME
+        );
+        CREATE INDEX IF NOT EXISTS idx_cola_generacion_estado ON cola_generacion(estado, vence_en);
+        CREATE INDEX IF NOT EXISTS idx_cola_generacion_corrida ON cola_generacion(corrida, estado);
+    ''',
+    # 11: perfil de PDF de cada corrida en cola
+    '''
+        ALTER TABLE cola_generacion ADD COLUMN perfil TEXT;
+    ''',
+    # 12: los homónimos compartían archivo individual. Sin archivo, la próxima
+    # generación los vuelve a emitir con su ID y un nombre único
+    '''
+        UPDATE certificados SET archivo_certificado = NULL
+        WHERE pagina IS NULL AND archivo_certificado IN (
+            SELECT archivo_certificado FROM certificados
+            WHERE pagina IS NULL AND archivo_certificado IS NOT NULL
+            GROUP BY archivo_certificado HAVING COUNT(*) > 1
+        );
+    ''',
+    # 13: perfil de PDF de cada certificado. El motor PDF no imprime el email:
+    # cambiarlo solo marca los certificados de plantilla
+    '''
+        ALTER TABLE certificados ADD COLUMN perfil TEXT;
+
+        DROP TRIGGER IF EXISTS certificados_estudiante_modificado;
+        CREATE TRIGGER certificados_estudiante_modificado
+        AFTER UPDATE OF nombre, apellido, cedula, email ON estudiantes
+        WHEN OLD.nombre IS NOT NEW.nombre OR OLD.apellido IS NOT NEW.apellido
+          OR OLD.cedula IS NOT NEW.cedula OR OLD.email IS NOT NEW.email
+        BEGIN
+            UPDATE certificados SET desactualizado = 1
+            WHERE estudiante_id = NEW.id AND desactualizado = 0
+              AND (plantilla IS NOT NULL OR OLD.nombre IS NOT NEW.nombre
+                   OR OLD.apellido IS NOT NEW.apellido OR OLD.cedula IS NOT NEW.cedula);
+        END;
+    ''',
+    # 14: código y nombre de los cursos sin tildes ni mayúsculas (NOCASE solo
+    # pliega ASCII)
+    '''
+        ALTER TABLE cursos ADD COLUMN busqueda_codigo TEXT;
+        ALTER TABLE cursos ADD COLUMN busqueda_nombre TEXT;
+        UPDATE cursos SET busqueda_codigo = plegar(codigo), busqueda_nombre = plegar(nombre);
+        DROP INDEX IF EXISTS idx_cursos_codigo_nocase;
+        DROP INDEX IF EXISTS idx_cursos_nombre_nocase;
+        CREATE INDEX IF NOT EXISTS idx_cursos_busqueda_codigo ON cursos(busqueda_codigo);
+        CREATE INDEX IF NOT EXISTS idx_cursos_busqueda_nombre ON cursos(busqueda_nombre);
+
+        CREATE TRIGGER IF NOT EXISTS cursos_busqueda_insertado AFTER INSERT ON cursos
+        BEGIN
+            UPDATE cursos SET busqueda_codigo = plegar(NEW.codigo), busqueda_nombre = plegar(NEW.nombre)
+            WHERE id = NEW.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS cursos_busqueda_modificado AFTER UPDATE OF nombre, codigo ON cursos
+        BEGIN
+            UPDATE cursos SET busqueda_codigo = plegar(NEW.codigo), busqueda_nombre = plegar(NEW.nombre)
+            WHERE id = NEW.id;
+        END;
+    ''',
+    # 15: número estable para los estudiantes: VACUUM puede cambiar el rowid
+    # implícito y desincronizar el índice de texto completo
+    '''
+        CREATE TABLE estudiantes_nueva (
+            id TEXT NOT NULL UNIQUE,
+            nombre TEXT NOT NULL,
+            apellido TEXT NOT NULL,
+            cedula TEXT UNIQUE,
+            email TEXT,
+            fecha_registro DATETIME DEFAULT CURRENT_TIMESTAMP,
+            numero INTEGER PRIMARY KEY
+        );
+        INSERT INTO estudiantes_nueva (id, nombre, apellido, cedula, email, fecha_registro, numero)
+            SELECT id, nombre, apellido, cedula, email, fecha_registro, rowid FROM estudiantes;
+        DROP TABLE IF EXISTS estudiantes_fts;
+        DROP TABLE estudiantes;
+        ALTER TABLE estudiantes_nueva RENAME TO estudiantes;
+
+        CREATE TRIGGER certificados_estudiante_modificado
+        AFTER UPDATE OF nombre, apellido, cedula, email ON estudiantes
+        WHEN OLD.nombre IS NOT NEW.nombre OR OLD.apellido IS NOT NEW.apellido
+          OR OLD.cedula IS NOT NEW.cedula OR OLD.email IS NOT NEW.email
+        BEGIN
+            UPDATE certificados SET desactualizado = 1
+            WHERE estudiante_id = NEW.id AND desactualizado = 0
+              AND (plantilla IS NOT NULL OR OLD.nombre IS NOT NEW.nombre
+                   OR OLD.apellido IS NOT NEW.apellido OR OLD.cedula IS NOT NEW.cedula);
+        END;
+    ''',
+]
+
+# Misma regla de email para el registro manual y la importación
+EMAIL_VALIDO = re.compile(r"[^@]+@[^@]+\.[^@]+")
+
+# Cédula: letra de nacionalidad opcional (V, E, J, P, G) y número
+FORMATO_CEDULA = re.compile(r"^([VEJPG])?-?(\d{1,10})$")
+
+# Columnas del reporte de filas no importadas
+COLUMNAS_RECHAZOS = ["fila", "motivo", "nombre", "apellido", "cedula", "email"]
+COLUMNAS_RECHAZOS_INSCRIPCIONES = ["fila", "motivo", "cedula", "curso", "estado"]
+
+# Estados de una inscripción; solo los aprobados reciben certificado
+ESTADOS_INSCRIPCION = ("inscrito", "aprobado", "reprobado")
+ESTADO_APROBADO = "aprobado"
+
+# Valores por consulta en las búsquedas con IN, por debajo del límite de
+# parámetros de las versiones antiguas de SQLite
+VALORES_POR_CONSULTA = 500
+
+# Modos de salida de la generación: un PDF por estudiante o un PDF de varias
+# páginas por curso, dividido en archivos de tamaño acotado
+MODOS_SALIDA = ("individual", "combinado")
+
+# Perfiles de los PDF del motor de texto. compacto reduce la fuente
+# incrustada y dibuja el QR como un solo trazado
+PERFILES_PDF = ("estandar", "compacto")
+
+# Cola de generación: estudiantes por lote en modo individual (en modo
+# combinado, las páginas por archivo), segundos de concesión de un lote
+# reclamado y reclamos antes de darlo por fallido
+ESTUDIANTES_POR_LOTE_COLA = 200
+CONCESION_COLA = 600
+MAX_INTENTOS_COLA = 3
+
+DIRECTORIOS = [
+    "bases_datos",
+    "certificados",
+    "templates",
+    "fonts",
+    "logs",
+    "exports"
+]
+
+def normalizar_cedula(valor):
+    # "v 12.345.678", "V12345678" y "V-12345678" quedan como "V-12345678";
+    # una celda numérica de Excel (12345678.0) como "12345678". Devuelve
+    # None si el valor no es una cédula
+    if valor is None:
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    coincidencia = FORMATO_CEDULA.match(re.sub(r"[\s.]", "", str(valor)).upper())
+    if not coincidencia:
+        return None
+    letra, numero = coincidencia.groups()
+    return f"{letra}-{numero}" if letra else numero
+
+def iterar_consulta(conn, consulta, parametros=(), tamano=1000):
+    # Recorre el resultado por bloques para no materializarlo completo
+    cursor = conn.execute(consulta, parametros)
+    while True:
+        filas = cursor.fetchmany(tamano)
+        if not filas:
+            return
+        yield from filas
+
+def plegar_busqueda(texto):
+    # Minúsculas y sin tildes: "Ética" y "ÉTICA" quedan como "etica"
+    if texto is None:
+        return None
+    descompuesto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(caracter for caracter in descompuesto if not unicodedata.combining(caracter)).casefold()
+
+def _abrir_excel(archivo):
+    # Un archivo que no es .xlsx o está dañado se informa como ValueError
+    try:
+        return openpyxl.load_workbook(archivo, read_only=True)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError) as e:
+        raise ValueError(f"No se pudo leer {os.path.basename(archivo)}: no es un archivo .xlsx válido") from e
+
+def huella_certificado(estudiante, curso, con_email=False):
+    # Huella de los datos impresos en un certificado (el email, solo si la
+    # plantilla lo imprime)
+    datos = json.dumps([list(estudiante[1:5 if con_email else 4]), list(curso[:2])], ensure_ascii=False)
+    return hashlib.sha256(datos.encode("utf-8")).hexdigest()
+
+def _imprime_email(plantilla):
+    # El motor PDF no imprime el email; una plantilla, solo si usa {email}
+    return bool(plantilla) and "email" in campos_plantilla(plantilla)
+
+# Evento de cancelación de la corrida que renderiza en este proceso
+_cancelacion = None
+
+def _cancelado():
+    return _cancelacion is not None and _cancelacion.is_set()
+
+def _inicializar_trabajador(cancelacion=None):
+    # Ctrl+C lo atiende el proceso principal
+    global _cancelacion
+    _cancelacion = cancelacion
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Sin fork (Windows, macOS) cada proceso analiza la fuente una vez aquí
+    precargar_fuente()
+
+def _dibujar_qr(pdf, matriz, x, y, lado, compacto=False):
+    # QR vectorial: un rectángulo relleno por tramo de módulos oscuros
+    modulo = lado / len(matriz)
+    pdf.set_fill_color(0)
+    if compacto and hasattr(pdf, "_out"):
+        # Un solo trazado en unidades de módulo, con enteros
+        escala = modulo * pdf.k
+        pdf._out(f"q {escala:.4f} 0 0 {-escala:.4f} {x * pdf.k:.2f} {(pdf.h - y) * pdf.k:.2f} cm")
+        pdf._out(" ".join(f"{columna} {fila} {largo} 1 re" for fila, columna, largo in tramos_qr(matriz)) + " f Q")
+        return
+    for fila, columna, largo in tramos_qr(matriz):
+        pdf.rect(x + columna * modulo, y + fila * modulo, largo * modulo, modulo, style="F")
+
+def _dibujar_certificado(pdf, estudiante, curso, fecha, certificado_id, enlace, compacto=False):
+    pdf.add_page()
+    pdf.set_font(usar_fuente(pdf, compacta=compacto), size=12)
+
+    pdf.cell(200, 10, txt="CERTIFICADO DE PARTICIPACIÓN", ln=True, align='C')
+    pdf.ln(10)
+
+    pdf.cell(200, 10, txt=f"Certificamos que {estudiante[1]} {estudiante[2]}", ln=True, align='C')
+    pdf.cell(200, 10, txt=f"con cédula {estudiante[3]}", ln=True, align='C')
+    pdf.cell(200, 10, txt=f"ha completado satisfactoriamente el curso:", ln=True, align='C')
+    pdf.ln(10)
+
+    pdf.cell(200, 10, txt=f"{curso[0]} ({curso[1]})", ln=True, align='C')
+
+    pdf.ln(20)
+    pdf.cell(200, 10, txt=f"Fecha: {fecha}", ln=True, align='C')
+
+    # ID y código QR para verificar el certificado
+    pdf.set_font_size(8)
+    pdf.cell(200, 10, txt=f"Certificado N.º {certificado_id}", ln=True, align='C')
+    matriz = matriz_qr(enlace)
+    if matriz:
+        lado = 30
+        _dibujar_qr(pdf, matriz, (pdf.w - lado) / 2, pdf.get_y() + 5, lado, compacto)
+
+def _tiempos_lote():
+    # Duraciones medidas en un proceso de trabajo, para el medidor de la corrida
+    return {"maquetacion": [], "escritura_pdf": []}
+
+def _renderizar_certificado(trabajo, tiempos=None, perfil="estandar"):
+    # Se ejecuta en los procesos de trabajo; la base la escribe el principal
+    estudiante, curso, fecha, certificado_id, enlace, archivo_certificado = trabajo
+
+    inicio = time.perf_counter()
+    pdf = FPDF()
+    _dibujar_certificado(pdf, estudiante, curso, fecha, certificado_id, enlace, perfil == "compacto")
+    maquetado = time.perf_counter()
+
+    # Guardar el PDF; sin archivo indicado se nombra por el estudiante y el curso
+    archivo_certificado = archivo_certificado or nombre_archivo_certificado(estudiante, curso)
+    with escritura_atomica(archivo_certificado) as temporal:
+        pdf.output(temporal)
+
+    if tiempos is not None:
+        tiempos["maquetacion"].append(maquetado - inicio)
+        tiempos["escritura_pdf"].append(time.perf_counter() - maquetado)
+    return archivo_certificado
+
+def _renderizar_lote(trabajos, perfil="estandar"):
+    # Si se cancela la corrida devuelve solo los certificados ya escritos
+    tiempos = _tiempos_lote()
+    resultados = []
+    for trabajo in trabajos:
+        if _cancelado():
+            break
+        resultados.append((_renderizar_certificado(trabajo, tiempos, perfil), None))
+    return resultados, tiempos
+
+def _renderizar_plantilla(trabajo):
+    return renderizar_lote_plantilla(trabajo, cancelado=_cancelado)
+
+def _intentar(trabajo):
+    # Para la cola: el error de un lote viaja con su resultado
+    funcion, argumento = trabajo
+    try:
+        return funcion(argumento), None
+    except Exception as e:
+        return None, str(e)
+
+def _renderizar_combinado(trabajo, perfil="estandar"):
+    # Un solo documento para todo el lote
+    trabajos, archivo_certificado = trabajo
+    tiempos = _tiempos_lote()
+
+    pdf = FPDF()
+    for estudiante, curso, fecha, certificado_id, enlace, _ in trabajos:
+        if _cancelado():
+            # Un archivo a medias no se escribe: ninguna de sus páginas queda emitida
+            return [], tiempos
+        inicio = time.perf_counter()
+        _dibujar_certificado(pdf, estudiante, curso, fecha, certificado_id, enlace, perfil == "compacto")
+        tiempos["maquetacion"].append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    with escritura_atomica(archivo_certificado) as temporal:
+        pdf.output(temporal)
+    tiempos["escritura_pdf"].append(time.perf_counter() - inicio)
+    return [(archivo_certificado, pagina) for pagina in range(1, len(trabajos) + 1)], tiempos
+
+def _renderizar_lotes(lotes, procesos, cancelar):
+    # Devuelve (estudiantes, resultados) de cada lote en orden; al cancelar,
+    # un lote trae solo los certificados terminados
+    global _cancelacion
+    cancelado = cancelar.is_set if cancelar else (lambda: False)
+    lotes = iter(lotes)
+    if procesos == 1:
+        _cancelacion = cancelar
+        try:
+            # Se consulta antes de pedir el lote: pedirlo puede reclamarlo de la cola
+            while not cancelado():
+                lote = next(lotes, None)
+                if lote is None:
+                    return
+                grupo, funcion, argumento = lote
+                yield grupo, funcion(argumento)
+        finally:
+            _cancelacion = None
+        return
+
+    # Si no falta ningún certificado no se crean los procesos
+    primero = next(lotes, None)
+    if primero is None:
+        return
+    lotes = chain([primero], lotes)
+
+    # Los procesos ven la cancelación por su propio evento, que se activa
+    # mientras se espera cada lote
+    evento = multiprocessing.Event()
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_trabajador,
+                             initargs=(evento,)) as executor:
+        pendientes = deque()
+        agotados = False
+        while True:
+            while not agotados and not cancelado() and len(pendientes) < procesos * 2:
+                lote = next(lotes, None)
+                if lote is None:
+                    agotados = True
+                    break
+                grupo, funcion, argumento = lote
+                pendientes.append((grupo, executor.submit(funcion, argumento)))
+
+            if not pendientes:
+                return
+
+            grupo, futuro = pendientes.popleft()
+            while True:
+                if cancelado():
+                    evento.set()
+                try:
+                    resultado = futuro.result(timeout=0.2)
+                    break
+                except TimeoutError:
+                    continue
+            yield grupo, resultado
+
+class SistemaCertificados:
+    # Lógica de importación, consulta y generación sin dependencias de la
+    # interfaz gráfica. Los errores de validación se informan con ValueError
+    # y los de base de datos con las excepciones de sqlite3
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join('bases_datos', 'unexca_certificados.db')
+
+        # Procesos de trabajo para la generación de certificados
+        self.procesos_generacion = os.cpu_count() or 1
+
+        # Certificados registrados por transacción durante la generación
+        self.certificados_por_transaccion = 500
+
+        # Salida de la generación y páginas máximas por PDF combinado
+        self.modo_salida = "individual"
+        self.paginas_por_archivo = 500
+
+        # Plantilla de templates/ para el motor de imágenes (None usa el PDF
+        # de texto) y formato de los certificados generados con ella
+        self.plantilla = None
+        self.formato_plantilla = "pdf"
+
+        # Perfil de los PDF del motor de texto (PERFILES_PDF)
+        self.perfil_pdf = "estandar"
+
+        # Dirección del servicio de verificación que se imprime en el QR
+        self.url_verificacion = URL_VERIFICACION
+
+        # Filas insertadas por transacción al importar desde Excel
+        self.estudiantes_por_transaccion = 5000
+
+        # Crear directorios necesarios
+        self.crear_directorios()
+
+        # Registro estructurado y rotativo en logs/
+        configurar_registro()
+
+        # Inicializar base de datos
+        self.inicializar_base_datos()
+
+    def crear_directorios(self):
+        for directorio in DIRECTORIOS:
+            os.makedirs(directorio, exist_ok=True)
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+
+    def inicializar_base_datos(self):
+        self.conn = self.conectar_base_datos()
+        self.cursor = self.conn.cursor()
+
+        self.aplicar_migraciones()
+
+        self.inicializar_busqueda()
+
+        self.conn.commit()
+
+    def conectar_base_datos(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.create_function("plegar", 1, plegar_busqueda, deterministic=True)
+
+        # WAL permite leer mientras otra conexión escribe; no funciona en una
+        # carpeta de red
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA cache_size = -64000")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def aplicar_migraciones(self):
+        version = self.cursor.execute("PRAGMA user_version").fetchone()[0]
+        # Reconstruir una tabla referida por otras exige desactivar las claves
+        # foráneas, y SQLite solo lo permite fuera de una transacción
+        self.cursor.execute("PRAGMA foreign_keys = OFF")
+        try:
+            for numero, script in enumerate(MIGRACIONES[version:], start=version + 1):
+                try:
+                    self.cursor.executescript(f"""
+                        BEGIN;
+                        {script}
+                        PRAGMA user_version = {numero};
+                        COMMIT;
+                    """)
+                except sqlite3.Error:
+                    self.conn.rollback()
+                    raise
+        finally:
+            self.cursor.execute("PRAGMA foreign_keys = ON")
+
+    def inicializar_busqueda(self):
+        # Índice de texto completo sobre los estudiantes. No es una migración
+        # porque depende de que SQLite tenga FTS5
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'estudiantes_fts'")
+        if self.cursor.fetchone():
+            self.busqueda_fts = True
+            return
+
+        try:
+            self.cursor.executescript('''
+                CREATE VIRTUAL TABLE estudiantes_fts USING fts5(
+                    nombre, apellido, cedula, email,
+                    content='estudiantes', content_rowid='numero',
+                    tokenize='unicode61 remove_diacritics 2'
+                );
+
+                CREATE TRIGGER estudiantes_fts_insert AFTER INSERT ON estudiantes BEGIN
+                    INSERT INTO estudiantes_fts(rowid, nombre, apellido, cedula, email)
+                    VALUES (new.numero, new.nombre, new.apellido, new.cedula, new.email);
+                END;
+
+                CREATE TRIGGER estudiantes_fts_delete AFTER DELETE ON estudiantes BEGIN
+                    INSERT INTO estudiantes_fts(estudiantes_fts, rowid, nombre, apellido, cedula, email)
+                    VALUES ('delete', old.numero, old.nombre, old.apellido, old.cedula, old.email);
+                END;
+
+                CREATE TRIGGER estudiantes_fts_update AFTER UPDATE ON estudiantes BEGIN
+                    INSERT INTO estudiantes_fts(estudiantes_fts, rowid, nombre, apellido, cedula, email)
+                    VALUES ('delete', old.numero, old.nombre, old.apellido, old.cedula, old.email);
+                    INSERT INTO estudiantes_fts(rowid, nombre, apellido, cedula, email)
+                    VALUES (new.numero, new.nombre, new.apellido, new.cedula, new.email);
+                END;
+
+                INSERT INTO estudiantes_fts(estudiantes_fts) VALUES ('rebuild');
+            ''')
+            self.busqueda_fts = True
+        except sqlite3.OperationalError:
+            # SQLite compilado sin FTS5: la búsqueda usa LIKE por prefijo
+            self.busqueda_fts = False
+
+    def cerrar(self):
+        self.conn.close()
+
+    def registrar_estudiante(self, datos):
+        # Validaciones básicas
+        for campo in ("nombre", "apellido", "cedula", "email"):
+            if not datos.get(campo):
+                raise ValueError(f"El campo {campo} no puede estar vacío")
+
+        # Validar email
+        if not EMAIL_VALIDO.match(datos['email']):
+            raise ValueError("Email inválido")
+
+        cedula = normalizar_cedula(datos['cedula'])
+        if not cedula:
+            raise ValueError("Cédula inválida")
+
+        # Generar ID único
+        estudiante_id = str(uuid.uuid4())
+
+        self.cursor.execute('''
+            INSERT INTO estudiantes (id, nombre, apellido, cedula, email)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (estudiante_id, datos['nombre'], datos['apellido'],
+              cedula, datos['email']))
+
+        self.conn.commit()
+        return estudiante_id
+
+    def registrar_curso(self, datos):
+        # Validaciones básicas
+        for campo in ("nombre", "codigo", "area", "duracion", "descripcion", "instructor"):
+            if not datos.get(campo):
+                raise ValueError(f"El campo {campo} no puede estar vacío")
+
+        # Generar ID único
+        curso_id = str(uuid.uuid4())
+
+        self.cursor.execute('''
+            INSERT INTO cursos (id, nombre, codigo, area, duracion, descripcion, instructor)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (curso_id, datos['nombre'], datos['codigo'], datos['area'],
+              datos['duracion'], datos['descripcion'], datos['instructor']))
+
+        self.conn.commit()
+        return curso_id
+
+    def revocar_certificado(self, certificado_id, motivo):
+        if not motivo:
+            raise ValueError("Debe indicar el motivo de la revocación")
+
+        revocado_en = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.cursor.execute('''
+            UPDATE certificados SET revocado_en = ?, motivo_revocacion = ?
+            WHERE id = ? AND revocado_en IS NULL
+        ''', (revocado_en, motivo, certificado_id))
+        if self.cursor.rowcount == 0:
+            self.cursor.execute("SELECT 1 FROM certificados WHERE id = ?", (certificado_id,))
+            if self.cursor.fetchone():
+                raise ValueError("El certificado ya estaba revocado")
+            raise ValueError("Certificado no encontrado")
+
+        self.conn.commit()
+        return revocado_en
+
+    def _iterar(self, consulta, parametros=(), tamano=1000):
+        return iterar_consulta(self.conn, consulta, parametros, tamano)
+
+    def listar_estudiantes(self):
+        return self._iterar("SELECT id, nombre, apellido, cedula, email, fecha_registro FROM estudiantes")
+
+    def listar_cursos(self):
+        # Sin las columnas de búsqueda de la migración 14
+        return self._iterar(
+            "SELECT id, nombre, codigo, area, duracion, descripcion, instructor, fecha_creacion FROM cursos"
+        )
+
+    def buscar_curso_por_codigo(self, codigo):
+        self.cursor.execute("SELECT * FROM cursos WHERE codigo = ?", (codigo,))
+        return self.cursor.fetchone()
+
+    def buscar_cursos(self, texto, limite=20):
+        # Cursos cuyo código o nombre empieza por texto, sin distinguir
+        # mayúsculas ni tildes: [(id, nombre, codigo)], primero por código
+        texto = plegar_busqueda(texto.strip())
+        if not texto:
+            return []
+
+        cursos = {}
+        for columna in ("busqueda_codigo", "busqueda_nombre"):
+            for curso in self.conn.execute(f'''
+                SELECT id, nombre, codigo FROM cursos
+                WHERE {columna} >= ? AND {columna} < ?
+                ORDER BY {columna}
+                LIMIT ?
+            ''', (texto, texto + "\U0010FFFF", limite)):
+                cursos.setdefault(curso[0], curso)
+        return list(cursos.values())[:limite]
+
+    def filtro_busqueda(self, texto):
+        terminos = re.findall(r"\w+", texto)
+        if not terminos:
+            return None
+
+        if self.busqueda_fts:
+            # Cada término se busca como prefijo en cualquiera de las columnas
+            consulta = " ".join(f'"{termino}"*' for termino in terminos)
+            return (
+                "numero IN (SELECT rowid FROM estudiantes_fts WHERE estudiantes_fts MATCH ?)",
+                (consulta,)
+            )
+
+        patron = texto.strip() + "%"
+        return (
+            "(nombre LIKE ? OR apellido LIKE ? OR cedula LIKE ? OR email LIKE ?)",
+            (patron, patron, patron, patron)
+        )
+
+    def importar_estudiantes_excel(self, archivo):
+        # Las filas se validan e insertan por bloques; las que no se importan
+        # van con su motivo a un reporte CSV de exports/
+        medidor = MedidorEtapas("importacion", archivo=os.path.basename(archivo))
+        with medidor.etapa("apertura"):
+            wb = _abrir_excel(archivo)
+        rechazos = None
+        try:
+            inicio = time.monotonic()
+            leidas = insertadas = rechazadas = 0
+
+            # Cédulas ya registradas, normalizadas, en una sola consulta: los
+            # duplicados se detectan en memoria y no por errores de SQLite
+            with medidor.etapa("cedulas"):
+                existentes = {
+                    normalizar_cedula(cedula) or cedula
+                    for (cedula,) in self.conn.execute("SELECT cedula FROM estudiantes")
+                }
+            vistas = set()
+
+            for bloque in self._bloques_excel(wb.active, medidor):
+                leidas += len(bloque)
+                with medidor.etapa("validacion"):
+                    validas, invalidas = self._validar_estudiantes(bloque, existentes, vistas)
+                if invalidas:
+                    if rechazos is None:
+                        rechazos = self._abrir_reporte_rechazos(archivo, COLUMNAS_RECHAZOS)
+                    rechazos[1].writerows(invalidas)
+                    rechazadas += len(invalidas)
+                if validas:
+                    with medidor.etapa("insercion"):
+                        insertadas += self._insertar_estudiantes(validas)
+        except Exception as e:
+            self.conn.rollback()
+            medidor.finalizar(estado='error', error=str(e))
+            raise
+        finally:
+            wb.close()
+            if rechazos is not None:
+                rechazos[0].close()
+
+        duracion = max(time.monotonic() - inicio, 1e-6)
+        resultado = {
+            'leidas': leidas,
+            'insertadas': insertadas,
+            # Cédulas que otra importación registró mientras corría esta
+            'omitidas': leidas - rechazadas - insertadas,
+            # Filas del reporte: incompletas o inválidas, cédulas repetidas en
+            # el archivo y ya registradas
+            'rechazadas': rechazadas,
+            'reporte': rechazos[0].name if rechazos else None,
+            'segundos': round(duracion, 3),
+            'filas_por_segundo': round(leidas / duracion, 1)
+        }
+        resultado['etapas'] = medidor.finalizar(**resultado)
+        return resultado
+
+    def _validar_estudiantes(self, bloque, existentes, vistas):
+        # bloque: [(número de fila, valores)]. Devuelve las filas a insertar
+        # y las rechazadas, como filas del reporte
+        validas, invalidas = [], []
+        for numero, fila in bloque:
+            valores = [None if valor is None else str(valor).strip() for valor in fila[:4]]
+            valores += [None] * (4 - len(valores))
+            nombre, apellido, cedula_original, email = valores
+
+            motivo = None
+            if len(fila) < 4:
+                motivo = "Fila incompleta"
+            else:
+                for campo, valor in zip(("nombre", "apellido", "cedula", "email"), valores):
+                    if not valor:
+                        motivo = f"El campo {campo} está vacío"
+                        break
+            if motivo is None:
+                cedula = normalizar_cedula(fila[2])
+                if not cedula:
+                    motivo = "Cédula inválida"
+                elif not EMAIL_VALIDO.match(email):
+                    motivo = "Email inválido"
+                elif cedula in vistas:
+                    motivo = "Cédula repetida en el archivo"
+                elif cedula in existentes:
+                    motivo = "Cédula ya registrada"
+
+            if motivo:
+                invalidas.append((numero, motivo, nombre, apellido, cedula_original, email))
+            else:
+                vistas.add(cedula)
+                validas.append((str(uuid.uuid4()), nombre, apellido, cedula, email))
+        return validas, invalidas
+
+    def importar_inscripciones_excel(self, archivo):
+        # Columnas: cédula, código del curso y estado (vacío es inscrito). Una
+        # fila de una inscripción existente actualiza su estado
+        medidor = MedidorEtapas("importacion_inscripciones", archivo=os.path.basename(archivo))
+        with medidor.etapa("apertura"):
+            wb = _abrir_excel(archivo)
+        rechazos = None
+        try:
+            inicio = time.monotonic()
+            leidas = inscritas = rechazadas = 0
+            cursos = dict(self.conn.execute("SELECT codigo, id FROM cursos"))
+
+            for bloque in self._bloques_excel(wb.active, medidor):
+                leidas += len(bloque)
+                with medidor.etapa("validacion"):
+                    validas, invalidas = self._validar_inscripciones(bloque, cursos)
+                if invalidas:
+                    if rechazos is None:
+                        rechazos = self._abrir_reporte_rechazos(archivo, COLUMNAS_RECHAZOS_INSCRIPCIONES)
+                    rechazos[1].writerows(invalidas)
+                    rechazadas += len(invalidas)
+                if validas:
+                    with medidor.etapa("insercion"), self.conn:
+                        self.cursor.executemany('''
+                            INSERT INTO inscripciones (curso_id, estudiante_id, estado)
+                            VALUES (?, ?, ?)
+                            ON CONFLICT(curso_id, estudiante_id) DO UPDATE SET estado = excluded.estado
+                        ''', validas)
+                    inscritas += len(validas)
+        except Exception as e:
+            self.conn.rollback()
+            medidor.finalizar(estado='error', error=str(e))
+            raise
+        finally:
+            wb.close()
+            if rechazos is not None:
+                rechazos[0].close()
+
+        duracion = max(time.monotonic() - inicio, 1e-6)
+        resultado = {
+            'leidas': leidas,
+            # Inscripciones nuevas o con su estado actualizado
+            'inscritas': inscritas,
+            'rechazadas': rechazadas,
+            'reporte': rechazos[0].name if rechazos else None,
+            'segundos': round(duracion, 3),
+            'filas_por_segundo': round(leidas / duracion, 1)
+        }
+        resultado['etapas'] = medidor.finalizar(**resultado)
+        return resultado
+
+    def _validar_inscripciones(self, bloque, cursos):
+        # Devuelve las inscripciones a registrar, (curso_id, estudiante_id,
+        # estado), y las filas rechazadas para el reporte
+        cedulas = {}
+        for numero, fila in bloque:
+            cedula = normalizar_cedula(fila[0]) if fila else None
+            if cedula:
+                cedulas[cedula] = None
+        cedulas = list(cedulas)
+        estudiantes = {}
+        for i in range(0, len(cedulas), VALORES_POR_CONSULTA):
+            parte = cedulas[i:i + VALORES_POR_CONSULTA]
+            estudiantes.update(self.conn.execute(
+                f"SELECT cedula, id FROM estudiantes WHERE cedula IN ({', '.join('?' * len(parte))})", parte
+            ))
+
+        validas, invalidas = [], []
+        for numero, fila in bloque:
+            valores = [None if valor is None else str(valor).strip() for valor in fila[:3]]
+            valores += [None] * (3 - len(valores))
+            cedula_original, codigo, estado = valores
+            estado = (estado or ESTADOS_INSCRIPCION[0]).lower()
+
+            cedula = normalizar_cedula(fila[0])
+            if not cedula_original or not codigo:
+                motivo = "Fila incompleta"
+            elif not cedula:
+                motivo = "Cédula inválida"
+            elif cedula not in estudiantes:
+                motivo = "Estudiante no registrado"
+            elif codigo not in cursos:
+                motivo = "Curso no encontrado"
+            elif estado not in ESTADOS_INSCRIPCION:
+                motivo = "Estado inválido"
+            else:
+                validas.append((cursos[codigo], estudiantes[cedula], estado))
+                continue
+            invalidas.append((numero, motivo, cedula_original, codigo, valores[2]))
+        return validas, invalidas
+
+    def _bloques_excel(self, hoja, medidor):
+        # Bloques de (número de fila, valores) desde la segunda fila, sin las
+        # vacías
+        bloque = []
+        lectura = time.perf_counter()
+        for numero, fila in enumerate(hoja.iter_rows(min_row=2, values_only=True), start=2):
+            if not any(valor is not None for valor in fila):
+                continue
+            bloque.append((numero, fila))
+            if len(bloque) >= self.estudiantes_por_transaccion:
+                medidor.registrar("lectura", time.perf_counter() - lectura)
+                yield bloque
+                bloque = []
+                lectura = time.perf_counter()
+
+        medidor.registrar("lectura", time.perf_counter() - lectura)
+        if bloque:
+            yield bloque
+
+    def _abrir_reporte_rechazos(self, archivo, columnas):
+        # exports/rechazos_<archivo>_<fecha>.csv, o con sufijo _2, _3... si ya
+        # existe; devuelve (archivo, escritor)
+        marca = datetime.now().strftime('%Y%m%d_%H%M%S')
+        nombre = os.path.splitext(os.path.basename(archivo))[0]
+        for numero in count(1):
+            sufijo = f"_{numero}" if numero > 1 else ""
+            try:
+                salida = open(os.path.join("exports", f"rechazos_{nombre}_{marca}{sufijo}.csv"), "x",
+                              newline="", encoding="utf-8")
+                break
+            except FileExistsError:
+                continue
+        escritor = csv.writer(salida)
+        escritor.writerow(columnas)
+        return salida, escritor
+
+    def _insertar_estudiantes(self, bloque):
+        # Devuelve las filas realmente insertadas; a diferencia de
+        # total_changes, rowcount no cuenta las escrituras de los disparadores
+        with self.conn:
+            self.cursor.executemany('''
+                INSERT OR IGNORE INTO estudiantes (id, nombre, apellido, cedula, email)
+                VALUES (?, ?, ?, ?, ?)
+            ''', bloque)
+        bloque.clear()
+        return self.cursor.rowcount
+
+    def generar_certificados(self, curso_id, procesos=None, por_transaccion=None,
+                             progreso=None, cancelar=None, modo=None, paginas_por_archivo=None,
+                             plantilla=None, formato=None, perfil=None):
+        # progreso(generados, omitidos, total) se invoca tras cada lote y
+        # cancelar es un threading.Event. Usa su propia conexión
+        procesos = procesos or self.procesos_generacion
+        por_transaccion = por_transaccion or self.certificados_por_transaccion
+        modo, paginas_por_archivo, plantilla, formato, perfil = self._opciones_salida(
+            modo, paginas_por_archivo, plantilla, formato, perfil
+        )
+        progreso = progreso or (lambda generados, omitidos, total: None)
+
+        # Maquetación y escritura se miden en los procesos de trabajo;
+        # consulta y commit, en el proceso principal
+        medidor = MedidorEtapas("generacion", curso_id=curso_id, modo=modo, procesos=procesos,
+                                plantilla=plantilla, perfil=perfil)
+        conn = self.conectar_base_datos()
+        try:
+            with medidor.etapa("consulta"):
+                cursor = conn.cursor()
+                # El curso es el mismo para toda la corrida: se resuelve una sola vez
+                cursor.execute("SELECT nombre, codigo FROM cursos WHERE id = ?", (curso_id,))
+                curso = cursor.fetchone()
+                if not curso:
+                    raise ValueError("Curso no encontrado")
+
+                # Solo los aprobados del curso: el trabajo es proporcional a
+                # su lista y no a toda la tabla de estudiantes
+                cursor.execute(
+                    "SELECT COUNT(*) FROM inscripciones WHERE curso_id = ? AND estado = ?",
+                    (curso_id, ESTADO_APROBADO)
+                )
+                estudiantes = cursor.fetchone()[0]
+                if not estudiantes:
+                    raise ValueError("No hay estudiantes aprobados en este curso")
+
+            # Una sola fecha para todos los certificados de la corrida
+            fecha = datetime.now()
+
+            # Los estudiantes se leen por páginas a medida que se generan
+            conteo = {'omitidos': 0}
+            pendientes = self._estudiantes_pendientes(conn, curso_id, conteo, medidor)
+
+            # Las filas se acumulan y se escriben por bloques en una sola
+            # transacción: una caída pierde como máximo el bloque en curso
+            filas = []
+            hechos = avance = tamano_archivos = 0
+            con_email = _imprime_email(plantilla)
+            perfil_certificados = None if plantilla else perfil
+            progreso(0, 0, estudiantes)
+            try:
+                # Generar certificados en PDF
+                precargar_fuente(compacta=perfil == "compacto")
+                procesos = min(procesos, estudiantes)
+                lotes = self._preparar_lotes(pendientes, estudiantes, curso, fecha, procesos, modo,
+                                             paginas_por_archivo, plantilla, formato, perfil)
+                for lote_estudiantes, (resultados, tiempos) in _renderizar_lotes(lotes, procesos, cancelar):
+                    medidor.combinar(tiempos)
+                    for (estudiante, certificado_id), (archivo_certificado, pagina) in zip(lote_estudiantes, resultados):
+                        filas.append(self._fila_certificado(
+                            certificado_id, estudiante[0], curso_id, archivo_certificado, fecha, pagina,
+                            huella_certificado(estudiante, curso, con_email), plantilla, perfil_certificados
+                        ))
+                    if len(filas) >= por_transaccion:
+                        with medidor.etapa("commit"):
+                            self._guardar_certificados(conn, filas)
+                    tamano_archivos += sum(
+                        os.path.getsize(archivo_certificado)
+                        for archivo_certificado in {archivo_certificado for archivo_certificado, pagina in resultados}
+                    )
+                    # Un lote cancelado trae solo los certificados terminados
+                    hechos += len(resultados)
+                    avance = hechos + conteo['omitidos']
+                    progreso(hechos, conteo['omitidos'], estudiantes)
+            finally:
+                # Registrar lo ya escrito en disco aunque la corrida se interrumpa
+                if filas:
+                    with medidor.etapa("commit"):
+                        self._guardar_certificados(conn, filas)
+
+            # total: certificados que faltaban. Si la corrida se cancela es
+            # una cota, porque los estudiantes no recorridos no se revisaron
+            # bytes: tamaño en disco de los archivos escritos en la corrida
+            resultado = {
+                'estado': 'fin',
+                'generados': hechos,
+                'total': estudiantes - conteo['omitidos'],
+                'omitidos': conteo['omitidos'],
+                'bytes': tamano_archivos,
+                'bytes_por_certificado': round(tamano_archivos / hechos) if hechos else 0
+            }
+            if hechos < resultado['total']:
+                resultado['estado'] = 'cancelado'
+            elif avance < estudiantes:
+                # Omitidos recorridos después del último lote
+                progreso(hechos, conteo['omitidos'], estudiantes)
+            resultado['etapas'] = medidor.finalizar(**resultado)
+            # El medidor ya registra el perfil como dato de la corrida
+            resultado['perfil'] = perfil
+            return resultado
+        except Exception as e:
+            medidor.finalizar(estado='error', error=str(e))
+            raise
+        finally:
+            conn.close()
+
+    def crear_ejecutor_render(self, procesos):
+        # Ejecutor para emitir_certificados, con la fuente ya cargada
+        compacta = self.perfil_pdf == "compacto"
+        precargar_fuente(compacta=compacta)
+        if procesos == 1:
+            return ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+        ejecutor = ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_trabajador)
+        ejecutor.submit(precargar_fuente, compacta=compacta).result()
+        return ejecutor
+
+    def emitir_certificados(self, conn, pendientes, ejecutor, procesos=1, fecha=None, medidor=None):
+        # pendientes: [(estudiante, (curso_id, nombre, codigo), certificado_id)].
+        # Devuelve (certificado_id, archivo, pagina, fecha_emision, emitido) de cada uno
+        fecha = fecha or datetime.now()
+        medidor = medidor or MedidorEtapas("emision_certificados")
+        fecha_texto = fecha.strftime('%Y-%m-%d')
+        marca = uuid.uuid4().hex[:8]
+        renombres = [
+            (f"{archivo_certificado}.{marca}.tmp", archivo_certificado)
+            for archivo_certificado in (
+                nombre_archivo_certificado(estudiante, curso[1:]) for estudiante, curso, certificado_id in pendientes
+            )
+        ]
+        trabajos = [
+            (estudiante, curso[1:], fecha_texto, certificado_id,
+             enlace_verificacion(certificado_id, self.url_verificacion), temporal)
+            for (estudiante, curso, certificado_id), (temporal, archivo_certificado) in zip(pendientes, renombres)
+        ]
+        tamano = -(-len(trabajos) // procesos)
+        try:
+            with medidor.etapa("render"):
+                partes = [
+                    ejecutor.submit(partial(_renderizar_lote, perfil=self.perfil_pdf), trabajos[inicio:inicio + tamano])
+                    for inicio in range(0, len(trabajos), tamano)
+                ]
+                for parte in partes:
+                    medidor.combinar(parte.result()[1])
+        except BaseException:
+            self._descartar_temporales(renombres)
+            raise
+
+        # Una generación pudo registrar el certificado mientras se renderizaba
+        fecha_emision = fecha.strftime('%Y-%m-%d %H:%M:%S')
+        emitidos, filas = [], []
+        with medidor.etapa("commit"):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for (estudiante, curso, certificado_id), (temporal, archivo_certificado) in zip(pendientes, renombres):
+                    registrado = conn.execute('''
+                        SELECT id, archivo_certificado, pagina, fecha_emision FROM certificados
+                        WHERE estudiante_id = ? AND curso_id = ?
+                    ''', (estudiante[0], curso[0])).fetchone()
+                    if registrado and registrado[0] != certificado_id:
+                        os.remove(temporal)
+                        emitidos.append((*registrado, False))
+                        continue
+                    os.replace(temporal, archivo_certificado)
+                    filas.append(self._fila_certificado(
+                        certificado_id, estudiante[0], curso[0], archivo_certificado, fecha,
+                        huella=huella_certificado(estudiante, curso[1:]), perfil=self.perfil_pdf
+                    ))
+                    emitidos.append((certificado_id, archivo_certificado, None, fecha_emision, True))
+            except BaseException:
+                conn.rollback()
+                self._descartar_temporales(renombres)
+                raise
+            self._guardar_certificados(conn, filas)
+        return emitidos
+
+    def _opciones_salida(self, modo, paginas_por_archivo, plantilla, formato, perfil):
+        # Completa las opciones de salida con la configuración y las valida
+        modo = modo or self.modo_salida
+        perfil = perfil or self.perfil_pdf
+        if perfil not in PERFILES_PDF:
+            raise ValueError(f"Perfil de PDF desconocido: {perfil}")
+        paginas_por_archivo = paginas_por_archivo or self.paginas_por_archivo
+        if modo not in MODOS_SALIDA:
+            raise ValueError(f"Modo de salida desconocido: {modo}")
+        plantilla = plantilla or self.plantilla
+        formato = formato or self.formato_plantilla
+        if plantilla:
+            if modo != "individual":
+                raise ValueError("Las plantillas solo admiten un archivo por estudiante")
+            if formato not in FORMATOS_PLANTILLA:
+                raise ValueError(f"Formato de plantilla desconocido: {formato}")
+            # Cargarla aquí informa una plantilla inválida antes de empezar
+            cargar_plantilla(plantilla)
+        return modo, paginas_por_archivo, plantilla, formato, perfil
+
+    def _estudiantes_pendientes(self, conn, curso_id, conteo, medidor, tamano=1000, desde="", hasta=None):
+        # (estudiante, certificado_id) de los aprobados sin archivo en disco, por páginas;
+        # los ya emitidos y los revocados se cuentan en conteo['omitidos']
+        filtro, limite = ("AND i.estudiante_id <= ?", (hasta,)) if hasta is not None else ("", ())
+        ultimo = desde
+        while True:
+            with medidor.etapa("consulta"):
+                filas = conn.execute(f'''
+                    SELECT e.*, c.id, c.archivo_certificado, c.revocado_en
+                    FROM inscripciones i
+                    JOIN estudiantes e ON e.id = i.estudiante_id
+                    LEFT JOIN certificados c ON c.estudiante_id = i.estudiante_id AND c.curso_id = i.curso_id
+                    WHERE i.curso_id = ? AND i.estado = ? AND i.estudiante_id > ? {filtro}
+                    ORDER BY i.estudiante_id
+                    LIMIT ?
+                ''', (curso_id, ESTADO_APROBADO, ultimo, *limite, tamano)).fetchall()
+            if not filas:
+                return
+            ultimo = filas[-1][0]
+
+            for fila in filas:
+                estudiante, (certificado_id, archivo_certificado, revocado_en) = fila[:-3], fila[-3:]
+                if revocado_en or archivo_certificado and os.path.exists(archivo_certificado):
+                    conteo['omitidos'] += 1
+                    continue
+                # El ID se asigna antes de generar porque va impreso en el
+                # certificado; uno que se regenera conserva el que ya tenía
+                yield estudiante, certificado_id or str(uuid.uuid4())
+
+    def _preparar_lotes(self, estudiantes, total, curso, fecha, procesos, modo, paginas_por_archivo,
+                        plantilla=None, formato=None, perfil="estandar"):
+        # estudiantes: iterable de (estudiante, certificado_id). Devuelve los
+        # lotes como (estudiantes, función de trabajo, argumento)
+        fecha_texto = fecha.strftime('%Y-%m-%d')
+        estudiantes = iter(estudiantes)
+
+        def trabajos(grupo):
+            return [
+                (estudiante, curso, fecha_texto, certificado_id,
+                 enlace_verificacion(certificado_id, self.url_verificacion), None)
+                for estudiante, certificado_id in grupo
+            ]
+
+        def grupos(tamano):
+            while True:
+                grupo = list(islice(estudiantes, tamano))
+                if not grupo:
+                    return
+                yield grupo
+
+        if modo == "combinado":
+            # Archivos de tamaño acotado, repartidos entre todos los procesos
+            tamano = max(1, min(paginas_por_archivo, -(-total // procesos)))
+            # La marca de la corrida evita pisar los archivos de otra que
+            # empiece en el mismo segundo, como una reanudación inmediata
+            marca = f"{fecha.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+            for numero, grupo in enumerate(grupos(tamano), start=1):
+                archivo_certificado = f"certificados/{curso[1]}_{marca}_{numero:04d}.pdf"
+                yield grupo, partial(_renderizar_combinado, perfil=perfil), (trabajos(grupo), archivo_certificado)
+            return
+
+        tamano = 1 if procesos == 1 else max(1, min(64, total // (procesos * 4)))
+        for grupo in grupos(tamano):
+            if plantilla:
+                yield grupo, _renderizar_plantilla, (plantilla, formato, trabajos(grupo))
+            else:
+                yield grupo, partial(_renderizar_lote, perfil=perfil), trabajos(grupo)
+
+    def _fila_certificado(self, certificado_id, estudiante_id, curso_id, archivo_certificado, fecha, pagina=None,
+                          huella=None, plantilla=None, perfil=None):
+        # perfil: el del PDF generado, None para las plantillas
+        fecha_emision = fecha.strftime('%Y-%m-%d %H:%M:%S')
+        return (certificado_id, estudiante_id, curso_id, fecha_emision, archivo_certificado, pagina, huella, plantilla,
+                perfil)
+
+    def _guardar_certificados(self, conn, filas):
+        # Registrar el bloque de certificados en la base de datos; si el
+        # certificado ya existía (su archivo se había perdido) se actualiza
+        with conn:
+            conn.executemany('''
+                INSERT INTO certificados (id, estudiante_id, curso_id, fecha_emision, archivo_certificado, pagina,
+                                          huella, plantilla, perfil)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(estudiante_id, curso_id) DO UPDATE SET
+                    fecha_emision = excluded.fecha_emision,
+                    archivo_certificado = excluded.archivo_certificado,
+                    pagina = excluded.pagina,
+                    huella = excluded.huella,
+                    plantilla = excluded.plantilla,
+                    perfil = excluded.perfil,
+                    desactualizado = 0
+            ''', filas)
+        filas.clear()
+
+    def regenerar_desactualizados(self, curso_id=None, procesos=None, progreso=None, cancelar=None):
+        # Regenera los certificados marcados cuya huella cambió, con su ID, fecha,
+        # archivo y perfil. progreso(hechos, total) y cancelar, como al generar
+        procesos = procesos or self.procesos_generacion
+        progreso = progreso or (lambda hechos, total: None)
+
+        medidor = MedidorEtapas("regeneracion", curso_id=curso_id, procesos=procesos)
+        conn = self.conectar_base_datos()
+        try:
+            with medidor.etapa("consulta"):
+                filtro, parametros = ("AND curso_id = ?", (curso_id,)) if curso_id else ("", ())
+                total = conn.execute(
+                    f"SELECT COUNT(*) FROM certificados WHERE desactualizado = 1 AND revocado_en IS NULL {filtro}",
+                    parametros
+                ).fetchone()[0]
+
+            # archivos: los escritos, que en un PDF combinado incluyen páginas
+            # no marcadas
+            conteo = {'regenerados': 0, 'vigentes': 0, 'omitidos': 0, 'archivos': 0}
+            avance = 0
+            progreso(0, total)
+            if total:
+                for perfil in PERFILES_PDF:
+                    precargar_fuente(compacta=perfil == "compacto")
+                procesos = min(procesos, total)
+                lotes = self._lotes_desactualizados(conn, curso_id, total, procesos, conteo, medidor)
+                for (actualizaciones, marcados), (resultados, tiempos) in _renderizar_lotes(lotes, procesos, cancelar):
+                    medidor.combinar(tiempos)
+                    with medidor.etapa("commit"), conn:
+                        conn.executemany(
+                            "UPDATE certificados SET huella = ?, pagina = ?, desactualizado = 0 WHERE id = ?",
+                            [
+                                (huella, pagina, certificado_id)
+                                for (huella, certificado_id), (archivo_certificado, pagina) in zip(actualizaciones, resultados)
+                            ]
+                        )
+                    # Un lote cancelado solo regeneró sus primeros certificados
+                    conteo['regenerados'] += marcados if len(resultados) == len(actualizaciones) else len(resultados)
+                    conteo['archivos'] += len({archivo_certificado for archivo_certificado, pagina in resultados})
+                    avance = conteo['regenerados'] + conteo['vigentes'] + conteo['omitidos']
+                    progreso(avance, total)
+
+            hechos = conteo['regenerados'] + conteo['vigentes'] + conteo['omitidos']
+            resultado = {'estado': 'fin' if hechos >= total else 'cancelado', 'total': total, **conteo}
+            if resultado['estado'] == 'fin' and avance < total:
+                # Vigentes u omitidos recorridos después del último lote
+                progreso(total, total)
+            resultado['etapas'] = medidor.finalizar(**resultado)
+            return resultado
+        except Exception as e:
+            medidor.finalizar(estado='error', error=str(e))
+            raise
+        finally:
+            conn.close()
+
+    def _lotes_desactualizados(self, conn, curso_id, total, procesos, conteo, medidor, tamano=1000):
+        # Lotes como en _preparar_lotes, con ([(huella, certificado_id)], marcados).
+        # Los vigentes se desmarcan aquí mismo
+        filtro, parametros = ("AND c.curso_id = ?", (curso_id,)) if curso_id else ("", ())
+        por_lote = 1 if procesos == 1 else max(1, min(64, total // (procesos * 4)))
+        combinados = set()
+        vigentes = []
+        con_email = {}
+
+        def desmarcar():
+            if vigentes:
+                with medidor.etapa("commit"), conn:
+                    conn.executemany("UPDATE certificados SET desactualizado = 0 WHERE id = ?", vigentes)
+                conteo['vigentes'] += len(vigentes)
+                vigentes.clear()
+
+        ultimo = ""
+        while True:
+            with medidor.etapa("consulta"):
+                filas = conn.execute(f'''
+                    SELECT c.id, c.archivo_certificado, c.pagina, c.fecha_emision, c.huella, c.plantilla, c.perfil,
+                           k.nombre, k.codigo, e.*
+                    FROM certificados c
+                    JOIN cursos k ON k.id = c.curso_id
+                    JOIN estudiantes e ON e.id = c.estudiante_id
+                    WHERE c.desactualizado = 1 AND c.revocado_en IS NULL AND c.id > ? {filtro}
+                    ORDER BY c.id
+                    LIMIT ?
+                ''', (ultimo, *parametros, tamano)).fetchall()
+            if not filas:
+                return
+            ultimo = filas[-1][0]
+
+            individuales = {}
+            for fila in filas:
+                certificado_id, archivo_certificado, pagina, fecha_emision, huella, plantilla, perfil = fila[:7]
+                curso, estudiante = fila[7:9], fila[9:]
+                if pagina is not None and archivo_certificado in combinados:
+                    # Página de un archivo ya regenerado: se contó con él
+                    continue
+                if plantilla not in con_email:
+                    con_email[plantilla] = _imprime_email(plantilla)
+                nueva = huella_certificado(estudiante, curso, con_email[plantilla])
+                if nueva == huella:
+                    vigentes.append((certificado_id,))
+                    continue
+
+                if pagina is not None:
+                    # El archivo se regenera completo con todas sus páginas.
+                    # Antes se desmarcan los vigentes para no contarlos dos veces
+                    desmarcar()
+                    combinados.add(archivo_certificado)
+                    yield self._lote_combinado(conn, archivo_certificado)
+                    continue
+
+                # Los anteriores a la migración 9 no registran su plantilla
+                extension = os.path.splitext(archivo_certificado)[1].lower()
+                if not plantilla and extension != ".pdf":
+                    plantilla = self.plantilla
+                    if not plantilla:
+                        conteo['omitidos'] += 1
+                        continue
+                formato = next(
+                    (formato for formato, sufijo in FORMATOS_PLANTILLA.items() if sufijo == extension), None
+                ) if plantilla else None
+
+                # Los anteriores a la migración 13 no registran su perfil: se
+                # generaron con el estándar, el único que existía
+                trabajo = (estudiante, curso, fecha_emision[:10], certificado_id,
+                           enlace_verificacion(certificado_id, self.url_verificacion), archivo_certificado)
+                clave = (plantilla, formato, None if plantilla else perfil or "estandar")
+                individuales.setdefault(clave, []).append(((nueva, certificado_id), trabajo))
+
+            desmarcar()
+            for (plantilla, formato, perfil), pendientes in individuales.items():
+                for inicio in range(0, len(pendientes), por_lote):
+                    parte = pendientes[inicio:inicio + por_lote]
+                    actualizaciones = [actualizacion for actualizacion, trabajo in parte]
+                    trabajos = [trabajo for actualizacion, trabajo in parte]
+                    if plantilla:
+                        yield (actualizaciones, len(parte)), _renderizar_plantilla, (plantilla, formato, trabajos)
+                    else:
+                        yield (actualizaciones, len(parte)), partial(_renderizar_lote, perfil=perfil), trabajos
+
+    def _lote_combinado(self, conn, archivo_certificado):
+        # Todas las páginas del archivo, en orden, con los datos actuales. Una
+        # revocada se conserva para no cambiar la numeración del archivo
+        paginas = conn.execute('''
+            SELECT c.id, c.fecha_emision, c.desactualizado, c.perfil, k.nombre, k.codigo, e.*
+            FROM certificados c
+            JOIN cursos k ON k.id = c.curso_id
+            JOIN estudiantes e ON e.id = c.estudiante_id
+            WHERE c.archivo_certificado = ? AND c.pagina IS NOT NULL
+            ORDER BY c.pagina
+        ''', (archivo_certificado,)).fetchall()
+
+        actualizaciones, trabajos, marcados = [], [], 0
+        for fila in paginas:
+            certificado_id, fecha_emision, desactualizado = fila[:3]
+            curso, estudiante = fila[4:6], fila[6:]
+            actualizaciones.append((huella_certificado(estudiante, curso), certificado_id))
+            trabajos.append((estudiante, curso, fecha_emision[:10], certificado_id,
+                             enlace_verificacion(certificado_id, self.url_verificacion), None))
+            marcados += desactualizado
+        # Todas las páginas de un archivo comparten el perfil de su corrida
+        perfil = paginas[0][3] or "estandar"
+        return (
+            (actualizaciones, marcados), partial(_renderizar_combinado, perfil=perfil),
+            (trabajos, archivo_certificado)
+        )
+
+    def encolar_generacion(self, curso_id, estudiantes_por_lote=None, modo=None, paginas_por_archivo=None,
+                           plantilla=None, formato=None, perfil=None):
+        # Deja la corrida en cola_generacion para atender_cola, con la fecha y las opciones fijas
+        modo, paginas_por_archivo, plantilla, formato, perfil = self._opciones_salida(
+            modo, paginas_por_archivo, plantilla, formato, perfil
+        )
+        if modo == "combinado":
+            # Cada lote es un archivo combinado
+            tamano = paginas_por_archivo
+        else:
+            tamano = estudiantes_por_lote or ESTUDIANTES_POR_LOTE_COLA
+
+        if not self.conn.execute("SELECT 1 FROM cursos WHERE id = ?", (curso_id,)).fetchone():
+            raise ValueError("Curso no encontrado")
+        if self.conn.execute('''
+            SELECT 1 FROM cola_generacion
+            WHERE estado IN ('pendiente', 'en_curso') AND curso_id = ?
+            LIMIT 1
+        ''', (curso_id,)).fetchone():
+            raise ValueError("El curso ya tiene una generación en cola")
+
+        # Los límites de cada lote se leen saltando por el índice de
+        # inscripciones sin cargar la lista de estudiantes
+        rangos = []
+        desde = ""
+        while True:
+            hasta = self.conn.execute('''
+                SELECT estudiante_id FROM inscripciones
+                WHERE curso_id = ? AND estado = ? AND estudiante_id > ?
+                ORDER BY estudiante_id
+                LIMIT 1 OFFSET ?
+            ''', (curso_id, ESTADO_APROBADO, desde, tamano - 1)).fetchone()
+            if hasta is None:
+                hasta = self.conn.execute('''
+                    SELECT MAX(estudiante_id) FROM inscripciones
+                    WHERE curso_id = ? AND estado = ? AND estudiante_id > ?
+                ''', (curso_id, ESTADO_APROBADO, desde)).fetchone()
+                if hasta[0] is not None:
+                    rangos.append((desde, hasta[0]))
+                break
+            rangos.append((desde, hasta[0]))
+            desde = hasta[0]
+        if not rangos:
+            raise ValueError("No hay estudiantes aprobados en este curso")
+
+        corrida = str(uuid.uuid4())
+        fecha = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self.conn:
+            self.conn.executemany('''
+                INSERT INTO cola_generacion (corrida, curso_id, desde, hasta, fecha, modo, plantilla, formato, perfil)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                (corrida, curso_id, desde, hasta, fecha, modo, plantilla, formato if plantilla else None, perfil)
+                for desde, hasta in rangos
+            ])
+        registrar_evento("cola_encolada", corrida=corrida, curso_id=curso_id, lotes=len(rangos), modo=modo)
+        return {'corrida': corrida, 'curso_id': curso_id, 'lotes': len(rangos), 'fecha': fecha}
+
+    def estado_cola(self, corrida=None):
+        # Lotes por estado de cada corrida en cola: [{corrida, curso_id,
+        # pendiente, en_curso, hecho, fallido, generados}]
+        filtro, parametros = ("WHERE corrida = ?", (corrida,)) if corrida else ("", ())
+        corridas = {}
+        for corrida, curso_id, estado, lotes, generados in self.conn.execute(f'''
+            SELECT corrida, curso_id, estado, COUNT(*), SUM(generados)
+            FROM cola_generacion {filtro}
+            GROUP BY corrida, curso_id, estado
+        ''', parametros):
+            resumen = corridas.setdefault(corrida, {
+                'corrida': corrida, 'curso_id': curso_id,
+                'pendiente': 0, 'en_curso': 0, 'hecho': 0, 'fallido': 0, 'generados': 0
+            })
+            resumen[estado] = lotes
+            resumen['generados'] += generados or 0
+        return list(corridas.values())
+
+    def atender_cola(self, procesos=None, **opciones):
+        # atender_cola sobre la base local
+        coordinador = CoordinadorCola(self)
+        try:
+            return atender_cola(coordinador, procesos or self.procesos_generacion, **opciones)
+        finally:
+            coordinador.cerrar()
+
+    def _reclamar_lote(self, conn, trabajador, concesion):
+        # BEGIN IMMEDIATE impide que dos trabajadores reclamen el mismo lote
+        ahora = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute('''
+                UPDATE cola_generacion SET estado = 'fallido', error = 'Se agotaron los intentos'
+                WHERE estado = 'en_curso' AND vence_en < ? AND intentos >= ?
+            ''', (ahora, MAX_INTENTOS_COLA))
+            columnas = "id, corrida, curso_id, desde, hasta, fecha, modo, plantilla, formato, perfil"
+            lote = conn.execute(
+                f"SELECT {columnas} FROM cola_generacion WHERE estado = 'pendiente' LIMIT 1"
+            ).fetchone()
+            if lote is None:
+                lote = conn.execute(
+                    f"SELECT {columnas} FROM cola_generacion WHERE estado = 'en_curso' AND vence_en < ? LIMIT 1",
+                    (ahora,)
+                ).fetchone()
+            if lote is not None:
+                conn.execute('''
+                    UPDATE cola_generacion
+                    SET estado = 'en_curso', trabajador = ?, vence_en = ?, intentos = intentos + 1
+                    WHERE id = ?
+                ''', (trabajador, ahora + concesion, lote[0]))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return lote
+
+    def _cerrar_lote(self, conn, lote_id, trabajador, filas, renombres):
+        # En una sola transacción, si el trabajador conserva la concesión.
+        # Devuelve False si otro trabajador reclamó el lote
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            vigente = conn.execute('''
+                UPDATE cola_generacion
+                SET estado = 'hecho', generados = ?, vence_en = NULL, terminado_en = CURRENT_TIMESTAMP
+                WHERE id = ? AND trabajador = ? AND estado = 'en_curso'
+            ''', (len(filas), lote_id, trabajador)).rowcount
+            if vigente:
+                for temporal, archivo_certificado in renombres:
+                    os.replace(temporal, archivo_certificado)
+        except BaseException:
+            conn.rollback()
+            raise
+
+        if not vigente:
+            conn.rollback()
+            self._descartar_temporales(renombres)
+            registrar_evento("cola_lote_perdido", lote=lote_id, trabajador=trabajador)
+            return False
+        self._guardar_certificados(conn, filas)
+        return True
+
+    def _liberar_lote(self, conn, lote_id, trabajador, error, renombres, cancelado=False):
+        # Un lote que falló vuelve a la cola hasta agotar sus intentos; uno
+        # cancelado vuelve sin contar el intento
+        self._descartar_temporales(renombres)
+        with conn:
+            conn.execute('''
+                UPDATE cola_generacion
+                SET estado = CASE WHEN intentos - ? >= ? THEN 'fallido' ELSE 'pendiente' END,
+                    intentos = intentos - ?, trabajador = NULL, vence_en = NULL, error = ?
+                WHERE id = ? AND trabajador = ? AND estado = 'en_curso'
+            ''', (int(cancelado), MAX_INTENTOS_COLA, int(cancelado), error, lote_id, trabajador))
+        if not cancelado:
+            registrar_evento("cola_lote_fallido", lote=lote_id, trabajador=trabajador, error=error)
+
+    def _descartar_temporales(self, renombres):
+        for temporal, archivo_certificado in renombres:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+    def _avance_corrida(self, conn, corrida):
+        # (lotes terminados, lotes) de la corrida, sobre el índice por corrida
+        terminados, lotes = conn.execute('''
+            SELECT SUM(estado IN ('hecho', 'fallido')), COUNT(*) FROM cola_generacion WHERE corrida = ?
+        ''', (corrida,)).fetchone()
+        return terminados or 0, lotes
+
+class CoordinadorCola:
+    # Reparte los lotes de cola_generacion con una conexión propia: atender_cola
+    # lo usa en el equipo de la base y ServicioCola lo expone a los demás
+    def __init__(self, sistema):
+        self.sistema = sistema
+        self.conn = sistema.conectar_base_datos()
+        self.medidor = MedidorEtapas("coordinador_cola")
+        self._cursos = {}
+        # (lote, trabajador): (lote, curso, grupo, archivos finales), hasta terminarlo
+        self._encargos = {}
+
+    def reclamar(self, trabajador, concesion):
+        # Encargo del próximo lote, serializable a JSON, o None si no queda
+        # ninguno. Los lotes sin estudiantes pendientes se terminan aquí mismo
+        omitidos = 0
+        while True:
+            lote = self.sistema._reclamar_lote(self.conn, trabajador, concesion)
+            if lote is None:
+                # Un encargo sin trabajos solo informa los omitidos de los lotes vacíos
+                return {'lote': None, 'corrida': None, 'omitidos': omitidos, 'trabajos': []} if omitidos else None
+            lote_id, corrida, curso_id, desde, hasta, fecha, modo, plantilla, formato, perfil = lote
+
+            if curso_id not in self._cursos:
+                self._cursos[curso_id] = self.conn.execute(
+                    "SELECT nombre, codigo FROM cursos WHERE id = ?", (curso_id,)
+                ).fetchone()
+            curso = self._cursos[curso_id]
+            conteo = {'omitidos': 0}
+            grupo = list(self.sistema._estudiantes_pendientes(
+                self.conn, curso_id, conteo, self.medidor, desde=desde, hasta=hasta
+            ))
+            omitidos += conteo['omitidos']
+            if not grupo:
+                self.sistema._cerrar_lote(self.conn, lote_id, trabajador, [], [])
+                continue
+
+            if modo == "combinado":
+                numero = datetime.strptime(fecha, '%Y-%m-%d %H:%M:%S').strftime('%Y%m%d_%H%M%S')
+                finales = [f"certificados/{curso[1]}_{numero}_{lote_id:04d}.pdf"] * len(grupo)
+            else:
+                extension = FORMATOS_PLANTILLA[formato] if plantilla else ".pdf"
+                finales = [nombre_archivo_certificado(estudiante, curso, extension) for estudiante, _ in grupo]
+            self._encargos[lote_id, trabajador] = (lote, curso, grupo, finales)
+
+            url = self.sistema.url_verificacion
+            return {
+                'lote': lote_id, 'corrida': corrida, 'modo': modo, 'plantilla': plantilla, 'formato': formato,
+                'perfil': perfil or "estandar", 'omitidos': omitidos,
+                # (estudiante, curso, fecha, certificado_id, enlace, archivo final)
+                'trabajos': [
+                    (estudiante, curso, fecha[:10], certificado_id, enlace_verificacion(certificado_id, url), final)
+                    for (estudiante, certificado_id), final in zip(grupo, finales)
+                ]
+            }
+
+    def archivos(self, trabajador, lote_id):
+        # Archivos finales del lote en el orden en que se entregan, o None si no es de este trabajador
+        encargo = self._encargos.get((lote_id, trabajador))
+        return list(dict.fromkeys(encargo[3])) if encargo else None
+
+    def terminar(self, trabajador, lote_id, paginas, temporales):
+        # temporales: uno por archivo final, junto a él. Registra el lote con la
+        # página de cada estudiante; False si el trabajador perdió la concesión
+        encargo = self._encargos.pop((lote_id, trabajador), None)
+        if encargo is None:
+            self.sistema._descartar_temporales([(temporal, None) for temporal in temporales])
+            return False
+        lote, curso, grupo, finales = encargo
+        plantilla = lote[7]
+        fecha = datetime.strptime(lote[5], '%Y-%m-%d %H:%M:%S')
+        con_email = _imprime_email(plantilla)
+        perfil = None if plantilla else lote[9] or "estandar"
+        filas = [
+            self.sistema._fila_certificado(
+                certificado_id, estudiante[0], lote[2], final, fecha, pagina,
+                huella_certificado(estudiante, curso, con_email), plantilla, perfil
+            )
+            for (estudiante, certificado_id), final, pagina in zip(grupo, finales, paginas)
+        ]
+        renombres = list(zip(temporales, dict.fromkeys(finales)))
+        return self.sistema._cerrar_lote(self.conn, lote_id, trabajador, filas, renombres)
+
+    def liberar(self, trabajador, lote_id, error, cancelado=False):
+        self._encargos.pop((lote_id, trabajador), None)
+        self.sistema._liberar_lote(self.conn, lote_id, trabajador, error, [], cancelado)
+
+    def en_curso(self):
+        # (lotes reclamados por otros, segundos hasta que vence la primera concesión)
+        en_curso, vence_en = self.conn.execute(
+            "SELECT COUNT(*), MIN(vence_en) FROM cola_generacion WHERE estado = 'en_curso'"
+        ).fetchone()
+        return en_curso, vence_en - time.time() if en_curso else None
+
+    def avance(self, corrida):
+        return self.sistema._avance_corrida(self.conn, corrida)
+
+    def cerrar(self):
+        self.conn.close()
+
+def atender_cola(coordinador, procesos, concesion=None, esperar=False, intervalo=5.0, progreso=None, cancelar=None):
+    # Reclama, renderiza y termina lotes de coordinador (CoordinadorCola o
+    # ClienteCola) hasta vaciar la cola (con esperar, hasta cancelar)
+    concesion = concesion or CONCESION_COLA
+    progreso = progreso or (lambda hechos, total: None)
+    cancelado = cancelar.is_set if cancelar else (lambda: False)
+
+    marca = uuid.uuid4().hex[:8]
+    trabajador = f"{socket.gethostname()}-{os.getpid()}-{marca}"
+    medidor = MedidorEtapas("cola", trabajador=trabajador, procesos=procesos)
+    # lotes: terminados por este trabajador; perdidos: los que otro
+    # reclamó al vencer la concesión antes de terminarlos
+    conteo = {'lotes': 0, 'generados': 0, 'omitidos': 0, 'fallidos': 0, 'perdidos': 0, 'bytes': 0}
+    os.makedirs("certificados", exist_ok=True)
+    try:
+        precargar_fuente()
+        while not cancelado():
+            reclamados = []
+            lotes = _lotes_cola(coordinador, trabajador, marca, concesion, conteo, medidor, reclamados)
+            for (encargo, temporales), (salida, error) in _renderizar_lotes(lotes, procesos, cancelar):
+                if error or len(salida[0]) < len(encargo['trabajos']):
+                    # Un lote cancelado a medias vuelve a la cola sin gastar un intento
+                    for temporal in temporales:
+                        if os.path.exists(temporal):
+                            os.remove(temporal)
+                    with medidor.etapa("commit"):
+                        coordinador.liberar(trabajador, encargo['lote'], error, cancelado=not error)
+                    if error:
+                        conteo['fallidos'] += 1
+                else:
+                    resultados, tiempos = salida
+                    medidor.combinar(tiempos)
+                    tamano = sum(os.path.getsize(temporal) for temporal in temporales)
+                    with medidor.etapa("commit"):
+                        terminado = coordinador.terminar(
+                            trabajador, encargo['lote'], [pagina for _, pagina in resultados], temporales
+                        )
+                    if terminado:
+                        conteo['lotes'] += 1
+                        conteo['generados'] += len(resultados)
+                        conteo['bytes'] += tamano
+                    else:
+                        conteo['perdidos'] += 1
+                progreso(*coordinador.avance(encargo['corrida']))
+
+            if reclamados or cancelado():
+                continue
+
+            # Nada que reclamar: se espera a que venza la concesión de
+            # los lotes que tienen otros trabajadores
+            en_curso, vence_en = coordinador.en_curso()
+            if not en_curso and not esperar:
+                break
+            espera = intervalo if not en_curso else min(intervalo, max(vence_en, 0) + 0.1)
+            if cancelar:
+                cancelar.wait(espera)
+            else:
+                time.sleep(espera)
+
+        resultado = {'estado': 'cancelado' if cancelado() else 'fin', **conteo}
+        resultado['etapas'] = medidor.finalizar(**resultado)
+        resultado['trabajador'] = trabajador
+        return resultado
+    except Exception as e:
+        medidor.finalizar(estado='error', error=str(e))
+        raise
+
+def _lotes_cola(coordinador, trabajador, marca, concesion, conteo, medidor, reclamados):
+    # Reclama un lote cada vez que _renderizar_lotes pide otro, hasta que no
+    # quedan. Los archivos se escriben en temporales con la marca del trabajador
+    while True:
+        with medidor.etapa("cola"):
+            encargo = coordinador.reclamar(trabajador, concesion)
+        if encargo is None:
+            return
+        conteo['omitidos'] += encargo['omitidos']
+        if not encargo['trabajos']:
+            return
+        reclamados.append(encargo['lote'])
+
+        trabajos = encargo['trabajos']
+        temporales = [f"{final}.{marca}.tmp" for final in dict.fromkeys(trabajo[5] for trabajo in trabajos)]
+        perfil = encargo['perfil']
+        if encargo['modo'] == "combinado":
+            funcion = partial(_renderizar_combinado, perfil=perfil)
+            argumento = ([(*trabajo[:5], None) for trabajo in trabajos], temporales[0])
+        else:
+            trabajos = [(*trabajo[:5], temporal) for trabajo, temporal in zip(trabajos, temporales)]
+            if encargo['plantilla']:
+                funcion, argumento = _renderizar_plantilla, (encargo['plantilla'], encargo['formato'], trabajos)
+            else:
+                funcion, argumento = partial(_renderizar_lote, perfil=perfil), trabajos
+        yield (encargo, temporales), _intentar, (funcion, argumento)
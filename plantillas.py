@@ -0,0 +1,220 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from string import Formatter
+from PIL import Image, ImageDraw, ImageFont
+from verificacion import matriz_qr, tramos_qr
+
+DIRECTORIO_PLANTILLAS = "templates"
+DIRECTORIO_FUENTES = "fonts"
+
+# Fuente de los campos que no indican otra; sin ella se usa la de Pillow,
+# que no tiene tildes ni Ñ
+FUENTE_POR_DEFECTO = "DejaVuSans.ttf"
+
+EXTENSIONES_FONDO = (".png", ".jpg", ".jpeg")
+
+# Formato de salida y extensión del archivo de cada certificado
+FORMATOS_PLANTILLA = {
+    "pdf": ".pdf",
+    "png": ".png",
+    "jpeg": ".jpg"
+}
+
+# Diseño que se usa cuando la plantilla es solo una imagen, sin su .json.
+# Las posiciones y tamaños son fracciones del ancho y alto del fondo
+CAMPOS_POR_DEFECTO = [
+    {"texto": "CERTIFICADO DE PARTICIPACIÓN", "x": 0.5, "y": 0.22, "tamano": 0.05},
+    {"texto": "Certificamos que", "x": 0.5, "y": 0.36, "tamano": 0.03},
+    {"texto": "{nombre} {apellido}", "x": 0.5, "y": 0.45, "tamano": 0.06},
+    {"texto": "con cédula {cedula}", "x": 0.5, "y": 0.53, "tamano": 0.03},
+    {"texto": "ha completado satisfactoriamente el curso:", "x": 0.5, "y": 0.60, "tamano": 0.03},
+    {"texto": "{curso} ({codigo})", "x": 0.5, "y": 0.68, "tamano": 0.045},
+    {"texto": "Fecha: {fecha}", "x": 0.5, "y": 0.78, "tamano": 0.03},
+    {"texto": "Certificado N.º {certificado_id}", "x": 0.5, "y": 0.93, "tamano": 0.018}
+]
+
+# Código QR de verificación: centro y lado, en fracciones del alto del fondo
+QR_POR_DEFECTO = {"x": 0.88, "y": 0.82, "tamano": 0.14}
+
+def listar_plantillas():
+    # Nombre de cada plantilla: el de su .json o el de una imagen suelta
+    if not os.path.isdir(DIRECTORIO_PLANTILLAS):
+        return []
+    nombres = set()
+    for archivo in os.listdir(DIRECTORIO_PLANTILLAS):
+        nombre, extension = os.path.splitext(archivo)
+        if extension.lower() in EXTENSIONES_FONDO + (".json",):
+            nombres.add(nombre)
+    return sorted(nombres)
+
+@lru_cache(maxsize=16)
+def _leer_descripcion(descripcion, modificado):
+    with open(descripcion, encoding="utf-8") as archivo:
+        datos = json.load(archivo)
+    if not datos.get("fondo"):
+        raise ValueError(f"La plantilla {descripcion} no indica su imagen de fondo")
+    return datos
+
+def cargar_plantilla(nombre):
+    # Devuelve (fondo, campos, qr, resolución). La clave de la caché incluye la
+    # fecha de modificación de los archivos: si se edita la plantilla se
+    # vuelve a cargar, si no, cada proceso la decodifica una sola vez
+    descripcion = os.path.join(DIRECTORIO_PLANTILLAS, nombre + ".json")
+    if os.path.exists(descripcion):
+        modificado = os.path.getmtime(descripcion)
+        fondo = os.path.join(DIRECTORIO_PLANTILLAS, _leer_descripcion(descripcion, modificado)["fondo"])
+    else:
+        descripcion = modificado = None
+        candidatos = (os.path.join(DIRECTORIO_PLANTILLAS, nombre + extension) for extension in EXTENSIONES_FONDO)
+        fondo = next((ruta for ruta in candidatos if os.path.exists(ruta)), None)
+        if fondo is None:
+            raise ValueError(f"No se encontró la plantilla {nombre}")
+
+    if not os.path.exists(fondo):
+        raise ValueError(f"No se encontró el fondo de la plantilla {nombre}: {fondo}")
+    return _preparar_plantilla(descripcion, modificado, fondo, os.path.getmtime(fondo))
+
+def campos_plantilla(nombre):
+    # Datos que imprime la plantilla, como {"nombre", "email"}; solo lee su
+    # descripción, sin decodificar el fondo
+    descripcion = os.path.join(DIRECTORIO_PLANTILLAS, nombre + ".json")
+    campos = CAMPOS_POR_DEFECTO
+    if os.path.exists(descripcion):
+        campos = _leer_descripcion(descripcion, os.path.getmtime(descripcion)).get("campos", CAMPOS_POR_DEFECTO)
+    return {dato for campo in campos for _, dato, _, _ in Formatter().parse(campo["texto"]) if dato}
+
+@lru_cache(maxsize=16)
+def _preparar_plantilla(descripcion, modificado, fondo, modificado_fondo):
+    datos = _leer_descripcion(descripcion, modificado) if descripcion else {}
+
+    # convert() obliga a decodificar la imagen completa ahora y no en el
+    # primer certificado
+    with Image.open(fondo) as imagen:
+        fondo = imagen.convert("RGB")
+    ancho, alto = fondo.size
+
+    # Posiciones en píxeles y fuentes ya cargadas: por certificado solo
+    # queda dibujar el texto
+    campos = []
+    for campo in datos.get("campos", CAMPOS_POR_DEFECTO):
+        tamano = max(1, round(campo.get("tamano", 0.03) * alto))
+        campos.append((
+            campo["texto"],
+            (round(campo["x"] * ancho), round(campo["y"] * alto)),
+            _cargar_fuente(campo.get("fuente"), tamano),
+            campo.get("color", "#2C3E50"),
+            campo.get("anclaje", "mm")
+        ))
+
+    # El QR se puede quitar con "qr": null en el .json
+    qr = datos.get("qr", QR_POR_DEFECTO)
+    if qr:
+        lado = round(qr["tamano"] * alto)
+        qr = (round(qr["x"] * ancho) - lado // 2, round(qr["y"] * alto) - lado // 2, lado)
+    return fondo, campos, qr, datos.get("resolucion", 150)
+
+@lru_cache(maxsize=64)
+def _cargar_fuente(archivo, tamano):
+    if not archivo:
+        if not os.path.exists(os.path.join(DIRECTORIO_FUENTES, FUENTE_POR_DEFECTO)):
+            try:
+                return ImageFont.load_default(tamano)
+            except TypeError:
+                # Pillow < 10.1 no acepta el tamaño
+                return ImageFont.load_default()
+        archivo = FUENTE_POR_DEFECTO
+    ruta = os.path.join(DIRECTORIO_FUENTES, archivo)
+    try:
+        return ImageFont.truetype(ruta, tamano)
+    except OSError:
+        raise ValueError(f"No se pudo cargar la fuente {ruta}")
+
+def componer_certificado(plantilla, datos):
+    # Copia el fondo ya decodificado y dibuja encima los campos del estudiante
+    fondo, campos, qr, resolucion = cargar_plantilla(plantilla)
+    imagen = fondo.copy()
+    dibujo = ImageDraw.Draw(imagen)
+    for texto, posicion, fuente, color, anclaje in campos:
+        dibujo.text(posicion, texto.format(**datos), font=fuente, fill=color, anchor=anclaje)
+
+    matriz = matriz_qr(datos["enlace"]) if qr else None
+    if matriz:
+        x, y, lado = qr
+        modulo = lado / len(matriz)
+        # Margen blanco alrededor para que el lector distinga el código
+        dibujo.rectangle([x - 2 * modulo, y - 2 * modulo, x + lado + 2 * modulo, y + lado + 2 * modulo], fill="white")
+        for fila, columna, largo in tramos_qr(matriz):
+            dibujo.rectangle([
+                round(x + columna * modulo), round(y + fila * modulo),
+                round(x + (columna + largo) * modulo) - 1, round(y + (fila + 1) * modulo) - 1
+            ], fill="black")
+    return imagen, resolucion
+
+def nombre_archivo_certificado(estudiante, curso, extension=".pdf"):
+    # Archivo de un certificado individual, por el estudiante y el curso. El
+    # ID del estudiante lo hace único aunque dos estudiantes se llamen igual
+    return f"certificados/{estudiante[1]}_{estudiante[2]}_{curso[1]}_{estudiante[0]}{extension}"
+
+@contextmanager
+def escritura_atomica(archivo):
+    # Devuelve una ruta temporal junto al archivo y al terminar la renombra
+    # sobre él: quien lo lea, o una corrida que se reanuda, ve el archivo
+    # anterior o el nuevo completos, nunca uno a medio escribir
+    temporal = f"{archivo}.{os.getpid()}.tmp"
+    try:
+        yield temporal
+        os.replace(temporal, archivo)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+def guardar_certificado(imagen, archivo, formato, resolucion):
+    with escritura_atomica(archivo) as temporal:
+        if formato == "pdf":
+            # Pillow incrusta la imagen en el PDF comprimida como JPEG
+            imagen.save(temporal, "PDF", resolution=resolucion)
+        elif formato == "jpeg":
+            imagen.save(temporal, "JPEG", quality=90)
+        else:
+            imagen.save(temporal, "PNG")
+
+def renderizar_lote_plantilla(trabajo, cancelado=None):
+    # Se ejecuta en los procesos de trabajo, igual que _renderizar_lote de
+    # nucleo: devuelve [(archivo, None)] y los tiempos de cada etapa. Si
+    # cancelado() se cumple, solo los certificados ya escritos
+    plantilla, formato, trabajos = trabajo
+    tiempos = {"composicion": [], "escritura": []}
+    resultados = []
+
+    for estudiante, curso, fecha, certificado_id, enlace, archivo_certificado in trabajos:
+        if cancelado and cancelado():
+            break
+        datos = {
+            "nombre": estudiante[1],
+            "apellido": estudiante[2],
+            "cedula": estudiante[3],
+            "email": estudiante[4],
+            "curso": curso[0],
+            "codigo": curso[1],
+            "fecha": fecha,
+            "certificado_id": certificado_id,
+            "enlace": enlace
+        }
+
+        inicio = time.perf_counter()
+        imagen, resolucion = componer_certificado(plantilla, datos)
+        compuesto = time.perf_counter()
+
+        archivo_certificado = archivo_certificado or (
+            nombre_archivo_certificado(estudiante, curso, FORMATOS_PLANTILLA[formato])
+        )
+        guardar_certificado(imagen, archivo_certificado, formato, resolucion)
+
+        tiempos["composicion"].append(compuesto - inicio)
+        tiempos["escritura"].append(time.perf_counter() - compuesto)
+        resultados.append((archivo_certificado, None))
+
+    return resultados, tiempos
@@ -0,0 +1,108 @@
+import asyncio
+import json
+
+RAZONES = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable"
+}
+
+# Tamaño máximo del cuerpo de una petición
+MAX_CUERPO = 64 * 1024
+
+class ServidorHTTP:
+    # HTTP/1.1 mínimo sobre asyncio, sin dependencias externas, para los
+    # servicios locales. Las conexiones son persistentes: un cliente puede
+    # encadenar peticiones sin abrir una conexión por cada una.
+    #
+    # Las subclases redefinen despachar(metodo, ruta, cabeceras, cuerpo),
+    # que devuelve (estado, datos) con datos serializables a JSON, o
+    # (estado, bytes, tipo) para responder un archivo; por defecto, 404
+    max_cuerpo = MAX_CUERPO
+
+    def __init__(self, host="127.0.0.1", puerto=8080):
+        self.host = host
+        self.puerto = puerto
+
+    async def despachar(self, metodo, ruta, cabeceras, cuerpo):
+        return 404, {"error": "Ruta no encontrada"}
+
+    def tareas_fondo(self):
+        # Corrutinas que corren mientras el servidor escucha
+        return []
+
+    def detener(self):
+        # Libera los recursos del servicio al cerrar el servidor
+        pass
+
+    async def _atender(self, lector, escritor):
+        try:
+            while True:
+                try:
+                    linea = await asyncio.wait_for(lector.readline(), timeout=15)
+                except asyncio.TimeoutError:
+                    break
+                if not linea:
+                    break
+
+                partes = linea.decode("latin-1").split()
+                cabeceras = {}
+                while True:
+                    cabecera = await lector.readline()
+                    if cabecera in (b"\r\n", b"\n", b""):
+                        break
+                    nombre, _, valor = cabecera.decode("latin-1").partition(":")
+                    cabeceras[nombre.strip().lower()] = valor.strip()
+
+                largo = int(cabeceras.get("content-length") or 0)
+                mantener = False
+                if len(partes) != 3 or largo < 0:
+                    respuesta = (400, {"error": "Petición inválida"})
+                elif largo > self.max_cuerpo:
+                    respuesta = (413, {"error": "Cuerpo de la petición demasiado grande"})
+                else:
+                    metodo, ruta, version = partes
+                    cuerpo = await lector.readexactly(largo) if largo else b""
+                    respuesta = await self.despachar(metodo, ruta, cabeceras, cuerpo)
+                    mantener = version == "HTTP/1.1" and cabeceras.get("connection", "").lower() != "close"
+
+                if len(respuesta) == 3:
+                    estado, datos, tipo = respuesta
+                else:
+                    estado, datos = respuesta
+                    datos = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+                    tipo = "application/json; charset=utf-8"
+                escritor.write(
+                    f"HTTP/1.1 {estado} {RAZONES.get(estado, '')}\r\n"
+                    f"Content-Type: {tipo}\r\n"
+                    f"Content-Length: {len(datos)}\r\n"
+                    f"Cache-Control: no-store\r\n"
+                    f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n".encode("latin-1") + datos
+                )
+                await escritor.drain()
+                if not mantener:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            escritor.close()
+
+    async def servir(self, listo=None):
+        # listo: asyncio.Event que se activa cuando el servidor ya escucha
+        servidor = await asyncio.start_server(self._atender, self.host, self.puerto)
+        self.puerto = servidor.sockets[0].getsockname()[1]
+        tareas = [asyncio.create_task(tarea) for tarea in self.tareas_fondo()]
+        if listo is not None:
+            listo.set()
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            for tarea in tareas:
+                tarea.cancel()
+            self.detener()
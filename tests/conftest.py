@@ -0,0 +1,48 @@
+import os
+import sys
+from itertools import count
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from nucleo import ESTADO_APROBADO, SistemaCertificados
+
+@pytest.fixture
+def sistema(tmp_path, monkeypatch):
+    # Cada prueba trabaja en su carpeta: la base, certificados/ y logs/ se
+    # crean ahí y no en el repositorio
+    monkeypatch.chdir(tmp_path)
+    sistema = SistemaCertificados(os.path.join("bases_datos", "prueba.db"))
+    sistema.procesos_generacion = 1
+    yield sistema
+    sistema.cerrar()
+
+@pytest.fixture
+def crear_curso(sistema):
+    # crear(código, nuevos, existentes) registra el curso con `nuevos`
+    # estudiantes aprobados más los IDs de `existentes`. Todos se llaman
+    # igual, como los homónimos de la base real. Devuelve (curso, IDs)
+    cedulas = count(1)
+
+    def crear(codigo, nuevos=0, existentes=(), nombre="Ana", apellido="Pérez"):
+        curso_id = sistema.registrar_curso({
+            "nombre": f"Curso {codigo}", "codigo": codigo, "area": "TI", "duracion": "40",
+            "descripcion": "Prueba", "instructor": "Prueba"
+        })
+        estudiantes = list(existentes)
+        for _ in range(nuevos):
+            cedula = next(cedulas)
+            estudiantes.append(sistema.registrar_estudiante({
+                "nombre": nombre, "apellido": apellido, "cedula": f"V-{cedula}",
+                "email": f"estudiante{cedula}@unexca.edu.ve"
+            }))
+        sistema.conn.executemany(
+            "INSERT INTO inscripciones (curso_id, estudiante_id, estado) VALUES (?, ?, ?)",
+            [(curso_id, estudiante_id, ESTADO_APROBADO) for estudiante_id in estudiantes]
+        )
+        sistema.conn.commit()
+        return curso_id, estudiantes
+
+    return crear
@@ -0,0 +1,25 @@
+def registrar(sistema, nombre, codigo):
+    return sistema.registrar_curso({
+        "nombre": nombre, "codigo": codigo, "area": "Humanidades", "duracion": "40",
+        "descripcion": "Prueba", "instructor": "Prueba"
+    })
+
+def nombres(sistema, texto):
+    return [nombre for _, nombre, _ in sistema.buscar_cursos(texto)]
+
+def test_la_busqueda_no_distingue_tildes_ni_mayusculas(sistema):
+    registrar(sistema, "Álgebra Lineal", "MAT-201")
+    registrar(sistema, "Ética Profesional", "ÉTI-101")
+
+    assert nombres(sistema, "álg") == ["Álgebra Lineal"]
+    assert nombres(sistema, "ALG") == ["Álgebra Lineal"]
+    assert nombres(sistema, "etica") == ["Ética Profesional"]
+    assert nombres(sistema, "eti-1") == ["Ética Profesional"]
+
+def test_renombrar_un_curso_actualiza_su_busqueda(sistema):
+    curso_id = registrar(sistema, "Lógica", "LOG-100")
+    sistema.conn.execute("UPDATE cursos SET nombre = 'Programación' WHERE id = ?", (curso_id,))
+    sistema.conn.commit()
+
+    assert nombres(sistema, "logica") == []
+    assert nombres(sistema, "programacion") == ["Programación"]
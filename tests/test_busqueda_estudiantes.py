@@ -0,0 +1,65 @@
+import os
+
+from nucleo import SistemaCertificados
+from test_migraciones import base_en_version
+
+def buscar(sistema, texto):
+    condicion, parametros = sistema.filtro_busqueda(texto)
+    return sorted(
+        nombre for (nombre,) in sistema.conn.execute(f"SELECT nombre FROM estudiantes WHERE {condicion}", parametros)
+    )
+
+def registrar(sistema, nombre, cedula):
+    return sistema.registrar_estudiante({
+        "nombre": nombre, "apellido": "Pérez", "cedula": cedula, "email": f"{cedula}@unexca.edu.ve"
+    })
+
+def test_el_indice_de_texto_sigue_a_las_altas_cambios_y_bajas(sistema):
+    assert sistema.busqueda_fts
+    ana = registrar(sistema, "Ana", "V-1")
+    registrar(sistema, "Andrés", "V-2")
+    assert buscar(sistema, "an") == ["Ana", "Andrés"]
+
+    sistema.conn.execute("UPDATE estudiantes SET nombre = 'Beatriz' WHERE id = ?", (ana,))
+    assert buscar(sistema, "an") == ["Andrés"]
+    assert buscar(sistema, "beat") == ["Beatriz"]
+
+    sistema.conn.execute("DELETE FROM estudiantes WHERE id = ?", (ana,))
+    assert buscar(sistema, "beat") == []
+    assert buscar(sistema, "perez") == ["Andrés"]
+
+def test_vacuum_conserva_los_numeros_y_la_busqueda(sistema):
+    ids = [registrar(sistema, nombre, f"V-{numero}") for numero, nombre in enumerate(["Ana", "Luis", "Eva"], 1)]
+    sistema.conn.execute("DELETE FROM estudiantes WHERE id = ?", (ids[0],))
+    sistema.conn.commit()
+    antes = sistema.conn.execute("SELECT rowid, id FROM estudiantes ORDER BY rowid").fetchall()
+
+    sistema.conn.execute("VACUUM")
+
+    assert sistema.conn.execute("SELECT rowid, id FROM estudiantes ORDER BY rowid").fetchall() == antes
+    assert buscar(sistema, "eva") == ["Eva"]
+
+def test_la_migracion_numera_a_los_estudiantes_por_su_rowid(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ruta = os.path.join("bases_datos", "anterior.db")
+    conn = base_en_version(ruta, 13)
+    conn.executemany(
+        "INSERT INTO estudiantes (id, nombre, apellido, cedula, email) VALUES (?, ?, 'Pérez', ?, 'a@x.com')",
+        [("e1", "Ana", "V-1"), ("e2", "Luis", "V-2"), ("e3", "Eva", "V-3")]
+    )
+    conn.execute("DELETE FROM estudiantes WHERE id = 'e1'")
+    conn.execute("INSERT INTO cursos (id, nombre, codigo) VALUES ('c1', 'Curso', 'INF-101')")
+    conn.execute("INSERT INTO inscripciones (curso_id, estudiante_id, estado) VALUES ('c1', 'e3', 'aprobado')")
+    conn.commit()
+    conn.close()
+
+    sistema = SistemaCertificados(ruta)
+    try:
+        assert sistema.conn.execute("SELECT numero, id FROM estudiantes ORDER BY numero").fetchall() == [
+            (2, "e2"), (3, "e3")
+        ]
+        assert sistema.conn.execute("PRAGMA foreign_key_check").fetchall() == []
+        assert sistema.conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+        assert buscar(sistema, "eva") == ["Eva"]
+    finally:
+        sistema.cerrar()
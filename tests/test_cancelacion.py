@@ -0,0 +1,44 @@
+import os
+import threading
+
+import nucleo
+
+def cancelar_al_dibujar(monkeypatch, paginas):
+    # Pide la cancelación mientras se dibuja la página número `paginas`
+    cancelar = threading.Event()
+    dibujar = nucleo._dibujar_certificado
+    dibujadas = []
+
+    def dibujar_y_cancelar(*argumentos):
+        dibujar(*argumentos)
+        dibujadas.append(1)
+        if len(dibujadas) == paginas:
+            cancelar.set()
+
+    monkeypatch.setattr(nucleo, "_dibujar_certificado", dibujar_y_cancelar)
+    return cancelar
+
+def test_cancelar_no_deja_un_archivo_combinado_a_medias(sistema, crear_curso, monkeypatch):
+    curso_id, _ = crear_curso("CAN", 4)
+    cancelar = cancelar_al_dibujar(monkeypatch, 2)
+
+    resultado = sistema.generar_certificados(curso_id, modo="combinado", paginas_por_archivo=4, cancelar=cancelar)
+
+    assert (resultado["estado"], resultado["generados"]) == ("cancelado", 0)
+    assert os.listdir("certificados") == []
+    assert sistema.conn.execute("SELECT COUNT(*) FROM certificados").fetchone()[0] == 0
+
+def test_un_lote_cancelado_vuelve_a_la_cola_sin_gastar_intentos(sistema, crear_curso, monkeypatch):
+    curso_id, _ = crear_curso("CAN", 4)
+    sistema.encolar_generacion(curso_id, estudiantes_por_lote=4)
+    dibujar = nucleo._dibujar_certificado
+    cancelar = cancelar_al_dibujar(monkeypatch, 2)
+
+    resultado = sistema.atender_cola(procesos=1, cancelar=cancelar)
+
+    assert (resultado["estado"], resultado["lotes"], resultado["generados"]) == ("cancelado", 0, 0)
+    assert sistema.conn.execute("SELECT estado, intentos FROM cola_generacion").fetchall() == [("pendiente", 0)]
+    assert os.listdir("certificados") == []
+
+    monkeypatch.setattr(nucleo, "_dibujar_certificado", dibujar)
+    assert sistema.atender_cola(procesos=1)["generados"] == 4
@@ -0,0 +1,30 @@
+import csv
+import json
+
+from cli import SALIDA_ERROR, main
+
+def test_un_archivo_que_no_es_xlsx_termina_con_un_evento_de_error(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    archivo = tmp_path / "estudiantes.xlsx"
+    archivo.write_text("cedula,nombre\nV-1,Ana\n", encoding="utf-8")
+
+    salida = main(["--base-datos", str(tmp_path / "prueba.db"), "importar", str(archivo)])
+
+    assert salida == SALIDA_ERROR
+    evento = json.loads(capsys.readouterr().err.strip().splitlines()[-1])
+    assert evento["evento"] == "error"
+    assert "estudiantes.xlsx" in evento["mensaje"]
+
+def test_listar_cursos_escribe_solo_sus_columnas(sistema, tmp_path):
+    sistema.registrar_curso({
+        "nombre": "Ética", "codigo": "ETI-1", "area": "Humanidades", "duracion": "40",
+        "descripcion": "Prueba", "instructor": "Prueba"
+    })
+    salida = tmp_path / "cursos.csv"
+
+    main(["--base-datos", sistema.db_path, "listar", "cursos", "--salida", str(salida)])
+
+    with open(salida, newline="", encoding="utf-8") as archivo:
+        encabezados, curso = list(csv.reader(archivo))
+    assert len(curso) == len(encabezados)
+    assert curso[1:3] == ["Ética", "ETI-1"]
@@ -0,0 +1,174 @@
+import asyncio
+import os
+import threading
+from datetime import datetime
+
+import pytest
+
+import nucleo
+from cola import ClienteCola, ServicioCola
+from nucleo import MAX_INTENTOS_COLA, atender_cola
+
+def certificados(sistema, curso_id):
+    return sistema.conn.execute(
+        "SELECT id, estudiante_id, archivo_certificado FROM certificados WHERE curso_id = ?", (curso_id,)
+    ).fetchall()
+
+def lote_de(sistema, lote_id):
+    return sistema.conn.execute(
+        "SELECT estado, trabajador, intentos, error FROM cola_generacion WHERE id = ?", (lote_id,)
+    ).fetchone()
+
+def test_atender_cola_genera_cada_certificado_una_vez(sistema, crear_curso):
+    curso_id, estudiantes = crear_curso("COLA", 12)
+    corrida = sistema.encolar_generacion(curso_id, estudiantes_por_lote=5)
+    assert corrida["lotes"] == 3
+
+    resultado = sistema.atender_cola(procesos=1)
+
+    assert (resultado["lotes"], resultado["generados"], resultado["perdidos"]) == (3, 12, 0)
+    filas = certificados(sistema, curso_id)
+    assert sorted(estudiante_id for _, estudiante_id, _ in filas) == sorted(estudiantes)
+    assert len({archivo for _, _, archivo in filas}) == 12
+    assert all(os.path.exists(archivo) for _, _, archivo in filas)
+    [resumen] = sistema.estado_cola(corrida["corrida"])
+    assert (resumen["hecho"], resumen["pendiente"], resumen["generados"]) == (3, 0, 12)
+
+def test_concesion_vencida_la_retoma_otro_trabajador(sistema, crear_curso):
+    curso_id, _ = crear_curso("COLA", 4)
+    sistema.encolar_generacion(curso_id, estudiantes_por_lote=10)
+    conn = sistema.conectar_base_datos()
+    try:
+        # Un trabajador que reclamó el lote y se cayó: su concesión ya venció
+        caido = sistema._reclamar_lote(conn, "caido", concesion=-1)
+    finally:
+        conn.close()
+
+    resultado = sistema.atender_cola(procesos=1)
+
+    assert resultado["generados"] == 4
+    estado, trabajador, intentos, _ = lote_de(sistema, caido[0])
+    assert (estado, intentos) == ("hecho", 2)
+    assert trabajador != "caido"
+    assert len(certificados(sistema, curso_id)) == 4
+
+def test_trabajador_sin_concesion_no_registra_el_lote(sistema, crear_curso, tmp_path):
+    curso_id, (estudiante_id,) = crear_curso("COLA", 1)
+    sistema.encolar_generacion(curso_id)
+    conn = sistema.conectar_base_datos()
+    try:
+        lento = sistema._reclamar_lote(conn, "lento", concesion=-1)
+        rapido = sistema._reclamar_lote(conn, "rapido", concesion=600)
+        assert rapido[0] == lento[0]
+
+        # El trabajador lento termina después de que el otro retomó el lote
+        temporal = tmp_path / "certificados" / "lento.pdf.tmp"
+        temporal.write_bytes(b"%PDF")
+        final = os.path.join("certificados", "lento.pdf")
+        fila = sistema._fila_certificado("id-lento", estudiante_id, curso_id, final, datetime.now())
+        cerrado = sistema._cerrar_lote(conn, lento[0], "lento", [fila], [(str(temporal), final)])
+    finally:
+        conn.close()
+
+    assert cerrado is False
+    assert not temporal.exists()
+    assert not os.path.exists(final)
+    assert certificados(sistema, curso_id) == []
+    assert lote_de(sistema, lento[0])[:2] == ("en_curso", "rapido")
+
+def test_lote_que_agota_sus_intentos_queda_fallido(sistema, crear_curso):
+    curso_id, _ = crear_curso("COLA", 1)
+    sistema.encolar_generacion(curso_id)
+    conn = sistema.conectar_base_datos()
+    try:
+        for intento in range(MAX_INTENTOS_COLA):
+            assert sistema._reclamar_lote(conn, f"caido-{intento}", concesion=-1) is not None
+        assert sistema._reclamar_lote(conn, "otro", concesion=600) is None
+    finally:
+        conn.close()
+
+    [(lote_id,)] = sistema.conn.execute("SELECT id FROM cola_generacion").fetchall()
+    estado, _, intentos, error = lote_de(sistema, lote_id)
+    assert (estado, intentos) == ("fallido", MAX_INTENTOS_COLA)
+    assert error == "Se agotaron los intentos"
+
+def test_lote_con_error_se_reintenta_hasta_quedar_fallido(sistema, crear_curso, monkeypatch, tmp_path):
+    curso_id, _ = crear_curso("COLA", 2)
+    sistema.encolar_generacion(curso_id)
+
+    def fallar(trabajos, perfil="estandar"):
+        raise OSError("No queda espacio en el disco")
+    monkeypatch.setattr(nucleo, "_renderizar_lote", fallar)
+
+    resultado = sistema.atender_cola(procesos=1)
+
+    assert (resultado["fallidos"], resultado["generados"]) == (MAX_INTENTOS_COLA, 0)
+    [(lote_id,)] = sistema.conn.execute("SELECT id FROM cola_generacion").fetchall()
+    estado, _, intentos, error = lote_de(sistema, lote_id)
+    assert (estado, intentos, error) == ("fallido", MAX_INTENTOS_COLA, "No queda espacio en el disco")
+    assert certificados(sistema, curso_id) == []
+    assert os.listdir(tmp_path / "certificados") == []
+
+@pytest.fixture
+def coordinador(sistema):
+    # servir-cola en un hilo con su propio bucle; devuelve un ClienteCola
+    servicio = ServicioCola(sistema, puerto=0)
+    loop = asyncio.new_event_loop()
+    listo = threading.Event()
+
+    async def servir():
+        escuchando = asyncio.Event()
+        tarea = asyncio.create_task(servicio.servir(escuchando))
+        await escuchando.wait()
+        listo.set()
+        await tarea
+
+    principal = loop.create_task(servir())
+    hilo = threading.Thread(target=loop.run_until_complete, args=(principal,))
+    hilo.start()
+    listo.wait(5)
+    yield ClienteCola(f"http://127.0.0.1:{servicio.puerto}")
+    loop.call_soon_threadsafe(principal.cancel)
+    hilo.join(5)
+    loop.close()
+
+def test_trabajador_remoto_sube_sus_lotes_al_coordinador(sistema, crear_curso, coordinador):
+    curso_id, estudiantes = crear_curso("COLA", 5)
+    sistema.encolar_generacion(curso_id, estudiantes_por_lote=2)
+    otro_id, _ = crear_curso("CMB", 3)
+    sistema.encolar_generacion(otro_id, modo="combinado", paginas_por_archivo=2)
+
+    resultado = atender_cola(coordinador, procesos=1)
+
+    assert (resultado["lotes"], resultado["generados"], resultado["perdidos"]) == (5, 8, 0)
+    filas = certificados(sistema, curso_id)
+    assert sorted(estudiante_id for _, estudiante_id, _ in filas) == sorted(estudiantes)
+    assert all(os.path.exists(archivo) for _, _, archivo in filas)
+    paginas = sistema.conn.execute(
+        "SELECT archivo_certificado, pagina FROM certificados WHERE curso_id = ? ORDER BY archivo_certificado, pagina",
+        (otro_id,)
+    ).fetchall()
+    assert [pagina for _, pagina in paginas] == [1, 2, 1]
+    assert not [archivo for archivo in os.listdir("certificados") if archivo.endswith(".tmp")]
+
+def test_trabajador_remoto_sin_concesion_no_registra_el_lote(sistema, crear_curso, coordinador, tmp_path):
+    curso_id, _ = crear_curso("COLA", 1)
+    sistema.encolar_generacion(curso_id)
+    lento = coordinador.reclamar("lento", -1)
+    rapido = coordinador.reclamar("rapido", 600)
+    assert rapido["lote"] == lento["lote"]
+
+    temporal = tmp_path / "lento.pdf"
+    temporal.write_bytes(b"%PDF")
+    assert coordinador.terminar("lento", lento["lote"], [None], [str(temporal)]) is False
+
+    assert not temporal.exists()
+    assert certificados(sistema, curso_id) == []
+    assert os.listdir(tmp_path / "certificados") == []
+    assert lote_de(sistema, lento["lote"])[:2] == ("en_curso", "rapido")
+
+def test_coordinador_rechaza_rutas_y_peticiones_invalidas(coordinador):
+    with pytest.raises(OSError, match="404"):
+        coordinador._pedir("/borrar")
+    with pytest.raises(OSError, match="400"):
+        coordinador._pedir("/reclamar", trabajador="sin-concesion")
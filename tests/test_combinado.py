@@ -0,0 +1,16 @@
+from test_generacion import archivos
+from test_reanudacion import cancelar_tras
+
+def test_una_corrida_combinada_no_pisa_los_archivos_de_otra(sistema, crear_curso):
+    curso_id, _ = crear_curso("CMB", 4)
+    progreso, cancelar = cancelar_tras(2)
+    sistema.generar_certificados(curso_id, modo="combinado", paginas_por_archivo=2,
+                                 progreso=progreso, cancelar=cancelar)
+
+    # Reanudada enseguida, suele empezar en el mismo segundo que la anterior
+    sistema.generar_certificados(curso_id, modo="combinado", paginas_por_archivo=2)
+
+    filas = archivos(sistema, curso_id)
+    assert len(filas) == 4
+    assert len({archivo for archivo, _ in filas}) == 2
+    assert [pagina for _, pagina in filas] == [1, 2, 1, 2]
@@ -0,0 +1,77 @@
+import asyncio
+import os
+from concurrent.futures import Future
+
+from emision import ServicioEmision
+
+def emitir(sistema, peticiones):
+    # Atiende las peticiones [(cédula, código)] juntas, sin el servidor HTTP
+    async def atender():
+        servicio = ServicioEmision(sistema, procesos=1, espera=0.01)
+        tarea = asyncio.create_task(servicio._agrupar())
+        try:
+            return servicio, await asyncio.gather(*(servicio.emitir(*peticion) for peticion in peticiones))
+        finally:
+            tarea.cancel()
+            servicio.detener()
+    return asyncio.run(atender())
+
+def test_peticiones_simultaneas_comparten_la_emision(sistema, crear_curso):
+    curso_id, _ = crear_curso("EMI", 1)
+
+    servicio, respuestas = emitir(sistema, [("V-1", "EMI"), ("v 1", "EMI"), ("V-1", "EMI")])
+
+    assert [respuesta["estado"] for respuesta in respuestas] == ["emitido"] * 3
+    assert len({respuesta["certificado_id"] for respuesta in respuestas}) == 1
+    assert (servicio.compartidas, servicio.emitidos) == (2, 1)
+    assert sistema.conn.execute("SELECT COUNT(*) FROM certificados").fetchone()[0] == 1
+
+def test_un_certificado_emitido_se_devuelve_sin_regenerarlo(sistema, crear_curso):
+    crear_curso("EMI", 1)
+    _, (primera,) = emitir(sistema, [("V-1", "EMI")])
+
+    servicio, (segunda,) = emitir(sistema, [("V-1", "EMI")])
+
+    assert segunda["estado"] == "existente"
+    assert segunda["certificado_id"] == primera["certificado_id"]
+    assert servicio.emitidos == 0
+
+def test_solo_se_emite_a_los_aprobados(sistema, crear_curso):
+    crear_curso("EMI", 0)
+    sistema.registrar_estudiante({"nombre": "Luis", "apellido": "Díaz", "cedula": "V-9", "email": "luis@unexca.edu.ve"})
+
+    _, respuestas = emitir(sistema, [("V-9", "EMI"), ("V-9", "NOPE"), ("V-404", "EMI")])
+
+    assert [respuesta["estado"] for respuesta in respuestas] == ["no_aprobado", "no_encontrado", "no_encontrado"]
+
+class EjecutorConCompetencia:
+    # Renderiza en el mismo hilo, pero antes registra el certificado con
+    # otro ID, como una generación que termina mientras se emite
+    def __init__(self, sistema, estudiante_id, curso_id):
+        self.sistema, self.estudiante_id, self.curso_id = sistema, estudiante_id, curso_id
+
+    def submit(self, funcion, *argumentos):
+        self.sistema.conn.execute(
+            "INSERT INTO certificados (id, estudiante_id, curso_id, archivo_certificado) VALUES (?, ?, ?, ?)",
+            ("ganador", self.estudiante_id, self.curso_id, "certificados/ganador.pdf")
+        )
+        self.sistema.conn.commit()
+        futuro = Future()
+        futuro.set_result(funcion(*argumentos))
+        return futuro
+
+def test_una_emision_que_pierde_la_carrera_descarta_su_archivo(sistema, crear_curso):
+    curso_id, (estudiante_id,) = crear_curso("EMI", 1)
+    estudiante = sistema.conn.execute("SELECT * FROM estudiantes WHERE id = ?", (estudiante_id,)).fetchone()
+    curso = sistema.conn.execute("SELECT id, nombre, codigo FROM cursos WHERE id = ?", (curso_id,)).fetchone()
+    conn = sistema.conectar_base_datos()
+
+    [emitido] = sistema.emitir_certificados(
+        conn, [(estudiante, curso, "perdedor")], EjecutorConCompetencia(sistema, estudiante_id, curso_id)
+    )
+    conn.close()
+
+    assert emitido[0] == "ganador"
+    assert emitido[-1] is False
+    assert os.listdir("certificados") == []
+    assert sistema.conn.execute("SELECT id FROM certificados").fetchall() == [("ganador",)]
@@ -0,0 +1,76 @@
+import csv
+import io
+import os
+import zipfile
+
+import openpyxl
+
+import exportacion
+from exportacion import COLUMNAS_MANIFIESTO, COLUMNAS_REPORTE, exportar_reporte, exportar_zip
+
+def test_el_zip_incluye_cada_archivo_una_vez_y_su_manifiesto(sistema, crear_curso):
+    individual, _ = crear_curso("IND", 2)
+    combinado, _ = crear_curso("CMB", 3)
+    sistema.generar_certificados(individual)
+    sistema.generar_certificados(combinado, modo="combinado", paginas_por_archivo=3)
+    (perdido,) = sistema.conn.execute(
+        "SELECT archivo_certificado FROM certificados WHERE curso_id = ? LIMIT 1", (individual,)
+    ).fetchone()
+    os.remove(perdido)
+
+    resultado = exportar_zip(sistema.conn, destino=os.path.join("exports", "todos.zip"))
+
+    assert (resultado["certificados"], resultado["archivos"], resultado["faltantes"]) == (5, 2, 1)
+    assert not os.path.exists(resultado["destino"] + ".parcial")
+    with zipfile.ZipFile(resultado["destino"]) as zf:
+        assert len(zf.namelist()) == 3
+        assert os.path.basename(perdido) not in zf.namelist()
+        manifiesto = list(csv.reader(io.TextIOWrapper(zf.open("manifiesto.csv"), encoding="utf-8")))
+    assert manifiesto[0] == COLUMNAS_MANIFIESTO
+    incluidos = [fila[-1] for fila in manifiesto[1:]]
+    assert sorted(incluidos) == ["no", "si", "si", "si", "si"]
+
+def test_el_zip_de_un_curso_solo_trae_sus_certificados(sistema, crear_curso):
+    curso_id, _ = crear_curso("UNO", 2)
+    otro, _ = crear_curso("DOS", 1)
+    sistema.generar_certificados(curso_id)
+    sistema.generar_certificados(otro)
+
+    resultado = exportar_zip(sistema.conn, curso_id=curso_id)
+
+    assert os.path.basename(resultado["destino"]).startswith("certificados_UNO_")
+    assert (resultado["certificados"], resultado["archivos"]) == (2, 2)
+
+def test_el_reporte_csv_tiene_una_fila_por_certificado(sistema, crear_curso):
+    curso_id, _ = crear_curso("REP", 3)
+    sistema.generar_certificados(curso_id)
+
+    resultado = exportar_reporte(sistema.conn, "csv", curso_id)
+
+    with open(resultado["destino"], newline="", encoding="utf-8") as archivo:
+        filas = list(csv.reader(archivo))
+    assert filas[0] == COLUMNAS_REPORTE
+    assert resultado["filas"] == len(filas) - 1 == 3
+    assert {fila[6] for fila in filas[1:]} == {"REP"}
+
+def test_el_reporte_excel_continua_en_otra_hoja_al_llenarse(sistema, crear_curso, monkeypatch):
+    monkeypatch.setattr(exportacion, "FILAS_POR_HOJA", 2)
+    curso_id, _ = crear_curso("XLS", 5)
+    sistema.generar_certificados(curso_id)
+
+    resultado = exportar_reporte(sistema.conn, "xlsx", curso_id)
+
+    wb = openpyxl.load_workbook(resultado["destino"], read_only=True)
+    hojas = [list(hoja.iter_rows(values_only=True)) for hoja in wb.worksheets]
+    wb.close()
+    assert resultado["filas"] == 5
+    assert [len(filas) for filas in hojas] == [3, 3, 2]
+    assert all(filas[0] == tuple(COLUMNAS_REPORTE) for filas in hojas)
+
+def test_un_reporte_sin_certificados_solo_tiene_encabezados(sistema):
+    resultado = exportar_reporte(sistema.conn, "xlsx")
+
+    wb = openpyxl.load_workbook(resultado["destino"], read_only=True)
+    assert [list(hoja.iter_rows(values_only=True)) for hoja in wb.worksheets] == [[tuple(COLUMNAS_REPORTE)]]
+    wb.close()
+    assert resultado["filas"] == 0
@@ -0,0 +1,49 @@
+import os
+
+from nucleo import SistemaCertificados
+from test_migraciones import base_en_version
+
+def archivos(sistema, curso_id):
+    return sistema.conn.execute(
+        "SELECT archivo_certificado, pagina FROM certificados WHERE curso_id = ? ORDER BY archivo_certificado, pagina",
+        (curso_id,)
+    ).fetchall()
+
+def test_homonimos_tienen_cada_uno_su_archivo(sistema, crear_curso):
+    curso_id, _ = crear_curso("HOM", 2, nombre="Ana", apellido="Pérez")
+
+    resultado = sistema.generar_certificados(curso_id)
+
+    assert resultado["generados"] == 2
+    filas = archivos(sistema, curso_id)
+    assert len({archivo for archivo, _ in filas}) == 2
+    assert all(os.path.exists(archivo) for archivo, _ in filas)
+    assert sistema.generar_certificados(curso_id)["omitidos"] == 2
+
+def test_archivos_compartidos_por_homonimos_se_vuelven_a_emitir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ruta = os.path.join("bases_datos", "anterior.db")
+    conn = base_en_version(ruta, 11)
+    conn.executemany('''
+        INSERT INTO certificados (id, estudiante_id, curso_id, fecha_emision, archivo_certificado, pagina)
+        VALUES (?, ?, 'c1', '2024-01-01 00:00:00', ?, ?)
+    ''', [
+        ("x1", "e1", "certificados/Ana_Pérez_INF-101.pdf", None),
+        ("x2", "e2", "certificados/Ana_Pérez_INF-101.pdf", None),
+        ("x3", "e3", "certificados/Luis_Pérez_INF-101.pdf", None),
+        ("x4", "e4", "certificados/INF-101_0001.pdf", 1),
+        ("x5", "e5", "certificados/INF-101_0001.pdf", 2)
+    ])
+    conn.commit()
+    conn.close()
+
+    sistema = SistemaCertificados(ruta)
+    try:
+        assert sistema.conn.execute(
+            "SELECT id, archivo_certificado FROM certificados ORDER BY id"
+        ).fetchall() == [
+            ("x1", None), ("x2", None), ("x3", "certificados/Luis_Pérez_INF-101.pdf"),
+            ("x4", "certificados/INF-101_0001.pdf"), ("x5", "certificados/INF-101_0001.pdf")
+        ]
+    finally:
+        sistema.cerrar()
@@ -0,0 +1,85 @@
+import csv
+from datetime import datetime
+
+import openpyxl
+import pytest
+
+import nucleo
+from nucleo import normalizar_cedula
+
+class FechaFija(datetime):
+    # datetime.now() siempre en el mismo segundo
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2024, 5, 1, 10, 30, 0)
+
+def libro(ruta, filas):
+    wb = openpyxl.Workbook()
+    hoja = wb.active
+    hoja.append(["nombre", "apellido", "cedula", "email"])
+    for fila in filas:
+        hoja.append(fila)
+    wb.save(ruta)
+    return str(ruta)
+
+def reporte(ruta):
+    with open(ruta, newline="", encoding="utf-8") as archivo:
+        return [(fila["fila"], fila["motivo"]) for fila in csv.DictReader(archivo)]
+
+@pytest.mark.parametrize("valor, esperada", [
+    ("v 12.345.678", "V-12345678"),
+    ("V12345678", "V-12345678"),
+    ("E-1234", "E-1234"),
+    (12345678.0, "12345678"),
+    ("12.345.678", "12345678"),
+    ("X-123", None),
+    ("V-12a", None),
+    (None, None),
+])
+def test_normalizar_cedula(valor, esperada):
+    assert normalizar_cedula(valor) == esperada
+
+def test_validar_estudiantes_da_el_motivo_de_cada_rechazo(sistema):
+    bloque = list(enumerate([
+        ("Ana", "Pérez", "v 1", "ana@unexca.edu.ve"),
+        ("Luis", "Díaz", "V-1", "luis@unexca.edu.ve"),
+        ("Eva", "Ruiz", "V-2", "sin-arroba"),
+        ("Rosa", "Gil", "Q-3", "rosa@unexca.edu.ve"),
+        ("Juan", "", "V-4", "juan@unexca.edu.ve"),
+        ("Pedro", "Sosa", "V-5", "pedro@unexca.edu.ve"),
+        ("Solo", "Nombre"),
+    ], start=2))
+
+    validas, invalidas = sistema._validar_estudiantes(bloque, existentes={"V-5"}, vistas=set())
+
+    assert [fila[3] for fila in validas] == ["V-1"]
+    assert [(numero, motivo) for numero, motivo, *_ in invalidas] == [
+        (3, "Cédula repetida en el archivo"),
+        (4, "Email inválido"),
+        (5, "Cédula inválida"),
+        (6, "El campo apellido está vacío"),
+        (7, "Cédula ya registrada"),
+        (8, "Fila incompleta"),
+    ]
+
+def test_el_reporte_lista_exactamente_las_filas_rechazadas(sistema, tmp_path):
+    sistema.registrar_estudiante({"nombre": "Ana", "apellido": "Pérez", "cedula": "V-1", "email": "ana@unexca.edu.ve"})
+    archivo = libro(tmp_path / "estudiantes.xlsx", [
+        ("Ana", "Pérez", "V-1", "ana@unexca.edu.ve"),
+        ("Luis", "Díaz", "V-2", "luis@unexca.edu.ve"),
+        ("Eva", "Ruiz", "V-2", "eva@unexca.edu.ve"),
+    ])
+
+    resultado = sistema.importar_estudiantes_excel(archivo)
+
+    assert (resultado["insertadas"], resultado["rechazadas"], resultado["omitidas"]) == (1, 2, 0)
+    assert reporte(resultado["reporte"]) == [("2", "Cédula ya registrada"), ("4", "Cédula repetida en el archivo")]
+
+def test_dos_importaciones_en_el_mismo_segundo_no_comparten_reporte(sistema, tmp_path, monkeypatch):
+    monkeypatch.setattr(nucleo, "datetime", FechaFija)
+    archivo = libro(tmp_path / "estudiantes.xlsx", [("Eva", "Ruiz", "V-9", "sin-arroba")])
+    reportes = [sistema.importar_estudiantes_excel(archivo)["reporte"] for _ in range(2)]
+
+    assert reportes[0] != reportes[1]
+    assert reportes[1].endswith("_20240501_103000_2.csv")
+    assert all(reporte(ruta) == [("2", "Email inválido")] for ruta in reportes)
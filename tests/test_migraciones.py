@@ -0,0 +1,71 @@
+import os
+import sqlite3
+
+import pytest
+
+import nucleo
+from nucleo import MIGRACIONES, SistemaCertificados
+
+def base_en_version(ruta, version):
+    # Base con las primeras `version` migraciones, como la dejó una versión anterior
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    conn = sqlite3.connect(ruta)
+    for script in MIGRACIONES[:version]:
+        conn.executescript(script)
+    conn.execute(f"PRAGMA user_version = {version}")
+    conn.commit()
+    return conn
+
+def test_base_nueva_llega_a_la_ultima_version(sistema):
+    assert sistema.conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRACIONES)
+    assert sistema.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    indices = {nombre for (nombre,) in sistema.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {
+        "idx_certificados_estudiante_curso", "idx_inscripciones_estado",
+        "idx_certificados_desactualizados", "idx_cola_generacion_estado"
+    } <= indices
+
+def test_actualiza_una_base_con_el_esquema_inicial(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ruta = os.path.join("bases_datos", "anterior.db")
+    conn = base_en_version(ruta, 1)
+    conn.execute("INSERT INTO estudiantes (id, nombre, apellido, cedula, email) VALUES ('e1', 'Ana', 'Pérez', 'V-1', 'a@x.com')")
+    conn.execute("INSERT INTO cursos (id, nombre, codigo) VALUES ('c1', 'Curso', 'INF-101')")
+    # Antes de la migración 2 podía haber duplicados: queda el último
+    conn.executemany('''
+        INSERT INTO certificados (id, estudiante_id, curso_id, fecha_emision, archivo_certificado)
+        VALUES (?, 'e1', 'c1', '2024-01-01 00:00:00', ?)
+    ''', [("x1", "certificados/a.pdf"), ("x2", "certificados/b.pdf")])
+    conn.commit()
+    conn.close()
+
+    sistema = SistemaCertificados(ruta)
+    try:
+        assert sistema.conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRACIONES)
+        assert sistema.conn.execute(
+            "SELECT id, archivo_certificado, desactualizado FROM certificados"
+        ).fetchall() == [("x2", "certificados/b.pdf", 0)]
+        # Los certificados ya emitidos cuentan como aprobaciones
+        assert sistema.conn.execute(
+            "SELECT curso_id, estudiante_id, estado FROM inscripciones"
+        ).fetchall() == [("c1", "e1", "aprobado")]
+    finally:
+        sistema.cerrar()
+
+def test_una_migracion_fallida_no_deja_cambios(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ruta = os.path.join("bases_datos", "prueba.db")
+    SistemaCertificados(ruta).cerrar()
+
+    monkeypatch.setattr(nucleo, "MIGRACIONES", MIGRACIONES + [
+        "CREATE TABLE nueva (id INTEGER); SELECT * FROM tabla_inexistente;"
+    ])
+    with pytest.raises(sqlite3.Error):
+        SistemaCertificados(ruta)
+
+    conn = sqlite3.connect(ruta)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRACIONES)
+        assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'nueva'").fetchone()[0] == 0
+    finally:
+        conn.close()
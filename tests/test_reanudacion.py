@@ -0,0 +1,22 @@
+import threading
+
+def cancelar_tras(generados):
+    # progreso que pide cancelar la corrida al llegar a `generados`
+    cancelar = threading.Event()
+    def progreso(hechos, omitidos, total):
+        if hechos >= generados:
+            cancelar.set()
+    return progreso, cancelar
+
+def test_reanudar_omite_los_emitidos_sin_contarlos_como_generados(sistema, crear_curso):
+    curso_id, _ = crear_curso("REA", 6)
+    progreso, cancelar = cancelar_tras(2)
+    resultado = sistema.generar_certificados(curso_id, progreso=progreso, cancelar=cancelar)
+    assert (resultado["estado"], resultado["generados"]) == ("cancelado", 2)
+
+    avisos = []
+    resultado = sistema.generar_certificados(curso_id, progreso=lambda *aviso: avisos.append(aviso))
+
+    assert (resultado["estado"], resultado["generados"], resultado["omitidos"]) == ("fin", 4, 2)
+    assert avisos[0] == (0, 0, 6)
+    assert avisos[-1] == (4, 2, 6)
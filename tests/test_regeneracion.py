@@ -0,0 +1,105 @@
+import json
+import os
+
+from PIL import Image
+
+import nucleo
+
+def certificado(sistema, estudiante_id, curso_id):
+    return sistema.conn.execute('''
+        SELECT id, archivo_certificado, huella, desactualizado FROM certificados
+        WHERE estudiante_id = ? AND curso_id = ?
+    ''', (estudiante_id, curso_id)).fetchone()
+
+def marcados(sistema):
+    return {certificado_id for (certificado_id,) in sistema.conn.execute(
+        "SELECT id FROM certificados WHERE desactualizado = 1"
+    )}
+
+def actualizar(sistema, tabla, campo, valor, fila_id):
+    sistema.conn.execute(f"UPDATE {tabla} SET {campo} = ? WHERE id = ?", (valor, fila_id))
+    sistema.conn.commit()
+
+def test_cambiar_un_dato_impreso_regenera_con_el_mismo_id_y_archivo(sistema, crear_curso):
+    curso_id, (ana, otra) = crear_curso("REG", 2)
+    sistema.generar_certificados(curso_id)
+    antes = certificado(sistema, ana, curso_id)
+
+    actualizar(sistema, "estudiantes", "nombre", "Beatriz", ana)
+    assert marcados(sistema) == {antes[0]}
+
+    resultado = sistema.regenerar_desactualizados()
+
+    assert (resultado["regenerados"], resultado["vigentes"], resultado["archivos"]) == (1, 0, 1)
+    despues = certificado(sistema, ana, curso_id)
+    assert despues[:2] == antes[:2]
+    assert despues[2] != antes[2]
+    assert despues[3] == 0
+    assert os.path.exists(despues[1])
+
+def test_un_dato_que_vuelve_a_su_valor_solo_se_desmarca(sistema, crear_curso):
+    curso_id, (ana,) = crear_curso("REG", 1)
+    sistema.generar_certificados(curso_id)
+
+    actualizar(sistema, "estudiantes", "apellido", "Gómez", ana)
+    actualizar(sistema, "estudiantes", "apellido", "Pérez", ana)
+    resultado = sistema.regenerar_desactualizados()
+
+    assert (resultado["regenerados"], resultado["vigentes"]) == (0, 1)
+    assert marcados(sistema) == set()
+
+def test_cambiar_el_codigo_del_curso_marca_todos_sus_certificados(sistema, crear_curso):
+    curso_id, estudiantes = crear_curso("REG", 3)
+    otro_id, _ = crear_curso("OTRO", 1)
+    sistema.generar_certificados(curso_id)
+    sistema.generar_certificados(otro_id)
+
+    actualizar(sistema, "cursos", "codigo", "REG-2", curso_id)
+
+    assert marcados(sistema) == {certificado(sistema, e, curso_id)[0] for e in estudiantes}
+
+def test_el_email_no_marca_los_certificados_pdf(sistema, crear_curso):
+    curso_id, (ana,) = crear_curso("REG", 1)
+    sistema.generar_certificados(curso_id)
+
+    actualizar(sistema, "estudiantes", "email", "nuevo@unexca.edu.ve", ana)
+
+    assert marcados(sistema) == set()
+
+def test_el_email_solo_regenera_las_plantillas_que_lo_imprimen(sistema, crear_curso, tmp_path):
+    plantillas = tmp_path / "templates"
+    Image.new("RGB", (1200, 850), "white").save(plantillas / "fondo.png")
+    (plantillas / "con_email.json").write_text(json.dumps({
+        "fondo": "fondo.png",
+        "campos": [{"texto": "{nombre} {apellido} <{email}>", "x": 0.5, "y": 0.5, "tamano": 0.05}]
+    }), encoding="utf-8")
+    sin_email, (ana,) = crear_curso("SIN", 1)
+    con_email, _ = crear_curso("CON", existentes=[ana])
+    sistema.generar_certificados(sin_email, plantilla="fondo", formato="png")
+    sistema.generar_certificados(con_email, plantilla="con_email", formato="png")
+
+    actualizar(sistema, "estudiantes", "email", "nuevo@unexca.edu.ve", ana)
+    assert len(marcados(sistema)) == 2
+    resultado = sistema.regenerar_desactualizados()
+
+    assert (resultado["regenerados"], resultado["vigentes"]) == (1, 1)
+
+def test_regenera_cada_certificado_con_su_perfil(sistema, crear_curso, monkeypatch):
+    estandar, (ana,) = crear_curso("EST", 1)
+    compacto, _ = crear_curso("CMP", existentes=[ana])
+    sistema.generar_certificados(estandar, perfil="estandar")
+    sistema.generar_certificados(compacto, perfil="compacto")
+
+    perfiles = {}
+    original = nucleo._renderizar_lote
+    def espiar(trabajos, perfil="estandar"):
+        for trabajo in trabajos:
+            perfiles[trabajo[1][1]] = perfil
+        return original(trabajos, perfil)
+    monkeypatch.setattr(nucleo, "_renderizar_lote", espiar)
+
+    actualizar(sistema, "estudiantes", "nombre", "Beatriz", ana)
+    sistema.perfil_pdf = "estandar"
+    sistema.regenerar_desactualizados()
+
+    assert perfiles == {"EST": "estandar", "CMP": "compacto"}
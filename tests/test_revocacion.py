@@ -0,0 +1,46 @@
+import os
+
+def revocar_sin_archivo(sistema, curso_id, estudiante_id):
+    # Revoca el certificado y borra su archivo, como si se hubiera perdido
+    certificado_id, archivo = sistema.conn.execute(
+        "SELECT id, archivo_certificado FROM certificados WHERE estudiante_id = ? AND curso_id = ?",
+        (estudiante_id, curso_id)
+    ).fetchone()
+    sistema.revocar_certificado(certificado_id, "Datos falsos")
+    os.remove(archivo)
+    return archivo
+
+def test_generar_no_vuelve_a_escribir_un_certificado_revocado(sistema, crear_curso):
+    curso_id, (ana, _) = crear_curso("REV", 2)
+    sistema.generar_certificados(curso_id)
+    archivo = revocar_sin_archivo(sistema, curso_id, ana)
+
+    resultado = sistema.generar_certificados(curso_id)
+
+    assert (resultado["generados"], resultado["omitidos"]) == (0, 2)
+    assert not os.path.exists(archivo)
+
+def test_la_cola_no_vuelve_a_escribir_un_certificado_revocado(sistema, crear_curso):
+    curso_id, (ana, _) = crear_curso("REV", 2)
+    sistema.generar_certificados(curso_id)
+    archivo = revocar_sin_archivo(sistema, curso_id, ana)
+    corrida = sistema.encolar_generacion(curso_id)
+
+    resultado = sistema.atender_cola(procesos=1)
+
+    assert resultado["generados"] == 0
+    [resumen] = sistema.estado_cola(corrida["corrida"])
+    assert (resumen["hecho"], resumen["generados"]) == (1, 0)
+    assert not os.path.exists(archivo)
+
+def test_regenerar_no_toca_un_certificado_revocado(sistema, crear_curso):
+    curso_id, (ana, _) = crear_curso("REV", 2)
+    sistema.generar_certificados(curso_id)
+    archivo = revocar_sin_archivo(sistema, curso_id, ana)
+    sistema.conn.execute("UPDATE estudiantes SET nombre = 'Beatriz' WHERE id = ?", (ana,))
+    sistema.conn.commit()
+
+    resultado = sistema.regenerar_desactualizados()
+
+    assert (resultado["estado"], resultado["total"], resultado["regenerados"]) == ("fin", 0, 0)
+    assert not os.path.exists(archivo)
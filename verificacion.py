@@ -0,0 +1,216 @@
+import asyncio
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+from servidor_http import ServidorHTTP
+
+try:
+    import qrcode
+except ImportError:
+    # Sin la biblioteca qrcode los certificados solo muestran su ID
+    qrcode = None
+
+# Dirección que se imprime en el QR de cada certificado, seguida del ID
+URL_VERIFICACION = "http://localhost:8080/verificar/"
+
+FORMATO_ID = re.compile(r"^[0-9A-Za-z-]{1,64}$")
+
+def enlace_verificacion(certificado_id, base=URL_VERIFICACION):
+    return base + certificado_id
+
+def matriz_qr(texto):
+    # Filas de booleanos, o None sin qrcode. Máscara fija: no se evalúan las ocho
+    if qrcode is None:
+        return None
+    codigo = qrcode.QRCode(
+        border=0,
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        mask_pattern=2
+    )
+    codigo.add_data(texto)
+    codigo.make(fit=True)
+    return codigo.get_matrix()
+
+def tramos_qr(matriz):
+    # Módulos oscuros por tramos horizontales: (fila, columna inicial, largo)
+    for fila, valores in enumerate(matriz):
+        columna = 0
+        while columna < len(valores):
+            if valores[columna]:
+                inicio = columna
+                while columna < len(valores) and valores[columna]:
+                    columna += 1
+                yield fila, inicio, columna - inicio
+            else:
+                columna += 1
+
+def buscar_certificado(conn, certificado_id):
+    # Búsqueda por clave primaria: usa el índice de certificados.id
+    fila = conn.execute('''
+        SELECT c.id, e.nombre, e.apellido, e.cedula, cu.nombre, cu.codigo,
+               c.fecha_emision, c.revocado_en, c.motivo_revocacion
+        FROM certificados c
+        LEFT JOIN estudiantes e ON e.id = c.estudiante_id
+        LEFT JOIN cursos cu ON cu.id = c.curso_id
+        WHERE c.id = ?
+    ''', (certificado_id,)).fetchone()
+    if not fila:
+        return None
+
+    cedula = str(fila[3] or "")
+    return {
+        "certificado_id": fila[0],
+        "estado": "revocado" if fila[7] else "valido",
+        "valido": not fila[7],
+        "estudiante": f"{fila[1]} {fila[2]}",
+        # Solo los últimos dígitos de la cédula: la verificación es pública
+        "cedula": "*" * max(len(cedula) - 4, 0) + cedula[-4:],
+        "curso": fila[4],
+        "codigo": fila[5],
+        "fecha_emision": fila[6],
+        "revocado_en": fila[7],
+        "motivo_revocacion": fila[8]
+    }
+
+class CacheVerificacion:
+    # LRU con vencimiento; los certificados inexistentes vencen en ttl_negativo
+    def __init__(self, capacidad=10_000, ttl=300, ttl_negativo=5):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self.entradas = OrderedDict()
+
+    def obtener(self, clave):
+        # Devuelve (encontrado, valor)
+        entrada = self.entradas.get(clave)
+        if entrada is None:
+            return False, None
+        vence, valor = entrada
+        if vence < time.monotonic():
+            del self.entradas[clave]
+            return False, None
+        self.entradas.move_to_end(clave)
+        return True, valor
+
+    def guardar(self, clave, valor):
+        duracion = self.ttl if valor is not None else self.ttl_negativo
+        self.entradas[clave] = (time.monotonic() + duracion, valor)
+        self.entradas.move_to_end(clave)
+        while len(self.entradas) > self.capacidad:
+            self.entradas.popitem(last=False)
+
+    def descartar(self, claves):
+        for clave in claves:
+            self.entradas.pop(clave, None)
+
+class ServicioVerificacion(ServidorHTTP):
+    # GET /verificar/<id>. Un barrido cada intervalo_revocaciones segundos
+    # quita de la caché los certificados revocados
+    def __init__(self, db_path, host="127.0.0.1", puerto=8080, hilos=4,
+                 capacidad=10_000, ttl=300, intervalo_revocaciones=2):
+        super().__init__(host, puerto)
+        self.db_path = db_path
+        self.cache = CacheVerificacion(capacidad, ttl)
+        self.intervalo_revocaciones = intervalo_revocaciones
+        self.executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="verificacion")
+        self._local = threading.local()
+        self._en_curso = {}
+        self._barridos = 0
+        self.consultas = 0
+        self.aciertos = 0
+
+    def _conexion(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def _buscar(self, certificado_id):
+        return buscar_certificado(self._conexion(), certificado_id)
+
+    def _revocados_desde(self, desde):
+        return [
+            certificado_id for (certificado_id,) in self._conexion().execute(
+                "SELECT id FROM certificados WHERE revocado_en >= ?", (desde,)
+            )
+        ]
+
+    async def verificar(self, certificado_id):
+        self.consultas += 1
+        encontrado, valor = self.cache.obtener(certificado_id)
+        if encontrado:
+            self.aciertos += 1
+            return valor
+
+        futuro = self._en_curso.get(certificado_id)
+        if futuro is None:
+            loop = asyncio.get_running_loop()
+            futuro = loop.run_in_executor(self.executor, self._buscar, certificado_id)
+            self._en_curso[certificado_id] = futuro
+            barridos = self._barridos
+            try:
+                valor = await asyncio.shield(futuro)
+                # Un barrido durante la consulta pudo no ver una revocación
+                if barridos == self._barridos:
+                    self.cache.guardar(certificado_id, valor)
+            finally:
+                del self._en_curso[certificado_id]
+            return valor
+        return await asyncio.shield(futuro)
+
+    async def _barrer_revocaciones(self):
+        loop = asyncio.get_running_loop()
+        # revocado_en tiene resolución de segundos: se repasa el segundo
+        # anterior al último barrido para no perder revocaciones del borde
+        desde = datetime.now()
+        while True:
+            await asyncio.sleep(self.intervalo_revocaciones)
+            ahora = datetime.now()
+            marca = (desde - timedelta(seconds=1)).strftime('%Y-%m-%d %H:%M:%S')
+            try:
+                revocados = await loop.run_in_executor(self.executor, self._revocados_desde, marca)
+            except sqlite3.Error:
+                # Base ocupada o bloqueada: se reintenta en el próximo barrido
+                continue
+            self.cache.descartar(revocados)
+            self._barridos += 1
+            desde = ahora
+
+    async def despachar(self, metodo, ruta, cabeceras, cuerpo):
+        if metodo != "GET":
+            return 405, {"error": "Método no permitido"}
+
+        ruta = urlsplit(ruta).path.rstrip("/")
+        if ruta == "/salud":
+            return 200, {
+                "estado": "ok",
+                "consultas": self.consultas,
+                "aciertos_cache": self.aciertos,
+                "entradas_cache": len(self.cache.entradas)
+            }
+
+        if ruta.startswith("/verificar/"):
+            certificado_id = ruta[len("/verificar/"):]
+            if not FORMATO_ID.match(certificado_id):
+                return 400, {"error": "ID de certificado inválido"}
+            try:
+                certificado = await self.verificar(certificado_id)
+            except sqlite3.Error:
+                return 503, {"error": "Base de datos no disponible"}
+            if certificado is None:
+                return 404, {"certificado_id": certificado_id, "estado": "no_encontrado", "valido": False}
+            return 200, certificado
+
+        return 404, {"error": "Ruta no encontrada"}
+
+    def tareas_fondo(self):
+        return [self._barrer_revocaciones()]
+
+    def detener(self):
+        self.executor.shutdown(wait=False)